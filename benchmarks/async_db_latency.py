@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from contacts_api.database import to_async_url
+
+SLOW_QUERY = text("SELECT sleep_ms(:ms)")
+FAST_QUERY = text("SELECT 1")
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return ms
+
+
+def _register_sleep(sync_engine):
+    @event.listens_for(sync_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep_ms", 1, _sleep_ms)
+
+
+def build_blocking_app(url: str, slow_ms: int) -> FastAPI:
+    # Mirrors the old layout: a synchronous Session used inside `async def`.
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    _register_sleep(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow() -> dict:
+        with SessionLocal() as db:
+            db.execute(SLOW_QUERY, {"ms": slow_ms})
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast() -> dict:
+        with SessionLocal() as db:
+            db.execute(FAST_QUERY)
+        return {"ok": True}
+
+    return app
+
+
+def build_async_app(url: str, slow_ms: int) -> FastAPI:
+    engine = create_async_engine(to_async_url(url))
+    _register_sleep(engine.sync_engine)
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow() -> dict:
+        async with SessionLocal() as db:
+            await db.execute(SLOW_QUERY, {"ms": slow_ms})
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast() -> dict:
+        async with SessionLocal() as db:
+            await db.execute(FAST_QUERY)
+        return {"ok": True}
+
+    return app
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(app: FastAPI, total: int, slow_ratio: float, rps: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    paths = ["/slow" if rng.random() < slow_ratio else "/fast" for _ in range(total)]
+    latencies = {"/slow": [], "/fast": []}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        # Open-loop arrivals: latency is measured from the scheduled send time,
+        # so time spent waiting for a blocked event loop is counted too.
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+
+        async def call(index, path):
+            scheduled = origin + index / rps
+            await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies[path].append((loop.time() - scheduled) * 1000)
+
+        await asyncio.gather(*(call(index, path) for index, path in enumerate(paths)))
+        elapsed = loop.time() - origin
+
+    return {"elapsed": elapsed, "latencies": latencies}
+
+
+def report(name: str, result: dict) -> None:
+    print(f"\n{name}: {sum(map(len, result['latencies'].values()))} requests in {result['elapsed']:.2f}s")
+    for path, values in result["latencies"].items():
+        if not values:
+            continue
+        print(
+            f"  {path:<6} n={len(values):<5} "
+            f"p50={statistics.median(values):8.1f}ms "
+            f"p95={percentile(values, 95):8.1f}ms "
+            f"p99={percentile(values, 99):8.1f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="p99 latency of fast requests mixed with slow queries")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    parser.add_argument("--slow-ms", type=int, default=100)
+    parser.add_argument("--rps", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        for name, build in (("blocking (sync Session in async def)", build_blocking_app),
+                            ("async (AsyncSession + aiosqlite)", build_async_app)):
+            app = build(url, args.slow_ms)
+            result = asyncio.run(run(app, args.requests, args.slow_ratio, args.rps, args.seed))
+            report(name, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+from contacts_api import auth
+from contacts_api.resources import resources
+from contacts_api.tokens import JoseBackend, PyJWTBackend, TokenCodec, VerifiedTokenCache
+from contacts_api.user_cache import CurrentUser, user_cache
+
+EMAIL = "bench@example.com"
+
+
+class NoCache(VerifiedTokenCache):
+    def get(self, token: str):
+        return None
+
+    def put(self, token: str, claims: dict) -> None:
+        pass
+
+
+VARIANTS = (
+    ("python-jose, no cache", JoseBackend, NoCache),
+    ("PyJWT, no cache", PyJWTBackend, NoCache),
+    ("python-jose + verified cache", JoseBackend, VerifiedTokenCache),
+    ("PyJWT + verified cache", PyJWTBackend, VerifiedTokenCache),
+)
+
+
+async def per_call(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request cost of token verification in get_current_user")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    # Isolate token handling: the principal is already in the per-worker cache.
+    resources.redis = AsyncMock()
+    print(f"{'variant':<30} {'encode':>10} {'get_current_user':>18}")
+    for name, backend, cache in VARIANTS:
+        auth.token_codec = TokenCodec(auth.SECRET_KEY, auth.ALGORITHM, backend(), cache())
+        token = auth.create_access_token({"sub": EMAIL})
+        user_cache.reset()
+        user_cache.put(EMAIL, auth.token_codec.decode(token)["iat"], CurrentUser(1, EMAIL))
+
+        async def encode():
+            auth.create_access_token({"sub": EMAIL})
+
+        async def authenticate():
+            await auth.get_current_user(token, None)
+
+        encode_us = asyncio.run(per_call(encode, args.iterations))
+        auth_us = asyncio.run(per_call(authenticate, args.iterations))
+        print(f"{name:<30} {encode_us:>8.1f}us {auth_us:>16.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import io
+import random
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from httpx import ASGITransport, AsyncClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from contacts_api import auth
+from contacts_api.avatars import LocalStorage, avatar_pipeline, make_thumbnail
+from contacts_api.database import Base, get_db
+from contacts_api.main import app
+from contacts_api.models import User
+from contacts_api.resources import resources
+
+
+def build_legacy_app(storage: LocalStorage, resize: bool) -> FastAPI:
+    # Mirrors the previous endpoint: FastAPI buffers the form, and the file goes
+    # to storage as-is or after a resize on the event loop.
+    legacy = FastAPI()
+
+    @legacy.post("/upload-avatar")
+    async def upload_avatar(file: UploadFile = File(...)) -> dict:
+        if file.content_type not in ["image/jpeg", "image/png"]:
+            raise HTTPException(status_code=400, detail="Invalid file type")
+        data = await asyncio.to_thread(file.file.read)
+        if resize:
+            data = make_thumbnail(data)
+        return {"avatar_url": await storage.save(1, data)}
+
+    return legacy
+
+
+def make_photo(width: int, height: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    image = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=90)
+    return output.getvalue()
+
+
+async def watch_loop(stalls: list, interval: float = 0.005) -> None:
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def measure(target: FastAPI, path: str, photo: bytes, uploads: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncClient(transport=ASGITransport(app=target), base_url="http://bench", timeout=None) as client:
+        async def upload():
+            async with semaphore:
+                response = await client.post(path, files={"file": ("photo.jpg", photo, "image/jpeg")})
+                response.raise_for_status()
+                return response.json()["avatar_url"]
+
+        await upload()
+        stalls = []
+        watcher = asyncio.create_task(watch_loop(stalls))
+        tracemalloc.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(uploads)))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        watcher.cancel()
+    return {"elapsed": elapsed, "peak": peak, "stall": max(stalls, default=0.0)}
+
+
+async def run(uploads: int, concurrency: int, photo: bytes, media: str) -> None:
+    storage = LocalStorage(media, "/media/avatars")
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with SessionLocal() as session:
+        session.add(User(id=1, email="bench@example.com", password="x", full_name="Bench", is_verified=True))
+        await session.commit()
+
+    async def _get_db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[auth.get_current_user] = lambda: SimpleNamespace(id=1, email="bench@example.com")
+    resources.redis = AsyncMock()
+    avatar_pipeline.storage = storage
+
+    try:
+        for name, target, path in (
+            ("buffered, stored as-is", build_legacy_app(storage, resize=False), "/upload-avatar"),
+            ("buffered + inline resize", build_legacy_app(storage, resize=True), "/upload-avatar"),
+            ("streamed + process-pool resize", app, "/auth/upload-avatar"),
+        ):
+            result = await measure(target, path, photo, uploads, concurrency)
+            print(f"{name:<32} {uploads / result['elapsed']:7.1f} uploads/s  "
+                  f"peak Python heap {result['peak'] / 1e6:6.1f} MB  "
+                  f"worst loop stall {result['stall'] * 1000:6.1f} ms")
+    finally:
+        avatar_pipeline.shutdown()
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Avatar upload throughput, upload-path memory and event loop stalls")
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    args = parser.parse_args()
+
+    photo = make_photo(args.width, args.height, seed=7)
+    print(f"photo: {args.width}x{args.height} JPEG, {len(photo) / 1e6:.1f} MB")
+    with tempfile.TemporaryDirectory() as media:
+        asyncio.run(run(args.uploads, args.concurrency, photo, media))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.datasets import seed
+from contacts_api.birthdays import upcoming_birthdays_statement
+from contacts_api.database import install_sqlite_pragmas
+from contacts_api.digests import render_digest, run_birthday_digests
+from contacts_api.models import User
+
+
+async def discard(subject: str, email: str, body: str) -> None:
+    pass
+
+
+async def per_user(session_factory, today: date, days: int) -> int:
+    # The polling approach: list the users, then one birthday query each.
+    sent = 0
+    async with session_factory() as session:
+        users = (await session.execute(
+            select(User.id, User.email, User.full_name).where(User.is_verified.is_(True)).order_by(User.id)
+        )).all()
+        for user_id, email, full_name in users:
+            contacts = (await session.scalars(upcoming_birthdays_statement(user_id, today, days))).all()
+            if contacts:
+                birthdays = [(c.first_name, c.last_name, c.birthday_md) for c in contacts]
+                subject, body = render_digest(full_name, birthdays, today)
+                await discard(subject, email, body)
+                sent += 1
+    return sent
+
+
+async def compare(path: str, today: date, days: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    # WAL, as in the app: checkpoints are written while the reader is still streaming.
+    install_sqlite_pragmas(engine.sync_engine)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    started = time.perf_counter()
+    sent = await per_user(session_factory, today, days)
+    print(f"query per user      {sent:>8} digests   {time.perf_counter() - started:>8.2f} s")
+    started = time.perf_counter()
+    stats = await run_birthday_digests(today, days, session_factory, discard)
+    print(f"single stream       {stats['sent']:>8} digests   {time.perf_counter() - started:>8.2f} s")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Set-based birthday digest job vs one query per user")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--contacts", type=int, default=10_000_000)
+    parser.add_argument("--date", type=date.fromisoformat, default=date(2025, 12, 28))
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "digests.db")
+        engine = create_engine(f"sqlite:///{path}")
+        started = time.perf_counter()
+        seed(engine, args.contacts, args.users, args.seed)
+        print(f"seeded {args.contacts} contacts for {args.users} users in {time.perf_counter() - started:.1f}s")
+        engine.dispose()
+        asyncio.run(compare(path, args.date, args.days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from contacts_api.auth import get_current_user
+from contacts_api.database import Base, get_db, install_sqlite_pragmas
+from contacts_api.main import app
+
+FIELDS = ("first_name", "last_name", "email", "phone", "birthday", "additional_info")
+
+
+def make_rows(count: int):
+    for i in range(count):
+        yield {
+            "first_name": f"First{i}",
+            "last_name": f"Last{i % 1000}",
+            "email": f"contact{i}@example.com",
+            "phone": f"+38050{i:07d}",
+            "birthday": f"19{50 + i % 50}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "additional_info": "imported",
+        }
+
+
+def build_upload(fmt: str, count: int) -> bytes:
+    if fmt == "csv":
+        lines = [",".join(FIELDS)] + [",".join(row[f] for f in FIELDS) for row in make_rows(count)]
+    else:
+        lines = [json.dumps(row) for row in make_rows(count)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def run(fmt: str, count: int, db_path: str) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    install_sqlite_pragmas(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def _get_db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, email="bench@example.com")
+    body = build_upload(fmt, count)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        response = await client.post(
+            "/contacts/bulk", params={"format": fmt}, files={"file": (f"contacts.{fmt}", body)}
+        )
+        elapsed = time.perf_counter() - started
+        result = response.json()
+        print(f"import {fmt:<6} {result['inserted']:>8} rows in {elapsed:6.2f}s  "
+              f"{result['inserted'] / elapsed:>9.0f} rows/s  ({len(body) / 1e6:.1f} MB, {result['failed']} failed)")
+
+        started = time.perf_counter()
+        size = 0
+        async with client.stream("GET", "/contacts/export", params={"format": fmt}) as response:
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"export {fmt:<6} {count:>8} rows in {elapsed:6.2f}s  {count / elapsed:>9.0f} rows/s  "
+              f"({size / 1e6:.1f} MB)")
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="POST /contacts/bulk and GET /contacts/export throughput")
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("csv", "ndjson"):
+            asyncio.run(run(fmt, args.rows, os.path.join(tmp, f"bulk-{fmt}.db")))
+
+
+if __name__ == "__main__":
+    main()
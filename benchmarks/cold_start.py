@@ -0,0 +1,81 @@
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from decouple import config
+
+# Roughly 1.5x the import time measured on a development machine; set it per CI runner.
+COLD_START_BUDGET_MS = config("COLD_START_BUDGET_MS", default=1500, cast=float)
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+FIRST_RESPONSE = """
+import asyncio, time
+started = time.perf_counter()
+from httpx import ASGITransport, AsyncClient
+from contacts_api.main import app
+
+async def first():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.get("/")
+    assert response.status_code == 200
+    print((time.perf_counter() - started) * 1000)
+
+asyncio.run(first())
+"""
+
+
+def import_profile() -> tuple:
+    # Total import time of the app and the self time of every module, from -X importtime.
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import contacts_api.main"],
+                            capture_output=True, text=True, check=True)
+    total, modules = 0, {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        modules[name] = own
+        if len(indent) == 1:
+            total += cumulative
+    return total / 1000, modules
+
+
+def first_response_ms() -> float:
+    result = subprocess.run([sys.executable, "-c", FIRST_RESPONSE], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import time and time to first response of a fresh interpreter")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS,
+                        help="exit non-zero when the median import time is above this")
+    args = parser.parse_args()
+
+    totals, first = [], []
+    self_times = defaultdict(list)
+    for _ in range(args.runs):
+        total, modules = import_profile()
+        totals.append(total)
+        for name, own in modules.items():
+            self_times[name].append(own / 1000)
+        first.append(first_response_ms())
+
+    import_ms = statistics.median(totals)
+    print(f"import contacts_api.main  median {import_ms:.1f} ms  min {min(totals):.1f} ms")
+    print(f"first response            median {statistics.median(first):.1f} ms  min {min(first):.1f} ms")
+    print(f"\n{'module':<48}{'self ms':>10}")
+    ranked = sorted(self_times.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, values in ranked[:args.top]:
+        print(f"{name:<48}{statistics.median(values):>10.1f}")
+
+    if import_ms > args.budget_ms:
+        print(f"REGRESSION import {import_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
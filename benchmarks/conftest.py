@@ -0,0 +1,29 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.datasets import DEFAULT_DATA_DIR, ensure_dataset
+
+# pytest benchmarks -p no:cacheprovider --no-cov [--benchmark-autosave]
+BENCH_DATASET = os.environ.get("BENCH_DATASET", "1k")
+BENCH_DATA_DIR = os.environ.get("BENCH_DATA_DIR", DEFAULT_DATA_DIR)
+
+
+@pytest.fixture(scope="module")
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def dataset_session(event_loop_runner):
+    path = ensure_dataset(BENCH_DATASET, data_dir=BENCH_DATA_DIR)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    session = session_factory()
+    yield session
+    event_loop_runner(session.close())
+    event_loop_runner(engine.dispose())
@@ -0,0 +1,114 @@
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+
+from contacts_api.database import Base
+from contacts_api.models import Contact, User, birthday_key
+from contacts_api.normalization import derived_keys
+from contacts_api.search import resume_insert_indexing, suspend_insert_indexing
+from contacts_api.utils import hash_password
+
+DATASETS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SEED = 7
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "contacts-api-bench")
+BENCH_PASSWORD = "benchmark-password"
+
+FIRST_NAMES = ["Anna", "Bohdan", "Daria", "Ivan", "Johanna", "Jonathan", "Kateryna", "Maria", "Oleh", "Taras"]
+LAST_NAMES = ["Bondarenko", "Brown", "Kovalenko", "Melnyk", "Petrenko", "Shevchenko", "Smith", "Tkachenko"]
+FIRST_BIRTHDAY = date(1950, 1, 1)
+
+
+def user_email(user_id: int) -> str:
+    return f"owner{user_id}@example.com"
+
+
+def contact_rows(count: int, users: int = 1, seed: int = DEFAULT_SEED):
+    rng = random.Random(seed)
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        birthday = (FIRST_BIRTHDAY + timedelta(days=rng.randrange(20_000))).isoformat()
+        row = {
+            "first_name": f"{first}{rng.randint(0, 999)}",
+            "last_name": last,
+            "email": f"contact{i}@example.com",
+            "phone": f"+380{rng.randrange(10 ** 9):09d}",
+            "birthday": birthday,
+            "birthday_md": birthday_key(birthday),
+            "user_id": rng.randint(1, users),
+        }
+        row.update(derived_keys(row))
+        yield row
+
+
+def seed(engine, contacts: int, users: int = 1, seed_value: int = DEFAULT_SEED, batch_size: int = 10_000) -> None:
+    Base.metadata.create_all(engine)
+    # One bcrypt hash shared by every user keeps seeding fast at any size.
+    password = hash_password(BENCH_PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": user_email(i), "password": password, "full_name": f"Owner {i}", "is_verified": True}
+            for i in range(1, users + 1)
+        ])
+        last_id = suspend_insert_indexing(conn)
+        batch = []
+        for row in contact_rows(contacts, users, seed_value):
+            batch.append(row)
+            if len(batch) == batch_size:
+                conn.execute(insert(Contact.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Contact.__table__), batch)
+        resume_insert_indexing(conn, last_id)
+
+
+def schema_fingerprint() -> str:
+    # Part of the file name, so cached datasets are rebuilt after a schema change.
+    columns = [(table.name, [column.name for column in table.columns]) for table in Base.metadata.sorted_tables]
+    return hashlib.blake2b(repr(columns).encode(), digest_size=4).hexdigest()
+
+
+def dataset_path(size: str, users: int = 1, seed_value: int = DEFAULT_SEED, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    return os.path.join(data_dir, f"contacts-{size}-u{users}-s{seed_value}-{schema_fingerprint()}.db")
+
+
+def ensure_dataset(size: str, users: int = 1, seed_value: int = DEFAULT_SEED, data_dir: str = DEFAULT_DATA_DIR) -> str:
+    # Datasets are deterministic, so a file built once is reused by later runs.
+    if size not in DATASETS:
+        raise ValueError(f"Unknown dataset {size}; expected one of {', '.join(DATASETS)}")
+    path = dataset_path(size, users, seed_value, data_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    partial = f"{path}.partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    engine = create_engine(f"sqlite:///{partial}")
+    try:
+        seed(engine, DATASETS[size], users, seed_value)
+    finally:
+        engine.dispose()
+    os.replace(partial, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the seeded SQLite datasets used by the benchmarks")
+    parser.add_argument("sizes", nargs="*", default=["1k"], choices=list(DATASETS))
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+    for size in args.sizes:
+        started = time.perf_counter()
+        path = ensure_dataset(size, args.users, args.seed, args.data_dir)
+        print(f"{size:>5}: {path} ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import orjson
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.datasets import seed
+from contacts_api.cache import unpack_contacts
+from contacts_api.changes import MAX_CHANGES_LIMIT, UPDATED, read_changes
+from contacts_api.models import Contact, ContactTombstone, User, utcnow
+from contacts_api.serialization import ID_POSITION, fetch_contact_rows
+
+FULL_PAGE_SIZE = 1000
+
+
+def apply_changes(engine, edits: int, deletes: int, seed_value: int) -> None:
+    # Everything starts at sequence 1, as after the migration; the edits and deletes are sequence 2.
+    rng = random.Random(seed_value)
+    with Session(engine) as session:
+        ids = list(session.scalars(select(Contact.id)))
+        picked = rng.sample(ids, edits + deletes)
+        session.execute(update(User).values(contacts_generation=2))
+        session.execute(update(Contact).values(change_seq=1))
+        session.execute(update(Contact).where(Contact.id.in_(picked[:edits])).values(additional_info="edited", change_seq=2))
+        session.execute(update(Contact).where(Contact.id.in_(picked[edits:])).values(user_id=None))
+        session.execute(insert(ContactTombstone), [
+            {"user_id": 1, "contact_id": contact_id, "change_seq": 2, "deleted_at": utcnow()} for contact_id in picked[edits:]
+        ])
+        session.commit()
+
+
+async def full_download(session_factory) -> int:
+    # What a client does today: page through GET /contacts/.
+    size, after_id = 0, 0
+    async with session_factory() as session:
+        while True:
+            statement = select(Contact).where(Contact.user_id == 1, Contact.id > after_id).order_by(Contact.id)
+            rows = await fetch_contact_rows(session, statement.limit(FULL_PAGE_SIZE))
+            if not rows:
+                return size
+            size += len(orjson.dumps({"items": unpack_contacts(rows), "next_cursor": None}))
+            after_id = rows[-1][ID_POSITION]
+
+
+async def delta(session_factory) -> int:
+    async with session_factory() as session:
+        return len(orjson.dumps(await read_changes(session, 1, 1, UPDATED, None, False, 2, MAX_CHANGES_LIMIT)))
+
+
+async def measure(label: str, job, repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = await job()
+        timings.append(time.perf_counter() - started)
+    print(f"{label:<16} {size / 1e3:>10.1f} kB   {statistics.median(timings) * 1000:>8.1f} ms")
+
+
+async def run(path: str, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    await measure("full download", lambda: full_download(session_factory), repeat)
+    await measure("delta sync", lambda: delta(session_factory), repeat)
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delta sync vs re-downloading the whole address book")
+    parser.add_argument("--contacts", type=int, default=100_000)
+    parser.add_argument("--edits", type=int, default=100)
+    parser.add_argument("--deletes", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "delta.db")
+        engine = create_engine(f"sqlite:///{path}")
+        seed(engine, args.contacts, 1, args.seed)
+        apply_changes(engine, args.edits, args.deletes, args.seed)
+        engine.dispose()
+        print(f"{args.contacts} contacts, {args.edits} edited and {args.deletes} deleted since the last sync")
+        asyncio.run(run(path, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from itertools import combinations
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.datasets import seed
+from contacts_api.duplicates import SCORED_COLUMNS, candidate_pairs, find_duplicates, score_pair
+from contacts_api.models import Contact
+from contacts_api.normalization import derived_keys
+
+
+def inject_duplicates(engine, share: float, seed_value: int) -> int:
+    # Copies of existing contacts as a second import source would write them:
+    # different email case and +tag, national phone format, sometimes no phone.
+    rng = random.Random(seed_value)
+    with Session(engine) as session:
+        total = session.scalar(select(Contact.id).order_by(Contact.id.desc()).limit(1))
+        picked = rng.sample(range(1, total + 1), int(total * share))
+        rows = []
+        for contact in session.scalars(select(Contact).where(Contact.id.in_(picked))):
+            local, _, domain = contact.email.partition("@")
+            row = {
+                "first_name": contact.first_name,
+                "last_name": contact.last_name,
+                "email": f"{local.capitalize()}+import@{domain}",
+                "phone": "0" + contact.phone[4:] if rng.random() < 0.7 else None,
+                "birthday": contact.birthday,
+                "birthday_md": contact.birthday_md,
+                "user_id": contact.user_id,
+            }
+            row.update(derived_keys(row))
+            rows.append(row)
+        session.execute(insert(Contact.__table__), rows)
+        session.commit()
+    return len(rows)
+
+
+async def detect(path: str, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with AsyncSession(engine) as session:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            pairs = await candidate_pairs(session, 1)
+            blocked = time.perf_counter()
+            report = await find_duplicates(session, 1, limit=1_000_000)
+            timings.append((blocked - started, time.perf_counter() - blocked))
+        print(f"candidate pairs     {len(pairs):>10}   {min(t[0] for t in timings) * 1000:>8.0f} ms")
+        print(f"scored duplicates   {len(report['pairs']):>10}   {min(t[1] for t in timings) * 1000:>8.0f} ms (blocks + scoring)")
+    await engine.dispose()
+
+
+def pairwise_estimate(engine, total: int, sample: int) -> float:
+    # What comparing every pair would cost: time a sample, scale by the pair count.
+    names = [column.key for column in SCORED_COLUMNS]
+    with Session(engine) as session:
+        rows = [dict(zip(names, row)) for row in session.execute(select(*SCORED_COLUMNS).limit(sample))]
+    started = time.perf_counter()
+    for a, b in combinations(rows, 2):
+        score_pair(a, b)
+    per_pair = (time.perf_counter() - started) / (sample * (sample - 1) / 2)
+    return per_pair * total * (total - 1) / 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Blocking-key duplicate detection vs comparing every pair")
+    parser.add_argument("--contacts", type=int, default=500_000)
+    parser.add_argument("--duplicates", type=float, default=0.02, help="share of contacts that get a duplicate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "duplicates.db")
+        engine = create_engine(f"sqlite:///{path}")
+        started = time.perf_counter()
+        seed(engine, args.contacts, 1, args.seed)
+        injected = inject_duplicates(engine, args.duplicates, args.seed)
+        total = args.contacts + injected
+        print(f"seeded {total} contacts ({injected} duplicates) in {time.perf_counter() - started:.1f}s")
+        asyncio.run(detect(path, args.repeat))
+        estimate = pairwise_estimate(engine, total, args.sample)
+        print(f"all pairs (estimate){total * (total - 1) // 2:>10}   {estimate:>8.0f} s")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import os
+import socket
+import tempfile
+import time
+
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from fastapi_mail import ConnectionConfig
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from contacts_api.database import Base
+from contacts_api.models import EmailOutbox
+from contacts_api.outbox import OutboxWorker, enqueue_email
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def local_mail_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="noreply@example.com",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+    )
+
+
+async def connection_per_message(worker: OutboxWorker, count: int) -> float:
+    # What fastapi-mail does for every send: connect, deliver, quit.
+    mail = worker.mail_config
+    started = time.perf_counter()
+    for i in range(count):
+        item = EmailOutbox(recipient=f"user{i}@example.com", subject="Reset", body="<p>link</p>")
+        async with aiosmtplib.SMTP(hostname=mail.MAIL_SERVER, port=mail.MAIL_PORT, start_tls=False) as smtp:
+            await smtp.send_message(worker._build_message(item))
+    return time.perf_counter() - started
+
+
+async def outbox(worker: OutboxWorker, session_factory, count: int) -> float:
+    async with session_factory() as session:
+        for i in range(count):
+            await enqueue_email(session, f"user{i}@example.com", "Reset", "<p>link</p>")
+        await session.commit()
+    started = time.perf_counter()
+    while await worker.run_once():
+        pass
+    await worker.close()
+    return time.perf_counter() - started
+
+
+async def run(count: int, batch_size: int, db_path: str) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    controller = Controller(Sink(), hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        worker = OutboxWorker(session_factory, local_mail_config(controller.port), batch_size=batch_size)
+        elapsed = await connection_per_message(worker, count)
+        print(f"connection per message  {count:>6} emails in {elapsed:6.2f}s  {count / elapsed:>8.0f} msg/s")
+        elapsed = await outbox(worker, session_factory, count)
+        stats = worker.metrics.snapshot()
+        print(f"outbox worker           {count:>6} emails in {elapsed:6.2f}s  {count / elapsed:>8.0f} msg/s  "
+              f"({stats['batches']} batches, {stats['connections']} connection)")
+    finally:
+        controller.stop()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SMTP delivery throughput against a local aiosmtpd server")
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args.emails, args.batch_size, os.path.join(tmp, "outbox.db")))
+
+
+if __name__ == "__main__":
+    main()
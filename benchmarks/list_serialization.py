@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.datasets import seed
+from contacts_api.models import Contact
+from contacts_api.schemas import ContactResponse
+from contacts_api.serialization import contacts_response, fetch_contact_rows
+
+
+def build_app(session_factory, rows: int) -> FastAPI:
+    bench = FastAPI()
+
+    async def get_db():
+        async with session_factory() as session:
+            yield session
+
+    statement = select(Contact).where(Contact.user_id == 1).order_by(Contact.id).limit(rows)
+
+    @bench.get("/orm", response_model=List[ContactResponse])
+    async def orm_objects(db: AsyncSession = Depends(get_db)):
+        # The previous path: ORM entities re-validated by response_model and encoded by FastAPI.
+        return (await db.scalars(statement)).all()
+
+    @bench.get("/tuples")
+    async def column_tuples(db: AsyncSession = Depends(get_db)):
+        return contacts_response(await fetch_contact_rows(db, statement))
+
+    return bench
+
+
+async def time_path(client: AsyncClient, path: str, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return statistics.median(timings[1:]) * 1000, len(response.json()), len(response.content)
+
+
+async def time_query(session_factory, rows: int, repeat: int) -> tuple:
+    statement = select(Contact).where(Contact.user_id == 1).order_by(Contact.id).limit(rows)
+    entity, columns = [], []
+    for _ in range(repeat):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            (await session.scalars(statement)).all()
+            entity.append(time.perf_counter() - started)
+        async with session_factory() as session:
+            started = time.perf_counter()
+            await fetch_contact_rows(session, statement)
+            columns.append(time.perf_counter() - started)
+    return statistics.median(entity) * 1000, statistics.median(columns) * 1000
+
+
+async def run(path: str, rows: int, repeat: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    try:
+        entity_ms, column_ms = await time_query(session_factory, rows, repeat)
+        print(f"query only       ORM entities {entity_ms:8.1f} ms   column tuples {column_ms:8.1f} ms")
+        async with AsyncClient(transport=ASGITransport(app=build_app(session_factory, rows)), base_url="http://bench") as client:
+            orm_ms, count, size = await time_path(client, "/orm", repeat)
+            fast_ms, fast_count, fast_size = await time_path(client, "/tuples", repeat)
+        assert (count, size) == (fast_count, fast_size)
+        print(f"{count} contacts, {size / 1e6:.1f} MB of JSON")
+        print(f"full response    ORM + response_model {orm_ms:8.1f} ms")
+        print(f"full response    tuples + orjson      {fast_ms:8.1f} ms   {orm_ms / fast_ms:5.1f}x faster")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cost of serializing large contact lists")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "serialization.db")
+        engine = create_engine(f"sqlite:///{path}")
+        seed(engine, args.rows)
+        engine.dispose()
+        asyncio.run(run(path, args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
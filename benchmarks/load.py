@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from unittest.mock import AsyncMock
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from benchmarks.datasets import (
+    DATASETS,
+    DEFAULT_DATA_DIR,
+    DEFAULT_SEED,
+    FIRST_NAMES,
+    LAST_NAMES,
+    ensure_dataset,
+    user_email,
+)
+from contacts_api import auth
+from contacts_api.cache import MemoryBackend, contact_cache
+from contacts_api.database import get_db
+from contacts_api.main import app
+from contacts_api.models import Contact
+from contacts_api.resources import resources
+
+DEFAULT_TRAFFIC = os.path.join(os.path.dirname(__file__), "traffic.jsonl")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def load_traffic(path: str) -> list:
+    # One request template per line: name, method, path, optional params/json and a weight.
+    scenarios = []
+    with open(path, encoding="utf-8") as traffic:
+        for number, line in enumerate(traffic, 1):
+            if not line.strip():
+                continue
+            scenario = json.loads(line)
+            if "method" not in scenario or "path" not in scenario:
+                raise ValueError(f"{path}:{number}: each request needs a method and a path")
+            scenario.setdefault("name", f"{scenario['method']} {scenario['path']}")
+            scenarios.append(scenario)
+    return scenarios
+
+
+def expand(value, variables: dict):
+    if isinstance(value, str):
+        match = PLACEHOLDER.fullmatch(value)
+        if match:
+            return variables[match.group(1)]
+        return PLACEHOLDER.sub(lambda m: str(variables[m.group(1)]), value)
+    if isinstance(value, dict):
+        return {key: expand(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item, variables) for item in value]
+    return value
+
+
+def build_plan(scenarios: list, contact_ids: list, count: int, seed_value: int) -> list:
+    rng = random.Random(seed_value)
+    weights = [scenario.get("weight", 1) for scenario in scenarios]
+    plan = []
+    for n, scenario in enumerate(rng.choices(scenarios, weights, k=count)):
+        variables = {
+            "n": n,
+            "contact_id": rng.choice(contact_ids),
+            "name_prefix": rng.choice(FIRST_NAMES)[:4].lower(),
+            "last_name": rng.choice(LAST_NAMES),
+        }
+        plan.append({
+            "name": scenario["name"],
+            "method": scenario["method"],
+            "url": expand(scenario["path"], variables),
+            "params": expand(scenario.get("params"), variables),
+            "json": expand(scenario.get("json"), variables),
+        })
+    return plan
+
+
+def percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+async def replay(client: AsyncClient, plan: list, concurrency: int) -> tuple:
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    queue = iter(plan)
+
+    async def worker():
+        for item in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    item["method"], item["url"], params=item["params"], json=item["json"]
+                )
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies[item["name"]].append(time.perf_counter() - started)
+            statuses[item["name"]][status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    source = ensure_dataset(args.dataset, args.users, args.seed, args.data_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Writes go to a copy so every run starts from the same data.
+        path = shutil.copy(source, os.path.join(tmp, "load.db"))
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        async def _get_db():
+            async with session_factory() as session:
+                yield session
+
+        async with session_factory() as session:
+            contact_ids = list((await session.scalars(select(Contact.id).where(Contact.user_id == 1))).all())
+
+        scenarios = load_traffic(args.traffic)
+        plan = build_plan(scenarios, contact_ids, args.warmup + args.requests, args.seed)
+        app.dependency_overrides[get_db] = _get_db
+        resources.redis = AsyncMock(get=AsyncMock(return_value=None))
+        contact_cache.backend = MemoryBackend() if args.cache == "memory" else None
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': user_email(1)})}"}
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://load", headers=headers) as client:
+                await replay(client, plan[:args.warmup], args.concurrency)
+                latencies, statuses, elapsed = await replay(client, plan[args.warmup:], args.concurrency)
+        finally:
+            app.dependency_overrides.clear()
+            await engine.dispose()
+
+    report = {
+        "meta": {
+            "dataset": args.dataset,
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "traffic": os.path.basename(args.traffic),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "overall": summarize([value for values in latencies.values() for value in values], elapsed),
+        "scenarios": {},
+    }
+    for name in sorted(latencies):
+        report["scenarios"][name] = {
+            **summarize(latencies[name], elapsed),
+            "statuses": dict(sorted(statuses[name].items())),
+        }
+    return report
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print(f"dataset {meta['dataset']}, {meta['requests']} requests, concurrency {meta['concurrency']}, cache {meta['cache']}")
+    print(f"{'scenario':<24} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    rows = list(report["scenarios"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        statuses = " ".join(f"{code}:{count}" for code, count in stats.get("statuses", {}).items())
+        print(f"{name:<24} {stats['requests']:>8} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}  {statuses}")
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    # Latency may grow and throughput may drop by `tolerance` before a run counts as a regression.
+    regressions = []
+    if baseline["meta"].get("dataset") != report["meta"]["dataset"]:
+        print(f"warning: baseline was recorded on dataset {baseline['meta'].get('dataset')}")
+    print(f"{'vs baseline':<24} {'req/s':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    names = ["overall"] + [name for name in report["scenarios"] if name in baseline["scenarios"]]
+    for name in names:
+        current = report["overall"] if name == "overall" else report["scenarios"][name]
+        previous = baseline["overall"] if name == "overall" else baseline["scenarios"][name]
+        deltas = {key: _delta(current[key], previous[key]) for key in ("rps", "p95_ms", "p99_ms")}
+        print(f"{name:<24} {deltas['rps']:>+9.1%} {deltas['p95_ms']:>+9.1%} {deltas['p99_ms']:>+9.1%}")
+        if deltas["p95_ms"] > tolerance:
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if name == "overall" and deltas["rps"] < -tolerance:
+            regressions.append(f"{name}: {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return regressions
+
+
+def _delta(current: float, previous: float) -> float:
+    return (current - previous) / previous if previous else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay JSONL traffic against the app in-process and report latency")
+    parser.add_argument("--dataset", default="1k", choices=list(DATASETS))
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--traffic", default=DEFAULT_TRAFFIC)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cache", choices=["off", "memory"], default="off")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, help="compare against a saved report")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="save this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
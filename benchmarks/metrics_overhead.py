@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event, text
+
+from contacts_api.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    RequestStats,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    current_request,
+)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/contacts/{contact_id}")
+    async def get_contact(contact_id: int) -> dict:
+        return {"id": contact_id}
+
+    return app
+
+
+async def per_request(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/contacts/7", "raw_path": b"/contacts/7", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(500):
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def per_query(queries: int, instrumented: bool) -> float:
+    engine = create_engine("sqlite://")
+    if instrumented:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    token = current_request.set(RequestStats())
+    try:
+        with engine.connect() as connection:
+            statement = text("SELECT 1")
+            started = time.perf_counter()
+            for _ in range(queries):
+                connection.execute(statement)
+            return (time.perf_counter() - started) / queries
+    finally:
+        current_request.reset(token)
+        engine.dispose()
+
+
+async def run(requests: int, queries: int) -> None:
+    bare = build_app()
+    plain = min([await per_request(bare, requests) for _ in range(3)])
+    print(f"{'request without middleware':<40}{plain * 1e6:7.1f} µs")
+    for server_timing in (False, True):
+        wrapped = MetricsMiddleware(bare, registry=MetricsRegistry(), server_timing=server_timing)
+        measured = min([await per_request(wrapped, requests) for _ in range(3)])
+        label = "request with middleware + Server-Timing" if server_timing else "request with middleware"
+        print(f"{label:<40}{measured * 1e6:7.1f} µs  overhead {(measured - plain) * 1e6:5.1f} µs")
+
+    plain = min(per_query(queries, instrumented=False) for _ in range(3))
+    measured = min(per_query(queries, instrumented=True) for _ in range(3))
+    print(f"{'SELECT 1 without query hooks':<40}{plain * 1e6:7.1f} µs")
+    print(f"{'SELECT 1 with query hooks':<40}{measured * 1e6:7.1f} µs  overhead {(measured - plain) * 1e6:5.1f} µs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-request cost of the metrics middleware and SQL hooks")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.queries))
+
+
+if __name__ == "__main__":
+    main()
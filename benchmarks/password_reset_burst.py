@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import statistics
+from unittest.mock import AsyncMock
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.async_db_latency import percentile
+from contacts_api import auth
+from contacts_api.database import Base, get_db
+from contacts_api.main import app
+from contacts_api.models import User
+from contacts_api.resources import resources
+from contacts_api.utils import PasswordHasher, hash_password
+
+EMAIL = "bench@example.com"
+
+
+class InlineHasher:
+    # The previous behaviour: bcrypt called directly on the event loop.
+    async def hash(self, password: str) -> str:
+        return hash_password(password)
+
+
+async def run(hasher, resets: int, probe_rps: float, duration: float) -> dict:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with SessionLocal() as session:
+        session.add(User(email=EMAIL, password=hash_password("initial"), full_name="Bench", is_verified=True))
+        await session.commit()
+
+    async def _get_db():
+        async with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    resources.redis = AsyncMock(get=AsyncMock(return_value=None))
+    auth.password_hasher = hasher
+    token = auth.create_access_token({"sub": EMAIL})
+    probes, reset_times = [], []
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        loop = asyncio.get_running_loop()
+        origin = loop.time()
+
+        async def probe(index):
+            scheduled = origin + index / probe_rps
+            await asyncio.sleep(max(0.0, scheduled - loop.time()))
+            (await client.get("/")).raise_for_status()
+            probes.append((loop.time() - scheduled) * 1000)
+
+        async def reset(index):
+            payload = {"token": token, "new_password": f"password-{index}"}
+            (await client.post("/auth/reset-password", json=payload)).raise_for_status()
+            reset_times.append(loop.time() - origin)
+
+        await asyncio.gather(
+            *(probe(index) for index in range(int(probe_rps * duration))),
+            *(reset(index) for index in range(resets)),
+        )
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    return {"probes": probes, "resets_done": max(reset_times)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency of GET / during a burst of password resets")
+    parser.add_argument("--resets", type=int, default=16)
+    parser.add_argument("--probe-rps", type=float, default=50.0)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for name, hasher in (("bcrypt on the event loop", InlineHasher()), ("PasswordHasher (thread pool)", PasswordHasher())):
+        result = asyncio.run(run(hasher, args.resets, args.probe_rps, args.duration))
+        probes = result["probes"]
+        print(
+            f"{name:<30} resets done in {result['resets_done']:5.2f}s  "
+            f"GET / p50={statistics.median(probes):7.1f}ms p99={percentile(probes, 99):7.1f}ms "
+            f"max={max(probes):7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
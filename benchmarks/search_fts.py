@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.datasets import seed
+from contacts_api.search import search_statement
+
+QUERIES = [
+    {"q": "shevch"},
+    {"q": "jonath"},
+    {"last_name": "kovalenko"},
+    {"first_name": "daria", "last_name": "melnyk"},
+    {"email": "contact12345"},
+    {"q": "daria123"},
+    {"q": "nobody-matches"},
+    {"q": "shevcenko", "fuzzy": True},
+]
+
+
+def time_query(engine, dialect: str, params: dict, user_id: int, repeat: int) -> tuple:
+    timings = []
+    with Session(engine) as session:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = session.scalars(search_statement(dialect, user_id, limit=50, **params)).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FTS5 trigram search vs ilike scan")
+    parser.add_argument("--contacts", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        started = time.perf_counter()
+        seed(engine, args.contacts, args.users, args.seed)
+        print(f"seeded {args.contacts} contacts in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':<45} {'ilike ms':>10} {'fts ms':>10} {'speedup':>8}")
+        for params in QUERIES:
+            # The ilike path has no fuzzy mode; time its plain substring scan instead.
+            ilike_params = {k: v for k, v in params.items() if k != "fuzzy"}
+            ilike_ms, _ = time_query(engine, "default", ilike_params, 1, args.repeat)
+            fts_ms, hits = time_query(engine, "sqlite", params, 1, args.repeat)
+            label = ", ".join(f"{k}={v}" for k, v in params.items()) + f" ({hits} hits)"
+            print(f"{label:<45} {ilike_ms:>10.2f} {fts_ms:>10.2f} {ilike_ms / fts_ms:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from contacts_api.auth import create_access_token, token_codec
+from contacts_api.birthdays import upcoming_birthdays_statement
+from contacts_api.models import Contact
+from contacts_api.schemas import ContactCreate, ContactResponse
+from contacts_api.search import search_statement
+from contacts_api.utils import pwd_context
+
+pytest.importorskip("pytest_benchmark")
+
+CONTACT_PAYLOAD = {
+    "first_name": "Daria",
+    "last_name": "Melnyk",
+    "email": "Daria.Melnyk@Example.com",
+    "phone": "+380501234567",
+    "birthday": "1990-05-17",
+    "additional_info": "met at the conference",
+}
+
+
+def test_contact_create_validation(benchmark):
+    contact = benchmark(ContactCreate.model_validate, CONTACT_PAYLOAD)
+    assert contact.email.endswith("@example.com")
+
+
+def test_contact_response_serialization(benchmark):
+    row = Contact(id=1, user_id=1, **CONTACT_PAYLOAD)
+    body = benchmark(lambda: ContactResponse.model_validate(row).model_dump_json())
+    assert '"id":1' in body
+
+
+def test_jwt_encode(benchmark):
+    assert benchmark(create_access_token, {"sub": "owner1@example.com"})
+
+
+def test_jwt_decode_uncached(benchmark):
+    token = create_access_token({"sub": "owner1@example.com"})
+    claims = benchmark(token_codec.backend.decode, token, token_codec.key, [token_codec.algorithm])
+    assert claims["sub"] == "owner1@example.com"
+
+
+def test_jwt_decode_cached(benchmark):
+    token = create_access_token({"sub": "owner1@example.com"})
+    token_codec.decode(token)
+    assert benchmark(token_codec.decode, token)["sub"] == "owner1@example.com"
+
+
+def test_password_hash(benchmark):
+    # bcrypt is deliberately slow; a few rounds are enough for a stable figure.
+    hashed = benchmark.pedantic(pwd_context.hash, args=("benchmark-password",), rounds=3, iterations=1)
+    assert pwd_context.verify("benchmark-password", hashed)
+
+
+def _query(benchmark, event_loop_runner, session, statement):
+    async def run():
+        return (await session.scalars(statement)).all()
+
+    return benchmark(lambda: event_loop_runner(run()))
+
+
+def test_list_contacts_page(benchmark, event_loop_runner, dataset_session):
+    statement = select(Contact).where(Contact.user_id == 1, Contact.id > 100).order_by(Contact.id).limit(101)
+    assert len(_query(benchmark, event_loop_runner, dataset_session, statement)) == 101
+
+
+def test_get_contact(benchmark, event_loop_runner, dataset_session):
+    statement = select(Contact).where(Contact.id == 42, Contact.user_id == 1)
+    assert len(_query(benchmark, event_loop_runner, dataset_session, statement)) == 1
+
+
+@pytest.mark.parametrize("params", [{"q": "shevch"}, {"last_name": "melnyk", "first_name": "dar"}, {"q": "nobody-matches"}])
+def test_search_contacts(benchmark, event_loop_runner, dataset_session, params):
+    statement = search_statement("sqlite", 1, limit=50, **params)
+    _query(benchmark, event_loop_runner, dataset_session, statement)
+
+
+def test_upcoming_birthdays(benchmark, event_loop_runner, dataset_session):
+    statement = upcoming_birthdays_statement(1, date(2024, 6, 1), 30)
+    assert _query(benchmark, event_loop_runner, dataset_session, statement)
@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from unittest.mock import AsyncMock
+
+from fastapi import Depends, FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from benchmarks.datasets import DATASETS, DEFAULT_DATA_DIR, ensure_dataset, user_email
+from contacts_api import auth
+from contacts_api.cache import contact_cache
+from contacts_api.conditional import bump_contacts_generation
+from contacts_api.database import get_db
+from contacts_api.main import app
+from contacts_api.metrics import MetricsMiddleware, MetricsRegistry, metrics
+from contacts_api.models import Contact
+from contacts_api.resources import resources
+from contacts_api.schemas import ContactCreate, ContactResponse, ContactUpdate
+from contacts_api.user_cache import CurrentUser
+
+
+def build_legacy_app() -> FastAPI:
+    # The previous write path: load the entity, set attributes, commit, refresh.
+    legacy = FastAPI()
+
+    async def load(db: AsyncSession, user_id: int, contact_id: int) -> Contact:
+        contact = await db.scalar(select(Contact).where(Contact.id == contact_id, Contact.user_id == user_id))
+        if not contact:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        return contact
+
+    async def write(db: AsyncSession, user_id: int, contact_id: int, changes: dict) -> Contact:
+        contact = await load(db, user_id, contact_id)
+        for key, value in changes.items():
+            setattr(contact, key, value)
+        await bump_contacts_generation(db, user_id)
+        await db.commit()
+        await contact_cache.invalidate(user_id)
+        await db.refresh(contact)
+        return contact
+
+    @legacy.put("/contacts/{contact_id}", response_model=ContactResponse)
+    async def update_contact(contact_id: int, contact: ContactCreate, db: AsyncSession = Depends(get_db),
+                             current_user: CurrentUser = Depends(auth.get_current_user)):
+        return await write(db, current_user.id, contact_id, contact.model_dump())
+
+    @legacy.patch("/contacts/{contact_id}", response_model=ContactResponse)
+    async def patch_contact(contact_id: int, contact: ContactUpdate, db: AsyncSession = Depends(get_db),
+                            current_user: CurrentUser = Depends(auth.get_current_user)):
+        return await write(db, current_user.id, contact_id, contact.model_dump(exclude_unset=True))
+
+    @legacy.delete("/contacts/{contact_id}")
+    async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db),
+                             current_user: CurrentUser = Depends(auth.get_current_user)):
+        contact = await load(db, current_user.id, contact_id)
+        await db.delete(contact)
+        await bump_contacts_generation(db, current_user.id)
+        await db.commit()
+        await contact_cache.invalidate(current_user.id)
+        return {"message": "Contact deleted successfully"}
+
+    return legacy
+
+
+async def measure(label: str, asgi, registry: MetricsRegistry, contact_ids: list, headers: dict) -> None:
+    registry.reset()
+    ids = iter(contact_ids)
+    requests = len(contact_ids) // 3
+    timings = {"PUT": 0.0, "PATCH": 0.0, "DELETE": 0.0}
+    async with AsyncClient(transport=ASGITransport(app=asgi), base_url="http://bench", headers=headers) as client:
+        for n in range(requests):
+            calls = (
+                ("PUT", next(ids), {"first_name": "Ivan", "last_name": "Melnyk", "email": f"put{n}@example.com",
+                                    "phone": "+380500000000", "birthday": "1990-05-17"}),
+                ("PATCH", next(ids), {"phone": f"+380{n:09d}"}),
+                ("DELETE", next(ids), None),
+            )
+            for method, contact_id, body in calls:
+                started = time.perf_counter()
+                response = await client.request(method, f"/contacts/{contact_id}", json=body)
+                timings[method] += time.perf_counter() - started
+                if response.status_code != 200:
+                    raise RuntimeError(f"{label} {method} returned {response.status_code}: {response.text}")
+    for method, elapsed in timings.items():
+        histogram = registry.db_queries[(method, "/contacts/{contact_id}")]
+        print(f"{label:<8}{method:<8}{histogram.sum / histogram.count:>12.1f}{elapsed / requests * 1000:>12.2f}")
+
+
+async def run(size: str, requests: int) -> None:
+    source = ensure_dataset(size, data_dir=DEFAULT_DATA_DIR)
+    resources.redis = AsyncMock(get=AsyncMock(return_value=None))
+    contact_cache.backend = None
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': user_email(1)})}"}
+    print(f"{'path':<8}{'method':<8}{'statements':>12}{'ms/request':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label in ("legacy", "single"):
+            # Each variant writes to its own copy of the dataset.
+            path = shutil.copy(source, os.path.join(tmp, f"{label}.db"))
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+            async def _get_db():
+                async with session_factory() as session:
+                    yield session
+
+            try:
+                async with session_factory() as session:
+                    contact_ids = list((await session.scalars(
+                        select(Contact.id).where(Contact.user_id == 1).order_by(Contact.id).limit(requests * 3)
+                    )).all())
+                if label == "legacy":
+                    registry = MetricsRegistry()
+                    target = build_legacy_app()
+                    target.dependency_overrides[get_db] = _get_db
+                    asgi = MetricsMiddleware(target, registry=registry)
+                else:
+                    registry, asgi = metrics, app
+                    app.dependency_overrides[get_db] = _get_db
+                await measure(label, asgi, registry, contact_ids, headers)
+            finally:
+                app.dependency_overrides.clear()
+                await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SQL statements and latency per contact write, before and after")
+    parser.add_argument("--dataset", default="1k", choices=list(DATASETS))
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(run(args.dataset, args.requests))
+
+
+if __name__ == "__main__":
+    main()
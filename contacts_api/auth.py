@@ -1,85 +1,124 @@
-import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from decouple import config
-from sqlalchemy.orm import Session
-from cloudinary.uploader import upload
-from cloudinary.utils import cloudinary_url
-import cloudinary
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from contacts_api.avatars import UPLOAD_OPENAPI, avatar_pipeline, receive_upload
 from contacts_api.database import get_db
+from contacts_api.metrics import timed_redis
 from contacts_api.models import User
+from contacts_api.rate_limit import client_ip, rate_limiter
+from contacts_api.resources import resources
 from contacts_api.schemas import ForgotPasswordSchema, ResetPasswordSchema
-from contacts_api.utils import hash_password
-from contacts_api.email_utils import send_email
+from contacts_api.utils import password_hasher
+from contacts_api.outbox import enqueue_email, outbox_worker
+from contacts_api.tokens import TokenCodec, TokenError
+from contacts_api.user_cache import CurrentUser, publish_invalidation, user_cache
 from datetime import datetime, timedelta, timezone
-import redis.asyncio as redis
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-cloudinary.config(
-    cloud_name=config("CLOUDINARY_CLOUD_NAME"),
-    api_key=config("CLOUDINARY_API_KEY"),
-    api_secret=config("CLOUDINARY_API_SECRET")
-)
-
 SECRET_KEY = config("SECRET_KEY", default="supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-redis_client = redis.Redis(host="localhost", port=6379, decode_responses=True)
+token_codec = TokenCodec(SECRET_KEY, ALGORITHM)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 auth_router = APIRouter()
 
+async def invalidate_cached_user(email: str) -> None:
+    try:
+        await timed_redis("delete", resources.redis.delete(email))
+        logger.info(f"Deleted Redis cache for email: {email}")
+    except Exception as e:
+        logger.error(f"Failed to delete Redis cache for email: {email}. Error: {e}")
+    await publish_invalidation(resources.redis, email)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    issued_at = datetime.now(timezone.utc)
+    expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": int(issued_at.timestamp())})
+    return token_codec.encode(to_encode)
+
+async def auth_rate_limit(request: Request) -> None:
+    # Unauthenticated endpoints are limited per client address.
+    if rate_limiter.enabled:
+        await rate_limiter.enforce(resources.redis, request, "auth", client_ip(request))
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+    request: Request = None,
+) -> CurrentUser:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_codec.decode(token)
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
 
-        try:
-            user_data = await redis_client.get(email)
-            if user_data:
-                logger.info(f"User data retrieved from Redis for {email}")
-                return User(**json.loads(user_data))
-        except Exception as e:
-            logger.error(f"Redis error while retrieving user data for {email}: {e}")
-
-        user = db.query(User).filter(User.email == email).first()
+        iat = payload.get("iat")
+        route_class = rate_limiter.route_class(request)
+        current_user = user_cache.get(email, iat)
+        if current_user is not None:
+            if route_class:
+                await rate_limiter.enforce(resources.redis, request, route_class, email)
+            return current_user
+
+        user_data = None
+        if route_class:
+            # The limiter and the cached user share one pipelined round trip.
+            user_data = await rate_limiter.enforce(resources.redis, request, route_class, email, fetch=email)
+        else:
+            try:
+                user_data = await timed_redis("get", resources.redis.get(email))
+            except Exception as e:
+                logger.error(f"Redis error while retrieving user data for {email}: {e}")
+        if user_data:
+            current_user = CurrentUser(**json.loads(user_data))
+            user_cache.put(email, iat, current_user)
+            return current_user
+
+        user = await db.scalar(select(User).where(User.email == email))
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
 
-        await redis_client.setex(
-            email,
-            ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            json.dumps({
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "is_verified": user.is_verified,
-            }),
-        )
-        logger.info(f"User data cached in Redis for {email}")
-        return user
-    except JWTError:
+        current_user = CurrentUser.from_user(user)
+        try:
+            await timed_redis("setex", resources.redis.setex(email, ACCESS_TOKEN_EXPIRE_MINUTES * 60, json.dumps(current_user.to_dict())))
+            logger.info(f"User data cached in Redis for {email}")
+        except Exception as e:
+            logger.error(f"Failed to cache user data in Redis for {email}: {e}")
+        user_cache.put(email, iat, current_user)
+        return current_user
+    except TokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-@auth_router.post("/forgot-password")
-async def forgot_password(payload: ForgotPasswordSchema, db: Session = Depends(get_db)) -> dict:
-    user = db.query(User).filter(User.email == payload.email).first()
+@auth_router.post("/login", dependencies=[Depends(auth_rate_limit)])
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)) -> dict:
+    user = await db.scalar(select(User).where(User.email == form.username))
+    if user is None:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+
+    verified, new_hash = await password_hasher.verify_and_update(form.password, user.password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+        logger.info(f"Password hash upgraded for {user.email}")
+
+    return {"access_token": create_access_token({"sub": user.email}), "token_type": "bearer"}
+
+
+@auth_router.post("/forgot-password", dependencies=[Depends(auth_rate_limit)])
+async def forgot_password(payload: ForgotPasswordSchema, db: AsyncSession = Depends(get_db)) -> dict:
+    user = await db.scalar(select(User).where(User.email == payload.email))
     if not user:
         logger.warning(f"Password reset requested for non-existing user: {payload.email}")
         raise HTTPException(status_code=404, detail="User not found")
@@ -88,69 +127,73 @@ async def forgot_password(payload: ForgotPasswordSchema, db: Session = Depends(g
     reset_link = f"http://127.0.0.1:8000/auth/reset-password?token={reset_token}"
     logger.info(f"Generated reset token for email: {user.email}")
 
-    await send_email(
-        "Сброс пароля",
+    await enqueue_email(
+        db,
         user.email,
+        "Сброс пароля",
         f"<h1>Сброс пароля</h1><p>Для сброса пароля перейдите по ссылке:</p><a href='{reset_link}'>Сбросить пароль</a>",
+        dedupe_key=f"password-reset:{user.email}",
     )
-    logger.info(f"Password reset link sent to {user.email}")
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request queued the reset for this address first.
+        await db.rollback()
+    outbox_worker.notify()
+    logger.info(f"Password reset link queued for {user.email}")
 
     return {"message": "Password reset link sent to your email"}
 
 
-@auth_router.post("/reset-password")
-async def reset_password(payload: ResetPasswordSchema, db: Session = Depends(get_db)) -> dict:
+@auth_router.post("/reset-password", dependencies=[Depends(auth_rate_limit)])
+async def reset_password(payload: ResetPasswordSchema, db: AsyncSession = Depends(get_db)) -> dict:
     try:
-        payload_data = jwt.decode(payload.token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload_data = token_codec.decode(payload.token)
         email: str = payload_data.get("sub")
         if email is None:
             raise HTTPException(status_code=400, detail="Invalid token")
-    except JWTError as e:
+    except TokenError as e:
         logger.error(f"JWT decode error: {e}")
         raise HTTPException(status_code=400, detail="Invalid token")
 
     try:
-        cached_data = await redis_client.get(email)
+        cached_data = await timed_redis("get", resources.redis.get(email))
         if cached_data:
             logger.info(f"Retrieved cached data for {email}")
     except Exception as e:
         logger.error(f"Failed to retrieve cache for {email}: {e}")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.password = hash_password(payload.new_password)
-    db.commit()
+    user.password = await password_hasher.hash(payload.new_password)
+    await db.commit()
     logger.info(f"Password updated for email: {email}")
 
-    try:
-        await redis_client.delete(email)
-        logger.info(f"Deleted Redis cache for email: {email}")
-    except Exception as e:
-        logger.error(f"Failed to delete Redis cache for email: {email}. Error: {e}")
+    await invalidate_cached_user(email)
 
     return {"message": "Password has been reset successfully"}
 
 
-@auth_router.post("/upload-avatar")
+@auth_router.post("/upload-avatar", openapi_extra=UPLOAD_OPENAPI)
 async def upload_avatar(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
-    if file.content_type not in ["image/jpeg", "image/png"]:
-        raise HTTPException(status_code=400, detail="Invalid file type")
-
+    spool = await receive_upload(request)
+    logger.info(f"Uploading avatar for {current_user.email}")
     try:
-        logger.info(f"Uploading avatar for {current_user.email}")
-        
-        result = await asyncio.to_thread(upload, file.file)
-        logger.info(f"Upload result: {result}")
-        
-        url, _ = cloudinary_url(result["public_id"], format="jpg")
-        logger.info(f"Generated URL: {url}")
-
-        return {"avatar_url": url}
+        url = await avatar_pipeline.process(current_user.id, spool)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to upload avatar for {current_user.email}. Error: {e}")
         raise HTTPException(status_code=500, detail="Failed to upload avatar")
+
+    await db.execute(update(User).where(User.id == current_user.id).values(avatar_url=url))
+    await db.commit()
+    await invalidate_cached_user(current_user.email)
+    logger.info(f"Avatar for {current_user.email} stored at {url}")
+    return {"avatar_url": url}
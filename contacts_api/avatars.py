@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+from typing import Optional
+
+from decouple import config
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+AVATAR_MAX_BYTES = config("AVATAR_MAX_BYTES", default=5 * 1024 * 1024, cast=int)
+AVATAR_MAX_PIXELS = config("AVATAR_MAX_PIXELS", default=40_000_000, cast=int)
+AVATAR_SIZE = config("AVATAR_SIZE", default=256, cast=int)
+AVATAR_WORKERS = config("AVATAR_WORKERS", default=2, cast=int)
+AVATAR_STORAGE = config("AVATAR_STORAGE", default="cloudinary")
+AVATAR_LOCAL_DIR = config("AVATAR_LOCAL_DIR", default="media/avatars")
+AVATAR_LOCAL_URL = config("AVATAR_LOCAL_URL", default="/media/avatars")
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Multipart framing around the file: boundaries and part headers.
+MULTIPART_OVERHEAD = 16 * 1024
+
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+}
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def detect_image_type(header: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return content_type
+    return None
+
+
+class _FilePart:
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.found = False
+        self.capturing = False
+        self.pending = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        self.capturing = (
+            not self.found and options.get(b"name") == self.field.encode() and b"filename" in options
+        )
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self.capturing:
+            return
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds {self.max_bytes} bytes")
+        self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self.capturing:
+            self.found = True
+            self.capturing = False
+
+
+async def receive_upload(request: Request, field: str = "file", max_bytes: Optional[int] = None) -> SpooledTemporaryFile:
+    # Parses the multipart body as it arrives, so an oversized upload is
+    # rejected after max_bytes instead of after the whole body is buffered.
+    max_bytes = max_bytes or AVATAR_MAX_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes} bytes")
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    spool = SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    part = _FilePart(field, max_bytes)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": part.on_part_begin,
+        "on_header_field": part.on_header_field,
+        "on_header_value": part.on_header_value,
+        "on_header_end": part.on_header_end,
+        "on_headers_finished": part.on_headers_finished,
+        "on_part_data": part.on_part_data,
+        "on_part_end": part.on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if part.pending:
+                pending, part.pending = part.pending, []
+                await run_in_threadpool(spool.writelines, pending)
+        parser.finalize()
+    except Exception:
+        spool.close()
+        raise
+    if not part.found:
+        spool.close()
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+    spool.seek(0)
+    return spool
+
+
+def make_thumbnail(data: bytes, size: int = AVATAR_SIZE, max_pixels: int = AVATAR_MAX_PIXELS) -> bytes:
+    # Runs in a worker process, which is also the only place Pillow gets imported.
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ("JPEG", "PNG"):
+                raise InvalidImage(f"Unsupported image format {image.format}")
+            # JPEG decodes straight to a smaller scale, which dominates resize cost.
+            image.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(image)
+            if image.mode in ("RGBA", "LA", "P"):
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, "white")
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            thumbnail = ImageOps.fit(image.convert("RGB"), (size, size), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImage(str(e)) from e
+    output = io.BytesIO()
+    thumbnail.save(output, "JPEG", quality=85, optimize=True)
+    return output.getvalue()
+
+
+class CloudinaryStorage:
+    def __init__(self):
+        self.configured = False
+
+    def configure(self) -> None:
+        if self.configured:
+            return
+        import cloudinary
+
+        cloudinary.config(
+            cloud_name=config("CLOUDINARY_CLOUD_NAME"),
+            api_key=config("CLOUDINARY_API_KEY"),
+            api_secret=config("CLOUDINARY_API_SECRET"),
+        )
+        self.configured = True
+
+    def _upload(self, user_id: int, data: bytes) -> str:
+        from cloudinary.uploader import upload
+        from cloudinary.utils import cloudinary_url
+
+        self.configure()
+        result = upload(io.BytesIO(data), public_id=f"avatars/user-{user_id}", overwrite=True, resource_type="image")
+        url, _ = cloudinary_url(result["public_id"], format="jpg", version=result.get("version"), secure=True)
+        return url
+
+    async def save(self, user_id: int, data: bytes) -> str:
+        return await asyncio.to_thread(self._upload, user_id, data)
+
+
+class LocalStorage:
+    def __init__(self, root: str = AVATAR_LOCAL_DIR, base_url: str = AVATAR_LOCAL_URL):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, user_id: int, data: bytes) -> str:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Content-addressed names change on every new avatar, so caches never serve an old one.
+        name = f"{user_id}-{hashlib.sha256(data).hexdigest()[:16]}.jpg"
+        with NamedTemporaryFile(dir=self.root, prefix=".", suffix=".tmp", delete=False) as temporary:
+            temporary.write(data)
+        os.replace(temporary.name, self.root / name)
+        for previous in self.root.glob(f"{user_id}-*.jpg"):
+            if previous.name != name:
+                previous.unlink(missing_ok=True)
+        return f"{self.base_url}/{name}"
+
+    async def save(self, user_id: int, data: bytes) -> str:
+        return await asyncio.to_thread(self._write, user_id, data)
+
+
+def create_storage(name: str = AVATAR_STORAGE):
+    if name == "cloudinary":
+        return CloudinaryStorage()
+    if name == "local":
+        return LocalStorage()
+    raise ValueError(f"Unknown avatar storage backend: {name}")
+
+
+class AvatarPipeline:
+    def __init__(self, storage=None, workers: int = AVATAR_WORKERS, size: int = AVATAR_SIZE):
+        self.storage = storage or create_storage()
+        self.workers = workers
+        self.size = size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def process(self, user_id: int, spool: SpooledTemporaryFile) -> str:
+        with spool:
+            if detect_image_type(spool.read(16)) is None:
+                raise HTTPException(status_code=400, detail="Invalid file type")
+            spool.seek(0)
+            data = await run_in_threadpool(spool.read)
+        loop = asyncio.get_running_loop()
+        try:
+            thumbnail = await loop.run_in_executor(self._get_executor(), make_thumbnail, data, self.size)
+        except InvalidImage as e:
+            logger.warning(f"Rejected avatar for user {user_id}: {e}")
+            raise HTTPException(status_code=400, detail="Invalid image")
+        return await self.storage.save(user_id, thumbnail)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+avatar_pipeline = AvatarPipeline()
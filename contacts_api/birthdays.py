@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import case, or_, select
+
+from contacts_api.models import Contact, birthday_key
+
+FEB_28 = 228
+FEB_29 = 229
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def birthday_ranges(today: date, days: int) -> List[Tuple[int, int]]:
+    if days >= 365:
+        return [(101, 1231)]
+    end = today + timedelta(days=days)
+    start_key, end_key = birthday_key(today), birthday_key(end)
+    if start_key <= end_key:
+        ranges = [(start_key, end_key)]
+    else:
+        ranges = [(start_key, 1231), (101, end_key)]
+
+    # People born on Feb 29 celebrate on Feb 28 in common years.
+    adjusted = []
+    for low, high in ranges:
+        year = today.year if low >= start_key else end.year
+        if high == FEB_28 and not _is_leap(year):
+            high = FEB_29
+        adjusted.append((low, high))
+    return adjusted
+
+
+def upcoming_birthdays_statement(user_id: int, today: date, days: int = 7):
+    ranges = birthday_ranges(today, days)
+    statement = select(Contact).where(
+        Contact.user_id == user_id,
+        or_(*(Contact.birthday_md.between(low, high) for low, high in ranges)),
+    )
+    # Birthdays after the year-end wrap come last.
+    start_key = ranges[0][0]
+    return statement.order_by(case((Contact.birthday_md < start_key, 1), else_=0), Contact.birthday_md, Contact.id)
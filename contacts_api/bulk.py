@@ -0,0 +1,256 @@
+import csv
+import io
+import json
+import logging
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.auth import get_current_user
+from contacts_api.cache import contact_cache
+from contacts_api.conditional import bump_contacts_generation
+from contacts_api.database import get_db
+from contacts_api.models import Contact, birthday_key
+from contacts_api.mutations import delete_contacts_statement, record_tombstones, update_contacts_statement
+from contacts_api.normalization import derived_keys
+from contacts_api.schemas import (
+    BulkImportResult,
+    BulkRowError,
+    ContactBatchDelete,
+    ContactBatchResult,
+    ContactBatchUpdate,
+    ContactCreate,
+)
+from contacts_api.search import resume_insert_indexing, suspend_insert_indexing
+from contacts_api.user_cache import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+EXPORT_FIELDS = ("id", "first_name", "last_name", "email", "phone", "birthday", "additional_info")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+bulk_router = APIRouter()
+
+
+def _detect_format(file: UploadFile, requested: str = None) -> str:
+    if requested:
+        return requested
+    name = (file.filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    if name.endswith(".csv") or file.content_type in ("text/csv", "application/csv"):
+        return "csv"
+    raise HTTPException(status_code=400, detail="Unsupported file format, expected CSV or NDJSON")
+
+
+def iter_rows(stream, fmt: str) -> Iterator[Tuple[int, object]]:
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key: value for key, value in row.items() if value != ""}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, e
+
+
+def _row_errors(error) -> List[str]:
+    if isinstance(error, ValidationError):
+        return [f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()]
+    return [str(error)]
+
+
+async def _existing_emails(db: AsyncSession, user_id: int, emails: List[str]) -> set:
+    result = await db.scalars(
+        select(Contact.email).where(Contact.user_id == user_id, Contact.email.in_(emails))
+    )
+    return set(result)
+
+
+async def _flush_batch(db: AsyncSession, user_id: int, batch: List[Tuple[int, dict]], result: BulkImportResult,
+                       change_seq: Optional[int]) -> Optional[int]:
+    existing = await _existing_emails(db, user_id, [values["email"] for _, values in batch])
+    rows = []
+    for number, values in batch:
+        if values["email"] in existing:
+            _report(result, number, ["email: contact with this email already exists"])
+            continue
+        rows.append(values)
+    if rows:
+        # The whole import is one change; its sequence is taken with the first rows it writes.
+        if change_seq is None:
+            change_seq = await bump_contacts_generation(db, user_id)
+        await db.execute(insert(Contact.__table__), [{**values, "change_seq": change_seq} for values in rows])
+        result.inserted += len(rows)
+    return change_seq
+
+
+def _parse_batch(rows: Iterator[Tuple[int, object]], user_id: int, seen_emails: set,
+                 result: BulkImportResult) -> Optional[List[Tuple[int, dict]]]:
+    # None once the upload is exhausted; a batch of only rejected rows is an empty list.
+    chunk = list(islice(rows, BATCH_SIZE))
+    if not chunk:
+        return None
+    batch = []
+    for number, row in chunk:
+        if isinstance(row, Exception):
+            _report(result, number, _row_errors(row))
+            continue
+        try:
+            contact = ContactCreate.model_validate(row)
+        except ValidationError as e:
+            _report(result, number, _row_errors(e))
+            continue
+        if contact.email in seen_emails:
+            _report(result, number, ["email: duplicate email in upload"])
+            continue
+        seen_emails.add(contact.email)
+
+        values = contact.model_dump()
+        values["birthday"] = contact.birthday.isoformat() if contact.birthday else None
+        values["birthday_md"] = birthday_key(contact.birthday)
+        values.update(derived_keys(values))
+        values["user_id"] = user_id
+        batch.append((number, values))
+    return batch
+
+
+def _report(result: BulkImportResult, number: int, errors: List[str]) -> None:
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(BulkRowError(row=number, errors=errors))
+
+
+@bulk_router.post("/bulk", response_model=BulkImportResult)
+async def import_contacts(
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> BulkImportResult:
+    fmt = _detect_format(file, format)
+    result = BulkImportResult()
+    seen_emails = set()
+    change_seq = None
+
+    try:
+        last_id = await db.run_sync(lambda session: suspend_insert_indexing(session.connection()))
+        rows = iter_rows(file.file, fmt)
+        # Reading and validating are CPU-bound, so each batch is parsed off the event loop.
+        while (batch := await run_in_threadpool(_parse_batch, rows, current_user.id, seen_emails, result)) is not None:
+            change_seq = await _flush_batch(db, current_user.id, batch, result, change_seq)
+        await db.run_sync(lambda session: resume_insert_indexing(session.connection(), last_id))
+        await db.commit()
+        if result.inserted:
+            await contact_cache.invalidate(current_user.id)
+        result.errors.sort(key=lambda error: error.row)
+    except UnicodeDecodeError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    except IntegrityError:
+        # Another request added one of these emails after they were checked; nothing was imported.
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Contacts were added concurrently, retry the import")
+    except Exception:
+        await db.rollback()
+        raise
+
+    logger.info(f"Bulk import for {current_user.email}: {result.inserted} inserted, {result.failed} failed")
+    return result
+
+
+def _render_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def _render_ndjson(rows) -> str:
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, row))) + "\n" for row in rows)
+
+
+async def _stream_export(bind, statement, fmt: str):
+    # Runs after the request-scoped session is closed, so it opens its own.
+    if fmt == "csv":
+        yield _render_csv([EXPORT_FIELDS])
+    render = _render_csv if fmt == "csv" else _render_ndjson
+    async with AsyncSession(bind=bind) as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield render(rows)
+
+
+@bulk_router.get("/export")
+async def export_contacts(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> StreamingResponse:
+    statement = (
+        select(*(getattr(Contact, field) for field in EXPORT_FIELDS))
+        .where(Contact.user_id == current_user.id)
+        .order_by(Contact.id)
+    )
+    return StreamingResponse(
+        _stream_export(db.bind, statement, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
+
+
+def _batch_result(ids: list, affected: list) -> ContactBatchResult:
+    found = set(affected)
+    return ContactBatchResult(affected=sorted(found), not_found=sorted(set(ids) - found))
+
+
+@bulk_router.post("/batch-delete", response_model=ContactBatchResult)
+async def delete_contacts_batch(
+    payload: ContactBatchDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ContactBatchResult:
+    # One DELETE ... WHERE id IN (...) RETURNING id instead of a load and delete per contact.
+    change_seq = await bump_contacts_generation(db, current_user.id)
+    affected = list((await db.scalars(delete_contacts_statement(current_user.id, payload.ids))).all())
+    if not affected:
+        await db.rollback()
+        return _batch_result(payload.ids, affected)
+    await record_tombstones(db, current_user.id, affected, change_seq)
+    await db.commit()
+    await contact_cache.invalidate(current_user.id)
+    return _batch_result(payload.ids, affected)
+
+
+@bulk_router.patch("/batch", response_model=ContactBatchResult)
+async def update_contacts_batch(
+    payload: ContactBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ContactBatchResult:
+    changes = payload.changes.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if "email" in changes:
+        raise HTTPException(status_code=400, detail="Email is unique per contact and cannot be set in a batch")
+    change_seq = await bump_contacts_generation(db, current_user.id)
+    affected = list((await db.scalars(update_contacts_statement(current_user.id, payload.ids, changes, change_seq))).all())
+    if not affected:
+        await db.rollback()
+        return _batch_result(payload.ids, affected)
+    await db.commit()
+    await contact_cache.invalidate(current_user.id)
+    return _batch_result(payload.ids, affected)
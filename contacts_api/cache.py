@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from decouple import config
+
+from contacts_api.schemas import ContactResponse
+
+logger = logging.getLogger(__name__)
+
+CONTACT_CACHE_BACKEND = config("CONTACT_CACHE_BACKEND", default="redis")
+CONTACT_CACHE_TTL = config("CONTACT_CACHE_TTL", default=60, cast=int)
+
+KEY_PREFIX = "contacts"
+# Outlives every entry, so an expired counter can never resurrect stale entries.
+GENERATION_TTL = 24 * 60 * 60
+CONTACT_FIELDS = tuple(ContactResponse.model_fields)
+MISSING = object()
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    def _alive(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._alive(key)
+        return item[0] if item else None
+
+    async def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        expires = time.monotonic() + ex if ex else None
+        self._data[key] = (value if isinstance(value, bytes) else str(value).encode(), expires)
+        return True
+
+    async def incr(self, key: str) -> int:
+        item = self._alive(key)
+        value = int(item[0]) + 1 if item else 1
+        self._data[key] = (str(value).encode(), item[1] if item else None)
+        return value
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        item = self._alive(key)
+        if item is None:
+            return False
+        self._data[key] = (item[0], time.monotonic() + seconds)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+            self.invalidations = 0
+            self.errors = 0
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+            }
+
+
+def create_backend(name: str = CONTACT_CACHE_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        from contacts_api.resilient_redis import create_redis
+
+        return create_redis(decode_responses=False)
+    if name == "off":
+        return None
+    raise ValueError(f"Unknown contact cache backend: {name}")
+
+
+def encode(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def decode(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def pack_contacts(contacts: Iterable) -> List[list]:
+    # Positional rows instead of dicts keep entries roughly half the size.
+    return [[getattr(contact, field) for field in CONTACT_FIELDS] for contact in contacts]
+
+
+def unpack_contacts(rows: List[list]) -> List[dict]:
+    return [dict(zip(CONTACT_FIELDS, row)) for row in rows]
+
+
+class ContactCache:
+    def __init__(self, backend=None, ttl: int = CONTACT_CACHE_TTL, backend_factory: Optional[Callable] = None):
+        if backend_factory is None:
+            self.backend = backend
+        else:
+            # Built on first use, so importing the app does not create a Redis client.
+            self._backend_factory = backend_factory
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def __getattr__(self, name: str):
+        if name == "backend" and "_backend_factory" in self.__dict__:
+            self.backend = self.__dict__.pop("_backend_factory")()
+            return self.backend
+        raise AttributeError(name)
+
+    @staticmethod
+    def generation_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:gen:{user_id}"
+
+    @staticmethod
+    def entry_key(user_id: int, generation: int, kind: str, params: dict) -> str:
+        digest = hashlib.blake2b(encode(sorted(params.items())), digest_size=12).hexdigest()
+        return f"{KEY_PREFIX}:{user_id}:{generation}:{kind}:{digest}"
+
+    async def _generation(self, user_id: int) -> int:
+        value = await self.backend.get(self.generation_key(user_id))
+        return int(value) if value else 0
+
+    async def get_or_load(self, user_id: int, kind: str, params: dict, loader: Callable[[], Awaitable[Any]]) -> Any:
+        if self.backend is None:
+            return await loader()
+        try:
+            # The generation is read before loading, so a write that commits
+            # mid-load bumps past the key this result is stored under.
+            key = self.entry_key(user_id, await self._generation(user_id), kind, params)
+            cached = await self.backend.get(key)
+        except Exception as e:
+            self.stats.incr("errors")
+            logger.error(f"Contact cache read failed for user {user_id}: {e}")
+            return await loader()
+        if cached is not None:
+            self.stats.incr("hits")
+            return decode(cached)
+        self.stats.incr("misses")
+        return await self._single_flight(key, lambda: self._load_and_store(key, loader))
+
+    async def _load_and_store(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        try:
+            await self.backend.set(key, encode(value), ex=self.ttl)
+        except Exception as e:
+            self.stats.incr("errors")
+            logger.error(f"Contact cache write failed for {key}: {e}")
+        return value
+
+    async def _single_flight(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := self._inflight.get(key)) is not None:
+            self.stats.incr("coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leader's request went away: this one loads for itself (or joins a new leader).
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def invalidate(self, user_id: int) -> None:
+        if self.backend is None:
+            return
+        key = self.generation_key(user_id)
+        try:
+            await self.backend.incr(key)
+            await self.backend.expire(key, GENERATION_TTL)
+            self.stats.incr("invalidations")
+        except Exception as e:
+            self.stats.incr("errors")
+            logger.error(f"Contact cache invalidation failed for user {user_id}: {e}")
+
+
+contact_cache = ContactCache(backend_factory=create_backend)
@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import heapq
+import logging
+from datetime import timedelta
+from itertools import islice
+from typing import Optional
+
+from decouple import config
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, delete, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.auth import get_current_user
+from contacts_api.cache import unpack_contacts
+from contacts_api.database import AsyncSessionLocal, get_db
+from contacts_api.models import Contact, ContactTombstone, User, utcnow
+from contacts_api.pagination import decode_change_cursor, encode_change_cursor
+from contacts_api.schemas import ContactChanges
+from contacts_api.serialization import ID_POSITION, contact_columns
+from contacts_api.user_cache import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+CONTACT_TOMBSTONE_RETENTION_DAYS = config("CONTACT_TOMBSTONE_RETENTION_DAYS", default=90, cast=int)
+CONTACT_TOMBSTONE_COMPACT_BATCH_SIZE = config("CONTACT_TOMBSTONE_COMPACT_BATCH_SIZE", default=1000, cast=int)
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 5000
+# Within one change sequence, deletes are listed before updates.
+DELETED, UPDATED = 0, 1
+
+changes_router = APIRouter()
+
+
+def _after(seq_column, id_column, seq: int, last_id: Optional[int]):
+    # Index entries for (user_id, change_seq) are ordered by id within a sequence, so both forms are one range seek.
+    if last_id is None:
+        return seq_column > seq
+    return tuple_(seq_column, id_column) > tuple_(seq, last_id)
+
+
+def changed_contacts_statement(user_id: int, seq: int, last_id: Optional[int], until: int, limit: int):
+    return (
+        select(Contact)
+        .where(
+            Contact.user_id == user_id,
+            _after(Contact.change_seq, Contact.id, seq, last_id),
+            Contact.change_seq <= until,
+        )
+        .order_by(Contact.change_seq, Contact.id)
+        .limit(limit)
+    )
+
+
+def tombstones_statement(user_id: int, seq: int, last_id: Optional[int], until: int, limit: int):
+    return (
+        select(ContactTombstone.change_seq, ContactTombstone.id, ContactTombstone.contact_id)
+        .where(
+            ContactTombstone.user_id == user_id,
+            _after(ContactTombstone.change_seq, ContactTombstone.id, seq, last_id),
+            ContactTombstone.change_seq <= until,
+        )
+        .order_by(ContactTombstone.change_seq, ContactTombstone.id)
+        .limit(limit)
+    )
+
+
+async def read_changes(db: AsyncSession, user_id: int, seq: int, phase: int, last_id: Optional[int],
+                       full: bool, until: int, limit: int) -> dict:
+    # Every page of one sync reads up to the generation taken when the sync started. The queries
+    # are separate snapshots, but a write is only visible once its generation is, so nothing at or
+    # below `until` can still be missing, and everything above it is left for the next sync.
+    # A full sync (since=0) only needs the live rows; a delta also needs the deletes.
+    tombstones = []
+    if not full:
+        tombstone_after = last_id if phase == DELETED else None
+        tombstones = (await db.execute(tombstones_statement(user_id, seq, tombstone_after, until, limit + 1))).all()
+    contact_after = 0 if phase == DELETED else last_id
+    statement = contact_columns(changed_contacts_statement(user_id, seq, contact_after, until, limit + 1))
+    contacts = [list(row) for row in await db.execute(statement.add_columns(Contact.change_seq))]
+
+    entries = heapq.merge(
+        ((row.change_seq, DELETED, row.id, row.contact_id) for row in tombstones),
+        ((row[-1], UPDATED, row[ID_POSITION], row[:-1]) for row in contacts),
+    )
+    page = list(islice(entries, limit + 1))
+    result = {
+        "updated": unpack_contacts([entry[3] for entry in page[:limit] if entry[1] == UPDATED]),
+        "deleted": [entry[3] for entry in page[:limit] if entry[1] == DELETED],
+        "next_cursor": None,
+        "next_since": None,
+    }
+    if len(page) > limit:
+        last_seq, last_phase, last_entry_id, _ = page[limit - 1]
+        result["next_cursor"] = encode_change_cursor(last_seq, last_phase, last_entry_id, full, until)
+    else:
+        # Deletes of rows sent on earlier pages of a full sync are after `until`, so the next delta replays them.
+        result["next_since"] = until
+    return result
+
+
+@changes_router.get("/changes", response_model=ContactChanges)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_CHANGES_LIMIT, ge=1, le=MAX_CHANGES_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ORJSONResponse:
+    if cursor:
+        try:
+            seq, phase, last_id, full, until = decode_change_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    elif since == 0:
+        # Starts before sequence 0, so rows that were never rewritten since the upgrade are included too.
+        seq, phase, last_id, full, until = 0, DELETED, None, True, None
+    else:
+        seq, phase, last_id, full, until = since, UPDATED, None, False, None
+
+    row = (await db.execute(
+        select(User.contacts_generation, User.tombstones_compacted_seq).where(User.id == current_user.id)
+    )).first()
+    generation, compacted = tuple(row) if row else (0, 0)
+    if not full and seq < compacted:
+        raise HTTPException(status_code=410, detail="Changes since this sequence were compacted, sync again from since=0")
+    if until is None:
+        until = generation
+        if not full and seq >= generation:
+            # Nothing was written since the last sync: answered from the owner's row alone.
+            return ORJSONResponse({"updated": [], "deleted": [], "next_cursor": None, "next_since": seq})
+    return ORJSONResponse(await read_changes(db, current_user.id, seq, phase, last_id, full, until, limit))
+
+
+async def compact_tombstones(session_factory=AsyncSessionLocal, retention_days: int = CONTACT_TOMBSTONE_RETENTION_DAYS,
+                             batch_size: int = CONTACT_TOMBSTONE_COMPACT_BATCH_SIZE) -> int:
+    # Oldest first, in short transactions. Each owner's compacted sequence is raised before its
+    # tombstones go, so a client that could miss a delete gets 410 instead of a silent gap.
+    cutoff = utcnow() - timedelta(days=retention_days)
+    raise_compacted = (
+        update(User.__table__)
+        .where(User.id == bindparam("owner_id"), User.tombstones_compacted_seq < bindparam("compacted_seq"))
+        .values(tombstones_compacted_seq=bindparam("compacted_seq"))
+    )
+    removed = 0
+    while True:
+        async with session_factory() as session:
+            rows = (await session.execute(
+                select(ContactTombstone.id, ContactTombstone.user_id, ContactTombstone.change_seq)
+                .where(ContactTombstone.deleted_at < cutoff)
+                .order_by(ContactTombstone.deleted_at)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            compacted = {}
+            for row in rows:
+                compacted[row.user_id] = max(compacted.get(row.user_id, 0), row.change_seq)
+            await session.execute(raise_compacted, [
+                {"owner_id": user_id, "compacted_seq": seq} for user_id, seq in compacted.items()
+            ])
+            await session.execute(
+                delete(ContactTombstone)
+                .where(ContactTombstone.id.in_([row.id for row in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        removed += len(rows)
+        logger.info(f"Tombstone compaction removed {removed} so far")
+    return removed
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Remove contact tombstones older than the retention period")
+    parser.add_argument("--retention-days", type=int, default=CONTACT_TOMBSTONE_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=CONTACT_TOMBSTONE_COMPACT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    removed = asyncio.run(compact_tombstones(retention_days=args.retention_days, batch_size=args.batch_size))
+    print(f"{removed} tombstones removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.cache import encode
+from contacts_api.models import Contact, User, utcnow
+
+# Per-user data: clients may store it but must revalidate before reuse.
+CACHE_CONTROL = "private, no-cache"
+
+
+def contact_etag(contact_id: int, version: int) -> str:
+    return f'"c{contact_id}.{version}"'
+
+
+def collection_etag(generation: int, params: dict) -> str:
+    digest = hashlib.blake2b(encode(params), digest_size=6).hexdigest()
+    return f'"g{generation}.{digest}"'
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite hands back naive datetimes; they are always stored in UTC.
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: Optional[str]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
+
+
+def _opaque_tags(header: str, weak: bool) -> set:
+    tags = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            if not weak:
+                continue
+            tag = tag[2:]
+        tags.add(tag)
+    return tags
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    # If-None-Match uses weak comparison, If-Match strong comparison (RFC 9110).
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in _opaque_tags(header, weak)
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def if_match_version(header: Optional[str], contact_id: int) -> Optional[int]:
+    # The version is matched inside the UPDATE/DELETE itself. A tag that is not
+    # one of this contact's can never match, which -1 expresses without a lookup.
+    if header is None or header.strip() == "*":
+        return None
+    prefix = f'"c{contact_id}.'
+    for tag in _opaque_tags(header, weak=False):
+        version = tag[len(prefix):-1]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isdigit():
+            return int(version)
+    return -1
+
+
+async def contact_validator(db: AsyncSession, user_id: int, contact_id: int) -> Optional[Tuple[int, Optional[datetime]]]:
+    row = (await db.execute(
+        select(Contact.version, Contact.updated_at).where(Contact.id == contact_id, Contact.user_id == user_id)
+    )).first()
+    return tuple(row) if row else None
+
+
+async def collection_validator(db: AsyncSession, user_id: int) -> Tuple[int, Optional[datetime]]:
+    row = (await db.execute(
+        select(User.contacts_generation, User.contacts_updated_at).where(User.id == user_id)
+    )).first()
+    return tuple(row) if row else (0, None)
+
+
+async def bump_contacts_generation(db: AsyncSession, user_id: int) -> int:
+    # Runs in the same transaction as the contact write it describes. The new generation is that
+    # write's change_seq; the owner's row stays locked until commit, so sequences commit in order.
+    return await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(contacts_generation=User.contacts_generation + 1, contacts_updated_at=utcnow())
+        .returning(User.contacts_generation)
+        .execution_options(synchronize_session=False)
+    )
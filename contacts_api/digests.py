@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import html
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from decouple import config
+from sqlalchemy import case, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.birthdays import birthday_ranges
+from contacts_api.database import AsyncSessionLocal
+from contacts_api.email_utils import send_email
+from contacts_api.models import Contact, JobCheckpoint, User, utcnow
+from contacts_api.outbox import enqueue_email
+
+logger = logging.getLogger(__name__)
+
+BIRTHDAY_DIGEST_DAYS = config("BIRTHDAY_DIGEST_DAYS", default=7, cast=int)
+BIRTHDAY_DIGEST_BATCH_SIZE = config("BIRTHDAY_DIGEST_BATCH_SIZE", default=200, cast=int)
+BIRTHDAY_DIGEST_CONCURRENCY = config("BIRTHDAY_DIGEST_CONCURRENCY", default=20, cast=int)
+BIRTHDAY_DIGEST_SCHEDULE = config("BIRTHDAY_DIGEST_SCHEDULE", default=False, cast=bool)
+# UTC time of day for the in-process scheduler, "HH:MM".
+BIRTHDAY_DIGEST_TIME = config("BIRTHDAY_DIGEST_TIME", default="07:00")
+# A run whose process died is taken over once its lease runs out.
+BIRTHDAY_DIGEST_LEASE_SECONDS = config("BIRTHDAY_DIGEST_LEASE_SECONDS", default=600, cast=int)
+JOB_NAME = "birthday-digest"
+STREAM_BATCH_SIZE = 1000
+
+Sender = Callable[[str, str, str], Awaitable[None]]
+
+
+def digest_statement(today: date, days: int = BIRTHDAY_DIGEST_DAYS, after_user_id: int = 0):
+    # Every user's upcoming birthdays in one query, in (user_id, birthday_md) index order,
+    # so rows stream out grouped by owner without a sort.
+    ranges = birthday_ranges(today, days)
+    return (
+        select(User.id, User.email, User.full_name, Contact.first_name, Contact.last_name, Contact.birthday_md)
+        .join(Contact, Contact.user_id == User.id)
+        .where(
+            User.id > after_user_id,
+            User.is_verified.is_(True),
+            or_(*(Contact.birthday_md.between(low, high) for low, high in ranges)),
+        )
+        .order_by(User.id, Contact.birthday_md, Contact.id)
+    )
+
+
+def _name(first_name: Optional[str], last_name: Optional[str]) -> str:
+    return " ".join(part for part in (first_name, last_name) if part)
+
+
+def render_digest(full_name: Optional[str], birthdays: List[tuple], today: date) -> tuple:
+    # Birthdays after the year-end wrap go last, as in /contacts/upcoming-birthdays/.
+    start_key = today.month * 100 + today.day
+    birthdays = sorted(birthdays, key=lambda row: row[2] < start_key)
+    items = "".join(
+        f"<li>{birthday_md % 100:02d}.{birthday_md // 100:02d} — {html.escape(_name(first_name, last_name))}</li>"
+        for first_name, last_name, birthday_md in birthdays
+    )
+    greeting = f"<p>{html.escape(full_name)},</p>" if full_name else ""
+    return "Ближайшие дни рождения", f"<h1>Ближайшие дни рождения</h1>{greeting}<ul>{items}</ul>"
+
+
+async def claim_run(session: AsyncSession, run_key: str, lease_seconds: int = BIRTHDAY_DIGEST_LEASE_SECONDS,
+                    name: str = JOB_NAME) -> Optional[int]:
+    # Returns the user id to resume after, or None when this run is finished or another process holds it.
+    try:
+        await session.execute(insert(JobCheckpoint).values(name=name, run_key=None, last_key=0, completed=False))
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+    now = utcnow()
+    same_run = JobCheckpoint.run_key == run_key
+    resume_after = await session.scalar(
+        update(JobCheckpoint)
+        .where(
+            JobCheckpoint.name == name,
+            or_(JobCheckpoint.locked_until.is_(None), JobCheckpoint.locked_until < now),
+            ~(same_run & JobCheckpoint.completed),
+        )
+        .values(
+            run_key=run_key,
+            last_key=case((same_run, JobCheckpoint.last_key), else_=0),
+            completed=False,
+            locked_until=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(JobCheckpoint.last_key)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return resume_after
+
+
+async def save_checkpoint(session: AsyncSession, last_key: int, completed: bool = False,
+                          lease_seconds: int = BIRTHDAY_DIGEST_LEASE_SECONDS, name: str = JOB_NAME) -> None:
+    locked_until = None if completed else utcnow() + timedelta(seconds=lease_seconds)
+    await session.execute(
+        update(JobCheckpoint)
+        .where(JobCheckpoint.name == name)
+        .values(last_key=last_key, completed=completed, locked_until=locked_until)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+
+async def release_run(session: AsyncSession, name: str = JOB_NAME) -> None:
+    await session.execute(
+        update(JobCheckpoint).where(JobCheckpoint.name == name).values(locked_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+
+
+async def _send_batch(batch: List[tuple], send: Sender, semaphore: asyncio.Semaphore) -> List[tuple]:
+    async def deliver(email: str, subject: str, body: str) -> bool:
+        async with semaphore:
+            try:
+                await send(subject, email, body)
+                return True
+            except Exception as e:
+                logger.error(f"Birthday digest for {email} failed: {e}")
+                return False
+
+    results = await asyncio.gather(*(deliver(*digest) for digest in batch))
+    return [digest for digest, delivered in zip(batch, results) if not delivered]
+
+
+async def run_birthday_digests(
+    today: Optional[date] = None,
+    days: int = BIRTHDAY_DIGEST_DAYS,
+    session_factory=AsyncSessionLocal,
+    send: Sender = send_email,
+    batch_size: int = BIRTHDAY_DIGEST_BATCH_SIZE,
+    concurrency: int = BIRTHDAY_DIGEST_CONCURRENCY,
+) -> dict:
+    today = today or datetime.now(timezone.utc).date()
+    run_key = f"{today.isoformat()}/{days}"
+    async with session_factory() as session:
+        resume_after = await claim_run(session, run_key)
+    if resume_after is None:
+        logger.info(f"Birthday digest {run_key} is already done or running elsewhere")
+        return {"run": run_key, "status": "skipped"}
+
+    started = time.perf_counter()
+    stats = {"run": run_key, "status": "done", "resumed_after": resume_after, "users": 0, "sent": 0, "failed": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    batch: List[tuple] = []
+    current, birthdays = None, []
+
+    async def flush(last_user_id: int) -> None:
+        failed = await _send_batch(batch, send, semaphore)
+        stats["users"] += len(batch)
+        stats["sent"] += len(batch) - len(failed)
+        stats["failed"] += len(failed)
+        batch.clear()
+        # Sent digests are recorded before the next batch, so a restart does not repeat them. Failed
+        # ones go to the outbox in the same transaction, which retries them with backoff.
+        async with session_factory() as session:
+            for email, subject, body in failed:
+                await enqueue_email(session, email, subject, body, dedupe_key=f"{JOB_NAME}:{run_key}:{email}")
+            await save_checkpoint(session, last_user_id)
+
+    try:
+        async with session_factory() as reader:
+            rows = await reader.stream(
+                digest_statement(today, days, resume_after).execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            async for user_id, email, full_name, first_name, last_name, birthday_md in rows:
+                if current is not None and user_id != current[0]:
+                    batch.append((current[1], *render_digest(current[2], birthdays, today)))
+                    birthdays = []
+                    if len(batch) >= batch_size:
+                        await flush(current[0])
+                current = (user_id, email, full_name)
+                birthdays.append((first_name, last_name, birthday_md))
+        if current is not None:
+            batch.append((current[1], *render_digest(current[2], birthdays, today)))
+        last_user_id = current[0] if current is not None else resume_after
+        if batch:
+            await flush(last_user_id)
+        async with session_factory() as session:
+            await save_checkpoint(session, last_user_id, completed=True)
+    except BaseException:
+        async with session_factory() as session:
+            await release_run(session)
+        raise
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Birthday digest {run_key}: {stats['sent']} sent, {stats['failed']} failed in {stats['seconds']}s")
+    return stats
+
+
+def seconds_until(now: datetime, at: str = BIRTHDAY_DIGEST_TIME) -> float:
+    hour, minute = (int(part) for part in at.split(":"))
+    next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+class DigestScheduler:
+    # Runs the digest once a day inside the app. Several workers may run it: the checkpoint
+    # lease lets one of them do the work and the rest skip.
+    def __init__(self, at: str = BIRTHDAY_DIGEST_TIME, job: Callable[..., Awaitable[dict]] = run_birthday_digests):
+        self.at = at
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                # Catches up on a missed run after a restart; a finished run is skipped.
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Birthday digest failed: {e}")
+            await asyncio.sleep(seconds_until(datetime.now(timezone.utc), self.at))
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+digest_scheduler = DigestScheduler()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Send every user a digest of their contacts' upcoming birthdays")
+    parser.add_argument("--date", type=date.fromisoformat, help="run as of this date (default: today, UTC)")
+    parser.add_argument("--days", type=int, default=BIRTHDAY_DIGEST_DAYS)
+    parser.add_argument("--batch-size", type=int, default=BIRTHDAY_DIGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=BIRTHDAY_DIGEST_CONCURRENCY)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    stats = asyncio.run(run_birthday_digests(args.date, args.days, batch_size=args.batch_size,
+                                             concurrency=args.concurrency))
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
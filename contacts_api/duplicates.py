@@ -0,0 +1,186 @@
+import logging
+from datetime import date
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+from typing import Dict, List, Tuple
+
+from decouple import config
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.auth import get_current_user
+from contacts_api.cache import CONTACT_FIELDS, contact_cache
+from contacts_api.conditional import bump_contacts_generation, contact_etag, http_date, validator_headers
+from contacts_api.database import get_db
+from contacts_api.models import Contact
+from contacts_api.mutations import delete_contacts_statement, record_tombstones, update_contact_statement
+from contacts_api.normalization import transliterate
+from contacts_api.schemas import ContactMerge, ContactResponse, DuplicateReport
+from contacts_api.serialization import CONTACT_COLUMNS, contact_response
+from contacts_api.user_cache import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_MIN_SCORE = config("DUPLICATE_MIN_SCORE", default=0.5, cast=float)
+# Blocks larger than this (a very common name) would add too many pairs to be useful.
+DUPLICATE_MAX_BLOCK = config("DUPLICATE_MAX_BLOCK", default=50, cast=int)
+DEFAULT_DUPLICATE_LIMIT = 100
+MAX_DUPLICATE_LIMIT = 1000
+SCORE_BATCH_SIZE = 500
+
+BLOCKS = {
+    "email": (Contact.email_key,),
+    "phone": (Contact.phone_e164,),
+    "name": (Contact.last_name_key, Contact.first_name_key),
+}
+WEIGHTS = {"email": 0.4, "phone": 0.4, "birthday": 0.2}
+NAME_WEIGHT = 0.3
+SCORED_COLUMNS = CONTACT_COLUMNS + (Contact.email_key, Contact.phone_e164, Contact.first_name_key, Contact.last_name_key)
+MERGED_FIELDS = ("first_name", "last_name", "phone", "birthday")
+
+duplicates_router = APIRouter()
+
+
+def block_members_statement(user_id: int, columns: tuple, max_block: int = DUPLICATE_MAX_BLOCK):
+    # GROUP BY over the (user_id, key) index finds the shared keys; the join reads their members back.
+    blocks = (
+        select(*columns)
+        .where(Contact.user_id == user_id, *(column.is_not(None) for column in columns))
+        .group_by(*columns)
+        .having(func.count().between(2, max_block))
+        .subquery()
+    )
+    return (
+        select(Contact.id, *columns)
+        .join(blocks, and_(*(column == blocks.c[column.key] for column in columns)))
+        .where(Contact.user_id == user_id)
+        .order_by(*columns, Contact.id)
+    )
+
+
+async def candidate_pairs(db: AsyncSession, user_id: int, max_block: int = DUPLICATE_MAX_BLOCK) -> Dict[Tuple[int, int], set]:
+    pairs: Dict[Tuple[int, int], set] = {}
+    for kind, columns in BLOCKS.items():
+        rows = await db.execute(block_members_statement(user_id, columns, max_block))
+        for _, members in groupby(rows, key=lambda row: tuple(row[1:])):
+            for pair in combinations([row[0] for row in members], 2):
+                pairs.setdefault(pair, set()).add(kind)
+    return pairs
+
+
+def _full_name(row: dict) -> str:
+    return transliterate(f"{row['first_name'] or ''} {row['last_name'] or ''}").strip()
+
+
+def score_pair(a: dict, b: dict) -> Tuple[float, List[str]]:
+    matched = []
+    score = 0.0
+    for field, key in (("email", "email_key"), ("phone", "phone_e164"), ("birthday", "birthday")):
+        if a[key] and a[key] == b[key]:
+            matched.append(field)
+            score += WEIGHTS[field]
+    if a["last_name_key"] and (a["last_name_key"], a["first_name_key"]) == (b["last_name_key"], b["first_name_key"]):
+        matched.append("name")
+    score += NAME_WEIGHT * SequenceMatcher(None, _full_name(a), _full_name(b)).ratio()
+    return round(min(score, 1.0), 3), matched
+
+
+async def _scored_rows(db: AsyncSession, user_id: int, ids: List[int]) -> Dict[int, dict]:
+    names = [column.key for column in SCORED_COLUMNS]
+    rows = {}
+    for start in range(0, len(ids), SCORE_BATCH_SIZE):
+        result = await db.execute(
+            select(*SCORED_COLUMNS).where(Contact.user_id == user_id, Contact.id.in_(ids[start:start + SCORE_BATCH_SIZE]))
+        )
+        for row in result:
+            rows[row.id] = dict(zip(names, row))
+    return rows
+
+
+async def find_duplicates(db: AsyncSession, user_id: int, min_score: float = DUPLICATE_MIN_SCORE,
+                          limit: int = DEFAULT_DUPLICATE_LIMIT) -> dict:
+    pairs = await candidate_pairs(db, user_id)
+    rows = await _scored_rows(db, user_id, sorted({contact_id for pair in pairs for contact_id in pair}))
+    scored = []
+    for (a, b) in pairs:
+        score, matched = score_pair(rows[a], rows[b])
+        if score >= min_score:
+            scored.append((score, a, b, matched))
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return {
+        "candidates": len(pairs),
+        "pairs": [
+            {
+                "score": score,
+                "matched": matched,
+                "contacts": [{field: rows[contact_id][field] for field in CONTACT_FIELDS} for contact_id in (a, b)],
+            }
+            for score, a, b, matched in scored[:limit]
+        ],
+    }
+
+
+def merge_changes(primary: dict, duplicates: List[dict]) -> dict:
+    # Empty fields are filled from the duplicates in the order given; notes are kept from all of them.
+    changes = {}
+    for field in MERGED_FIELDS:
+        if not primary[field]:
+            value = next((row[field] for row in duplicates if row[field]), None)
+            if value:
+                changes[field] = date.fromisoformat(value) if field == "birthday" else value
+    notes = []
+    for row in [primary, *duplicates]:
+        if row["additional_info"] and row["additional_info"] not in notes:
+            notes.append(row["additional_info"])
+    if notes and "\n".join(notes) != primary["additional_info"]:
+        changes["additional_info"] = "\n".join(notes)
+    return changes
+
+
+@duplicates_router.get("/duplicates", response_model=DuplicateReport)
+async def get_duplicates(
+    min_score: float = Query(DUPLICATE_MIN_SCORE, ge=0, le=1),
+    limit: int = Query(DEFAULT_DUPLICATE_LIMIT, ge=1, le=MAX_DUPLICATE_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ORJSONResponse:
+    async def load() -> dict:
+        return await find_duplicates(db, current_user.id, min_score, limit)
+
+    params = {"min_score": min_score, "limit": limit}
+    return ORJSONResponse(await contact_cache.get_or_load(current_user.id, "duplicates", params, load))
+
+
+@duplicates_router.post("/merge", response_model=ContactResponse)
+async def merge_contacts(
+    payload: ContactMerge,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ORJSONResponse:
+    if payload.primary_id in payload.duplicate_ids:
+        raise HTTPException(status_code=400, detail="The primary contact cannot also be a duplicate")
+    ids = [payload.primary_id, *payload.duplicate_ids]
+    names = [column.key for column in CONTACT_COLUMNS]
+    result = await db.execute(select(*CONTACT_COLUMNS).where(Contact.user_id == current_user.id, Contact.id.in_(ids)))
+    found = {row.id: dict(zip(names, row)) for row in result}
+    missing = [contact_id for contact_id in ids if contact_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Contacts not found: {', '.join(map(str, missing))}")
+
+    changes = merge_changes(found[payload.primary_id], [found[contact_id] for contact_id in payload.duplicate_ids])
+    change_seq = await bump_contacts_generation(db, current_user.id)
+    deleted = (await db.scalars(delete_contacts_statement(current_user.id, payload.duplicate_ids))).all()
+    row = (await db.execute(update_contact_statement(current_user.id, payload.primary_id, changes, change_seq))).first()
+    if row is None or len(deleted) != len(payload.duplicate_ids):
+        # A concurrent request deleted one of them after they were read.
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Contacts not found")
+    await record_tombstones(db, current_user.id, deleted, change_seq)
+    await db.commit()
+    await contact_cache.invalidate(current_user.id)
+    logger.info(f"Merged {len(payload.duplicate_ids)} contacts into {payload.primary_id} for {current_user.email}")
+    return contact_response(
+        list(row[:-2]), validator_headers(contact_etag(payload.primary_id, row[-2]), http_date(row[-1]))
+    )
@@ -1,19 +1,23 @@
 from fastapi import HTTPException
-from fastapi_mail import ConnectionConfig
 from decouple import config
 import logging
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=config("MAIL_USERNAME"),
-    MAIL_PASSWORD=config("MAIL_PASSWORD"),
-    MAIL_FROM=config("MAIL_FROM"),
-    MAIL_PORT=config("MAIL_PORT"),
-    MAIL_SERVER=config("MAIL_SERVER"),
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=False
-)
+
+def build_mail_config():
+    # fastapi_mail pulls in jinja2 and friends, so it is only imported when mail is configured.
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=config("MAIL_USERNAME"),
+        MAIL_PASSWORD=config("MAIL_PASSWORD"),
+        MAIL_FROM=config("MAIL_FROM"),
+        MAIL_PORT=config("MAIL_PORT"),
+        MAIL_SERVER=config("MAIL_SERVER"),
+        MAIL_STARTTLS=True,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=False
+    )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -1,17 +1,74 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from contacts_api.database import SessionLocal, engine
-from contacts_api.models import Base, Contact, User
-from contacts_api.schemas import ContactCreate, ContactResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from contacts_api.database import get_db, pool_status
+from contacts_api.models import Contact
+from contacts_api.schemas import ContactCreate, ContactResponse, ContactPage, ContactUpdate
 from contacts_api.auth import auth_router, get_current_user
-from contacts_api.main_router import main_router 
+from contacts_api.avatars import LocalStorage, avatar_pipeline
+from contacts_api.birthdays import upcoming_birthdays_statement
+from contacts_api.bulk import bulk_router
+from contacts_api.changes import changes_router
+from contacts_api.cache import contact_cache
+from contacts_api.conditional import (
+    bump_contacts_generation,
+    collection_etag,
+    collection_validator,
+    contact_etag,
+    contact_validator,
+    etag_matches,
+    http_date,
+    if_match_version,
+    not_modified,
+    validator_headers,
+)
+from contacts_api.digests import BIRTHDAY_DIGEST_SCHEDULE, digest_scheduler
+from contacts_api.duplicates import duplicates_router
+from contacts_api.metrics import MetricsMiddleware, install_query_metrics, metrics, require_internal_access
+from contacts_api.mutations import delete_contact_statement, raise_missing, record_tombstones, update_contact_statement
+from contacts_api.outbox import outbox_worker
+from contacts_api.pagination import encode_cursor, decode_cursor
+from contacts_api.phones import phones_router
+from contacts_api.rate_limit import RateLimitHeadersMiddleware, rate_limiter
+from contacts_api.resources import resources
+from contacts_api.search import search_statement
+from contacts_api.serialization import (
+    ID_POSITION,
+    contact_columns,
+    contact_ndjson,
+    contact_page_response,
+    contact_response,
+    contacts_response,
+    fetch_contact_rows,
+)
+from contacts_api.user_cache import CurrentUser, user_cache
+from contacts_api.utils import password_hasher
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
-from datetime import date, timedelta
+from datetime import date
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await resources.startup()
+    # Each worker drops its cached principals when another one resets a password.
+    user_cache.start_listener(resources.redis)
+    outbox_worker.start()
+    if BIRTHDAY_DIGEST_SCHEDULE:
+        digest_scheduler.start()
+    yield
+    await digest_scheduler.stop()
+    await outbox_worker.stop()
+    await user_cache.stop_listener()
+    avatar_pipeline.shutdown()
+    await resources.shutdown()
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,22 +77,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RateLimitHeadersMiddleware)
+# Added last so it wraps everything, including CORS preflights.
+app.add_middleware(MetricsMiddleware)
+install_query_metrics()
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
-app.include_router(main_router, prefix="/contacts", tags=["Contacts"])
+if isinstance(avatar_pipeline.storage, LocalStorage):
+    storage = avatar_pipeline.storage
+    app.mount(storage.base_url, StaticFiles(directory=storage.root, check_dir=False), name="avatars")
 
+# Registered before /contacts/{contact_id} so their fixed paths take precedence.
+app.include_router(bulk_router, prefix="/contacts", tags=["Contacts"])
+app.include_router(changes_router, prefix="/contacts", tags=["Contacts"])
+app.include_router(duplicates_router, prefix="/contacts", tags=["Contacts"])
+app.include_router(phones_router, prefix="/contacts", tags=["Contacts"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        try:
-            db.close()
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+DEFAULT_SEARCH_LIMIT = 50
+INTERNAL = [Depends(require_internal_access)]
 
 
 @app.get("/")
@@ -43,97 +106,265 @@ def root() -> dict:
     return {"message": "Welcome to the Contacts API!"}
 
 
+@app.get("/metrics", include_in_schema=False, dependencies=INTERNAL)
+def prometheus_metrics() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/internal/stats/db-pool", include_in_schema=False, dependencies=INTERNAL)
+def db_pool_stats() -> dict:
+    return pool_status()
+
+
+@app.get("/internal/stats/contact-cache", include_in_schema=False, dependencies=INTERNAL)
+def contact_cache_stats() -> dict:
+    return contact_cache.stats.snapshot()
+
+
+@app.get("/internal/stats/user-cache", include_in_schema=False, dependencies=INTERNAL)
+def user_cache_stats() -> dict:
+    return user_cache.stats()
+
+
+@app.get("/internal/stats/redis", include_in_schema=False, dependencies=INTERNAL)
+def redis_stats() -> dict:
+    return resources.redis.breaker.stats()
+
+
+@app.get("/internal/health/redis", include_in_schema=False)
+async def redis_health() -> JSONResponse:
+    health = await resources.redis.health()
+    return JSONResponse(health, status_code=200 if health["status"] == "ok" else 503)
+
+
+@app.get("/internal/stats/rate-limit", include_in_schema=False, dependencies=INTERNAL)
+def rate_limit_stats() -> dict:
+    return rate_limiter.stats()
+
+
+@app.get("/internal/stats/password-hasher", include_in_schema=False, dependencies=INTERNAL)
+def password_hasher_stats() -> dict:
+    return password_hasher.stats()
+
+
+@app.get("/internal/stats/email-outbox", include_in_schema=False, dependencies=INTERNAL)
+def email_outbox_stats() -> dict:
+    return outbox_worker.metrics.snapshot()
+
+
 @app.post("/contacts/", response_model=ContactResponse)
-def create_contact(
+async def create_contact(
     contact: ContactCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> ContactResponse:
-    db_contact = Contact(**contact.dict(), user_id=current_user.id)
+    change_seq = await bump_contacts_generation(db, current_user.id)
+    db_contact = Contact(**contact.model_dump(), user_id=current_user.id, change_seq=change_seq)
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Contact with this email already exists")
+    await contact_cache.invalidate(current_user.id)
+    await db.refresh(db_contact)
+    response.headers.update(_contact_headers(db_contact))
     return db_contact
 
 
-@app.get("/contacts/", response_model=List[ContactResponse])
-def get_contacts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-) -> List[ContactResponse]:
-    return db.query(Contact).filter(Contact.user_id == current_user.id).all()
+def _contact_headers(contact: Contact) -> dict:
+    return validator_headers(contact_etag(contact.id, contact.version), http_date(contact.updated_at))
+
+
+async def _stream_contacts(bind, statement):
+    # The request-scoped session is closed before the body is sent, so the
+    # stream opens its own session on the same bind and reads in batches.
+    async with AsyncSession(bind=bind) as session:
+        rows = await session.stream(contact_columns(statement).execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for row in rows:
+            yield contact_ndjson(row)
+
+
+@app.get("/contacts/", response_model=ContactPage)
+async def get_contacts(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> ContactPage:
+    if cursor:
+        try:
+            after_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    statement = select(Contact).where(Contact.user_id == current_user.id)
+    if after_id is not None:
+        statement = statement.where(Contact.id > after_id)
+    statement = statement.order_by(Contact.id)
+    page = {"after_id": after_id, "stream": True} if stream else {"after_id": after_id, "limit": limit}
+
+    # A revalidation costs one primary-key read of the owner's change generation.
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match or stream:
+        generation, updated_at = await collection_validator(db, current_user.id)
+        headers = validator_headers(collection_etag(generation, page), http_date(updated_at))
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers)
+
+    if stream:
+        return StreamingResponse(
+            _stream_contacts(db.bind, statement),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+
+    async def load() -> list:
+        # Read in the same transaction as the rows, so the generation describes them.
+        generation, updated_at = await collection_validator(db, current_user.id)
+        rows = await fetch_contact_rows(db, statement.limit(limit + 1))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][ID_POSITION])
+        return [rows, next_cursor, generation, http_date(updated_at)]
+
+    rows, next_cursor, generation, last_modified = await contact_cache.get_or_load(
+        current_user.id, "list:v2", page, load
+    )
+    return contact_page_response(rows, next_cursor, validator_headers(collection_etag(generation, page), last_modified))
 
 
 @app.get("/contacts/{contact_id}", response_model=ContactResponse)
-def get_contact(
+async def get_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> ContactResponse:
-    contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not contact:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        validator = await contact_validator(db, current_user.id, contact_id)
+        if validator is None:
+            raise HTTPException(status_code=404, detail="Contact not found")
+        version, updated_at = validator
+        headers = validator_headers(contact_etag(contact_id, version), http_date(updated_at))
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers)
+
+    async def load() -> list:
+        statement = select(Contact).where(Contact.id == contact_id, Contact.user_id == current_user.id)
+        row = (await db.execute(contact_columns(statement).add_columns(Contact.version, Contact.updated_at))).first()
+        return [list(row[:-2]), row[-2], http_date(row[-1])] if row else []
+
+    cached = await contact_cache.get_or_load(current_user.id, "contact:v2", {"id": contact_id}, load)
+    if not cached:
         raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
+    row, version, last_modified = cached
+    return contact_response(row, validator_headers(contact_etag(contact_id, version), last_modified))
+
+
+async def _write_contact(db: AsyncSession, user_id: int, contact_id: int, changes: dict, if_match: Optional[str]):
+    # One UPDATE ... RETURNING: the version check, the write and the response row in a single statement.
+    version = if_match_version(if_match, contact_id)
+    try:
+        change_seq = await bump_contacts_generation(db, user_id)
+        row = (await db.execute(update_contact_statement(user_id, contact_id, changes, change_seq, version))).first()
+        if row is None:
+            await raise_missing(db, user_id, contact_id, version)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Contact with this email already exists")
+    await contact_cache.invalidate(user_id)
+    return contact_response(list(row[:-2]), validator_headers(contact_etag(contact_id, row[-2]), http_date(row[-1])))
 
 
 @app.put("/contacts/{contact_id}", response_model=ContactResponse)
-def update_contact(
+async def update_contact(
     contact_id: int,
     contact: ContactCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> ContactResponse:
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not db_contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    for key, value in contact.dict().items():
-        setattr(db_contact, key, value)
-    db.commit()
-    db.refresh(db_contact)
-    return db_contact
+    return await _write_contact(db, current_user.id, contact_id, contact.model_dump(), request.headers.get("if-match"))
+
+
+@app.patch("/contacts/{contact_id}", response_model=ContactResponse)
+async def patch_contact(
+    contact_id: int,
+    contact: ContactUpdate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
+) -> ContactResponse:
+    changes = contact.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    return await _write_contact(db, current_user.id, contact_id, changes, request.headers.get("if-match"))
 
 
 @app.delete("/contacts/{contact_id}")
-def delete_contact(
+async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> dict:
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not db_contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    db.delete(db_contact)
-    db.commit()
+    version = if_match_version(request.headers.get("if-match"), contact_id)
+    change_seq = await bump_contacts_generation(db, current_user.id)
+    deleted = await db.scalar(delete_contact_statement(current_user.id, contact_id, version))
+    if deleted is None:
+        await raise_missing(db, current_user.id, contact_id, version)
+    await record_tombstones(db, current_user.id, [deleted], change_seq)
+    await db.commit()
+    await contact_cache.invalidate(current_user.id)
     return {"message": "Contact deleted successfully"}
 
 
 @app.get("/contacts/search/", response_model=List[ContactResponse])
-def search_contacts(
+async def search_contacts(
+    q: Optional[str] = None,
     first_name: Optional[str] = None,
     last_name: Optional[str] = None,
     email: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    fuzzy: bool = False,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> List[ContactResponse]:
-    query = db.query(Contact).filter(Contact.user_id == current_user.id)
-    if first_name:
-        query = query.filter(Contact.first_name.ilike(f"%{first_name}%"))
-    if last_name:
-        query = query.filter(Contact.last_name.ilike(f"%{last_name}%"))
-    if email:
-        query = query.filter(Contact.email.ilike(f"%{email}%"))
-    return query.all()
+    params = {
+        "q": q,
+        "first_name": first_name,
+        "last_name": last_name,
+        "email": email,
+        "fuzzy": fuzzy,
+        "limit": limit,
+    }
+
+    async def load() -> list:
+        statement = search_statement(db.get_bind().dialect.name, current_user.id, **params)
+        return await fetch_contact_rows(db, statement)
+
+    return contacts_response(await contact_cache.get_or_load(current_user.id, "search", params, load))
 
 
 @app.get("/contacts/upcoming-birthdays/", response_model=List[ContactResponse])
-def get_upcoming_birthdays(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_upcoming_birthdays(
+    days: int = Query(7, ge=1, le=365),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user)
 ) -> List[ContactResponse]:
     today = date.today()
-    next_week = today + timedelta(days=7)
-    return db.query(Contact).filter(
-        Contact.user_id == current_user.id,
-        Contact.birthday.isnot(None),
-        Contact.birthday.between(today, next_week)
-    ).all()
+
+    async def load() -> list:
+        statement = upcoming_birthdays_statement(current_user.id, today, days)
+        return await fetch_contact_rows(db, statement)
+
+    params = {"today": today.isoformat(), "days": days}
+    return contacts_response(await contact_cache.get_or_load(current_user.id, "birthdays", params, load))
@@ -0,0 +1,257 @@
+import hmac
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from ipaddress import ip_address, ip_network
+from typing import Optional
+
+from decouple import Csv, config
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SERVER_TIMING = config("SERVER_TIMING", default=False, cast=bool)
+# /metrics and /internal/stats/* are served to these client networks, or to
+# anyone sending "Authorization: Bearer <INTERNAL_API_TOKEN>" when it is set.
+INTERNAL_ALLOWED_NETWORKS = [
+    ip_network(value, strict=False) for value in config("INTERNAL_ALLOWED_NETWORKS", default="127.0.0.1,::1", cast=Csv())
+]
+INTERNAL_API_TOKEN = config("INTERNAL_API_TOKEN", default="")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+REDIS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_seconds", "redis_calls", "redis_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+
+
+# The SQLAlchemy greenlets and the endpoint share the request's context,
+# so hooks deep in the stack can add to the stats of the request they serve.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class MetricsRegistry:
+    # Only touched from the event loop thread, so no locking is needed.
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.in_flight = {}
+        self.latency = {}
+        self.response_size = {}
+        self.db_queries = {}
+        self.db_seconds = {}
+        self.redis_latency = {}
+        self.redis_errors = {}
+
+    def _histogram(self, family: dict, labels: tuple, buckets: tuple) -> Histogram:
+        histogram = family.get(labels)
+        if histogram is None:
+            histogram = family[labels] = Histogram(buckets)
+        return histogram
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int, stats: RequestStats) -> None:
+        self._histogram(self.latency, (method, route, str(status)), LATENCY_BUCKETS).observe(seconds)
+        self._histogram(self.response_size, (method, route), SIZE_BUCKETS).observe(size)
+        self._histogram(self.db_queries, (method, route), QUERY_COUNT_BUCKETS).observe(stats.db_queries)
+        self.db_seconds[(method, route)] = self.db_seconds.get((method, route), 0.0) + stats.db_seconds
+
+    def observe_redis(self, command: str, seconds: float, failed: bool = False) -> None:
+        self._histogram(self.redis_latency, (command,), REDIS_BUCKETS).observe(seconds)
+        if failed:
+            self.redis_errors[command] = self.redis_errors.get(command, 0) + 1
+
+    def render(self) -> str:
+        lines = []
+        self._render_gauge(lines, "http_requests_in_flight", "Requests currently being served.", ("method",), {
+            (method,): value for method, value in self.in_flight.items()
+        })
+        self._render_histograms(lines, "http_request_duration_seconds", "Request latency by route.",
+                                ("method", "route", "status"), self.latency)
+        self._render_histograms(lines, "http_response_size_bytes", "Response body size by route.",
+                                ("method", "route"), self.response_size)
+        self._render_histograms(lines, "db_queries_per_request", "SQL statements executed per request.",
+                                ("method", "route"), self.db_queries)
+        self._render_counter(lines, "db_query_seconds_total", "Time spent in SQL statements by route.",
+                             ("method", "route"), self.db_seconds)
+        self._render_histograms(lines, "redis_command_duration_seconds", "Redis command latency.",
+                                ("command",), self.redis_latency)
+        self._render_counter(lines, "redis_command_errors_total", "Failed Redis commands.",
+                             ("command",), {(command,): value for command, value in self.redis_errors.items()})
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _render_gauge(self, lines: list, name: str, help_text: str, names: tuple, values: dict) -> None:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{self._labels(names, labels)} {value}")
+
+    def _render_counter(self, lines: list, name: str, help_text: str, names: tuple, values: dict) -> None:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{self._labels(names, labels)} {value:g}")
+
+    def _render_histograms(self, lines: list, name: str, help_text: str, names: tuple, family: dict) -> None:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, histogram in sorted(family.items()):
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = self._labels(names, labels, f'le="{le}"')
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{self._labels(names, labels)} {histogram.sum:g}")
+            lines.append(f"{name}_count{self._labels(names, labels)} {histogram.count}")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware: no extra task or body buffering per request.
+    def __init__(self, app, registry: MetricsRegistry = metrics, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        method = scope["method"]
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        registry.in_flight[method] = registry.in_flight.get(method, 0) + 1
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - started)))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_flight[method] -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            registry.observe_request(method, path, status, elapsed, size, stats)
+            current_request.reset(token)
+
+
+def _server_timing(stats: RequestStats, seconds: float) -> bytes:
+    parts = [f"app;dur={seconds * 1000:.2f}"]
+    if stats.db_queries:
+        parts.append(f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.db_queries} queries"')
+    if stats.redis_calls:
+        parts.append(f'redis;dur={stats.redis_seconds * 1000:.2f};desc="{stats.redis_calls} calls"')
+    return ", ".join(parts).encode("latin-1")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is dropped with the statement even when it fails.
+    if current_request.get() is not None and context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_started", None)
+    if started is not None:
+        stats.db_seconds += time.perf_counter() - started
+    stats.db_queries += 1
+
+
+def install_query_metrics(target=Engine) -> None:
+    # Listening on the Engine class covers every engine, including the ones tests create.
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+def _is_allowed_client(host: Optional[str]) -> bool:
+    try:
+        address = ip_address(host or "")
+    except ValueError:
+        return False
+    return any(address in network for network in INTERNAL_ALLOWED_NETWORKS)
+
+
+def require_internal_access(request: Request) -> None:
+    if _is_allowed_client(request.client.host if request.client else None):
+        return
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if INTERNAL_API_TOKEN and scheme.lower() == "bearer" and hmac.compare_digest(token, INTERNAL_API_TOKEN):
+        return
+    raise HTTPException(status_code=403, detail="Forbidden")
+
+
+async def timed_redis(command: str, awaitable, registry: MetricsRegistry = metrics):
+    started = time.perf_counter()
+    failed = False
+    try:
+        return await awaitable
+    except Exception:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe_redis(command, seconds, failed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.redis_calls += 1
+            stats.redis_seconds += seconds
@@ -1,20 +1,77 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from datetime import date, datetime, timezone
+from typing import Optional, Union
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index, DateTime, Text, false, text
+from sqlalchemy.orm import relationship, validates
 from contacts_api.database import Base
+from contacts_api.normalization import derived_keys
+
+
+def birthday_key(value: Optional[Union[date, str]]) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.month * 100 + value.day
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 
 class Contact(Base):
     __tablename__ = "contacts"
 
     id = Column(Integer, primary_key=True, index=True)
-    first_name = Column(String, index=True)
-    last_name = Column(String, index=True)
-    email = Column(String, unique=True, index=True)
+    first_name = Column(String)
+    last_name = Column(String)
+    email = Column(String)
     phone = Column(String)
     birthday = Column(String)
+    birthday_md = Column(Integer)
     additional_info = Column(String)
+    # Derived from the fields above on write: blocking keys for duplicate detection and phone lookup.
+    email_key = Column(String)
+    phone_e164 = Column(String)
+    phone_reversed = Column(String)
+    first_name_key = Column(String)
+    last_name_key = Column(String)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    # The owner's contacts_generation as of this contact's last write; delta sync reads ranges of it.
+    change_seq = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
     user_id = Column(Integer, ForeignKey("users.id")) 
     user = relationship("User", back_populates="contacts")
 
+    # Every contact query is scoped to its owner, so indexes lead with user_id.
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_name", "user_id", "last_name", "first_name"),
+        Index("uq_contacts_user_email", "user_id", "email", unique=True),
+        Index("ix_contacts_user_birthday_md", "user_id", "birthday_md"),
+        Index("ix_contacts_user_email_key", "user_id", "email_key"),
+        Index("ix_contacts_user_phone_e164", "user_id", "phone_e164"),
+        Index("ix_contacts_user_phone_reversed", "user_id", "phone_reversed"),
+        Index("ix_contacts_user_name_keys", "user_id", "last_name_key", "first_name_key"),
+        Index("ix_contacts_user_change_seq", "user_id", "change_seq"),
+        # Ids are never reused, so a deleted contact's id and ETag cannot come back.
+        {"sqlite_autoincrement": True},
+    )
+    # Flushes add "AND version = :old" to UPDATE/DELETE, so a concurrent write raises StaleDataError.
+    __mapper_args__ = {"version_id_col": version}
+
+    @validates("birthday")
+    def _set_birthday_md(self, key, value):
+        if isinstance(value, date):
+            value = value.isoformat()
+        self.birthday_md = birthday_key(value)
+        return value
+
+    @validates("email", "phone", "first_name", "last_name")
+    def _set_derived_keys(self, key, value):
+        for column, derived in derived_keys({key: value}).items():
+            setattr(self, column, derived)
+        return value
+
 
 class User(Base):
     __tablename__ = "users"
@@ -24,4 +81,66 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
     is_verified = Column(Boolean, default=False)
+    avatar_url = Column(String)
+    # Bumped with every change to the user's contacts; the collection ETag is derived from it.
+    contacts_generation = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    contacts_updated_at = Column(DateTime(timezone=True))
+    # Tombstones up to this change sequence have been compacted, so older delta syncs must start over.
+    tombstones_compacted_seq = Column(Integer, nullable=False, default=0, server_default=text("0"))
     contacts = relationship("Contact", back_populates="user")
+
+
+class ContactTombstone(Base):
+    __tablename__ = "contact_tombstones"
+
+    # A deleted contact, kept so delta sync can report the delete until it is compacted.
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    contact_id = Column(Integer, nullable=False)
+    change_seq = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_change_seq", "user_id", "change_seq"),
+        Index("ix_contact_tombstones_deleted_at", "deleted_at"),
+    )
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    dedupe_key = Column(String)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+        # At most one pending message per dedupe key; a repeat request updates it instead.
+        Index(
+            "uq_email_outbox_pending_dedupe",
+            "dedupe_key",
+            unique=True,
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+
+    # One row per batch job: which run it is on, how far that run got and who holds it.
+    name = Column(String, primary_key=True)
+    run_key = Column(String)
+    last_key = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    completed = Column(Boolean, nullable=False, default=False, server_default=false())
+    locked_until = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
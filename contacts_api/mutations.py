@@ -0,0 +1,85 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.models import Contact, ContactTombstone, birthday_key, utcnow
+from contacts_api.normalization import derived_keys
+from contacts_api.serialization import CONTACT_COLUMNS
+
+# Mutations return the row they wrote, so no SELECT before or refresh after is needed.
+RETURNED_COLUMNS = CONTACT_COLUMNS + (Contact.version, Contact.updated_at)
+
+
+def update_values(changes: dict, change_seq: int) -> dict:
+    values = dict(changes)
+    # Core statements bypass the model's @validates hooks, so derived columns are set here.
+    values.update(derived_keys(values))
+    if "birthday" in values:
+        birthday = values["birthday"]
+        values["birthday"] = birthday.isoformat() if birthday else None
+        values["birthday_md"] = birthday_key(birthday)
+    values["version"] = Contact.version + 1
+    values["updated_at"] = utcnow()
+    values["change_seq"] = change_seq
+    return values
+
+
+def update_contact_statement(user_id: int, contact_id: int, changes: dict, change_seq: int,
+                             version: Optional[int] = None):
+    statement = update(Contact).where(Contact.id == contact_id, Contact.user_id == user_id)
+    if version is not None:
+        statement = statement.where(Contact.version == version)
+    return (
+        statement.values(**update_values(changes, change_seq))
+        .returning(*RETURNED_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_contact_statement(user_id: int, contact_id: int, version: Optional[int] = None):
+    statement = delete(Contact).where(Contact.id == contact_id, Contact.user_id == user_id)
+    if version is not None:
+        statement = statement.where(Contact.version == version)
+    return statement.returning(Contact.id).execution_options(synchronize_session=False)
+
+
+def update_contacts_statement(user_id: int, ids: list, changes: dict, change_seq: int):
+    return (
+        update(Contact)
+        .where(Contact.user_id == user_id, Contact.id.in_(ids))
+        .values(**update_values(changes, change_seq))
+        .returning(Contact.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_contacts_statement(user_id: int, ids: list):
+    return (
+        delete(Contact)
+        .where(Contact.user_id == user_id, Contact.id.in_(ids))
+        .returning(Contact.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def record_tombstones(db: AsyncSession, user_id: int, ids: list, change_seq: int) -> None:
+    # Hard deletes leave a tombstone, so delta sync can tell clients what to drop.
+    if ids:
+        now = utcnow()
+        await db.execute(insert(ContactTombstone), [
+            {"user_id": user_id, "contact_id": contact_id, "change_seq": change_seq, "deleted_at": now} for contact_id in ids
+        ])
+
+
+async def raise_missing(db: AsyncSession, user_id: int, contact_id: int, version: Optional[int]) -> None:
+    # Only reached when the write matched nothing: tell a stale If-Match from a missing contact.
+    # The generation bump taken for the write is rolled back with it.
+    exists = None
+    if version is not None:
+        exists = await db.scalar(select(Contact.id).where(Contact.id == contact_id, Contact.user_id == user_id))
+    await db.rollback()
+    if exists:
+        raise HTTPException(status_code=412, detail="Contact was modified by another request")
+    raise HTTPException(status_code=404, detail="Contact not found")
@@ -0,0 +1,112 @@
+import re
+import unicodedata
+from typing import Optional
+
+from decouple import config
+
+# Empty means numbers without "+" or "00" get no E.164 key: their country is unknown.
+PHONE_DEFAULT_COUNTRY_CODE = config("PHONE_DEFAULT_COUNTRY_CODE", default="")
+PHONE_TRUNK_PREFIX = config("PHONE_TRUNK_PREFIX", default="0")
+# Providers that ignore dots in the local part of an address.
+DOTLESS_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+
+PHONE_EXTENSION_RE = re.compile(r"\s*(?:ext\.?|x|#|;)\s*\d+$", re.IGNORECASE)
+PHONE_CHARS_RE = re.compile(r"[+\d\s().\-/]+")
+NON_DIGITS_RE = re.compile(r"\D")
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ye", "ж": "zh", "з": "z",
+    "и": "y", "і": "i", "ї": "yi", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "shch", "ь": "", "ю": "yu", "я": "ya", "ы": "y", "э": "e", "ё": "yo", "ъ": "",
+}
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+
+def email_key(value: Optional[str]) -> Optional[str]:
+    # Case, "+tag" suffixes and Gmail dots do not change where mail is delivered.
+    if not value or "@" not in value:
+        return None
+    local, _, domain = value.strip().casefold().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local, domain = local.replace(".", ""), DOTLESS_DOMAINS[domain]
+    return f"{local}@{domain}" if local else None
+
+
+def e164(value: Optional[str], country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    # Only derived when the country is known: an explicit "+" or "00", or a trunk prefix with a
+    # configured default country. The key is for the line itself; the stored phone keeps any extension.
+    if not value:
+        return None
+    value = PHONE_EXTENSION_RE.sub("", value.strip())
+    if not PHONE_CHARS_RE.fullmatch(value):
+        return None
+    digits = NON_DIGITS_RE.sub("", value)
+    if value.startswith("+"):
+        pass
+    elif value.startswith("00"):
+        digits = digits[2:]
+    elif country_code and PHONE_TRUNK_PREFIX and digits.startswith(PHONE_TRUNK_PREFIX):
+        digits = country_code + digits[len(PHONE_TRUNK_PREFIX):]
+    else:
+        return None
+    if not 8 <= len(digits) <= 15 or digits[0] == "0":
+        return None
+    return f"+{digits}"
+
+
+def reversed_digits(value: Optional[str]) -> Optional[str]:
+    # Reversed, a "last N digits" match becomes a prefix range on an index. Without a known
+    # country the line's own digits are used, so national-format numbers are still found.
+    number = e164(value)
+    if number:
+        return number[:0:-1]
+    if not value:
+        return None
+    line = PHONE_EXTENSION_RE.sub("", value.strip())
+    if not PHONE_CHARS_RE.fullmatch(line):
+        return None
+    return NON_DIGITS_RE.sub("", line)[::-1] or None
+
+
+def transliterate(value: str) -> str:
+    return "".join(CYRILLIC.get(char, char) for char in value.casefold())
+
+
+def _latin(value: str) -> str:
+    value = transliterate(value)
+    return "".join(char for char in unicodedata.normalize("NFKD", value) if "a" <= char <= "z")
+
+
+def name_key(value: Optional[str]) -> Optional[str]:
+    # Soundex of the transliterated name, so "Jon"/"John" and "Іван"/"Ivan" share a key.
+    letters = _latin(value or "")
+    if not letters:
+        return None
+    key, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0])
+    for char in letters[1:]:
+        code = SOUNDEX_CODES.get(char)
+        if code and code != previous:
+            key += code
+            if len(key) == 4:
+                break
+        if char not in "hw":
+            previous = code
+    return key.ljust(4, "0")
+
+
+DERIVED_KEYS = (
+    ("email", "email_key", email_key),
+    ("phone", "phone_e164", e164),
+    ("phone", "phone_reversed", reversed_digits),
+    ("first_name", "first_name_key", name_key),
+    ("last_name", "last_name_key", name_key),
+)
+
+
+def derived_keys(values: dict) -> dict:
+    # Derived columns for whichever source fields are present in `values`.
+    return {column: derive(values[field]) for field, column, derive in DERIVED_KEYS if field in values}
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from threading import Lock
+from typing import TYPE_CHECKING, List, Optional
+
+import aiosmtplib
+from decouple import config
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.database import AsyncSessionLocal
+from contacts_api.models import EmailOutbox, utcnow
+from contacts_api.resources import resources
+
+if TYPE_CHECKING:
+    from fastapi_mail import ConnectionConfig
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=50, cast=int)
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", default=5.0, cast=float)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+OUTBOX_RETRY_BASE = config("OUTBOX_RETRY_BASE", default=30.0, cast=float)
+OUTBOX_RETRY_MAX = config("OUTBOX_RETRY_MAX", default=3600.0, cast=float)
+# A claimed batch becomes due again if its worker dies before recording the outcome.
+OUTBOX_LEASE_SECONDS = config("OUTBOX_LEASE_SECONDS", default=300, cast=int)
+
+
+async def enqueue_email(
+    db: AsyncSession,
+    recipient: str,
+    subject: str,
+    body: str,
+    dedupe_key: Optional[str] = None,
+) -> EmailOutbox:
+    if dedupe_key is not None:
+        queued = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.dedupe_key == dedupe_key, EmailOutbox.status.in_(("pending", "retry")))
+            .order_by(EmailOutbox.status)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # One statement with the status guard, so a row a worker has just claimed is left alone
+        # and the new content goes into a row of its own. The new content is a new message: it
+        # goes out now, with a fresh attempt budget, not at the old one's backoff.
+        statement = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id == queued, EmailOutbox.status.in_(("pending", "retry")))
+            .values(recipient=recipient, subject=subject, body=body, status="pending", attempts=0,
+                    last_error=None, next_attempt_at=utcnow())
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        message = await db.scalar(statement)
+        if message is not None:
+            return message
+    message = EmailOutbox(recipient=recipient, subject=subject, body=body, dedupe_key=dedupe_key)
+    db.add(message)
+    return message
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(OUTBOX_RETRY_MAX, OUTBOX_RETRY_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sent = 0
+            self.retried = 0
+            self.failed = 0
+            self.batches = 0
+            self.connections = 0
+            self.send_seconds = 0.0
+
+    def record_batch(self, sent: int, retried: int, failed: int, seconds: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.sent += sent
+            self.retried += retried
+            self.failed += failed
+            self.send_seconds += seconds
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "batches": self.batches,
+                "connections": self.connections,
+                "messages_per_second": round(self.sent / self.send_seconds, 2) if self.send_seconds else 0.0,
+            }
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        mail_config: Optional["ConnectionConfig"] = None,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    ):
+        self.session_factory = session_factory
+        self._mail_config = mail_config
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.metrics = OutboxMetrics()
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def mail_config(self) -> "ConnectionConfig":
+        # The shared mail settings are only built once the worker sends something.
+        if self._mail_config is None:
+            self._mail_config = resources.mail_config
+        return self._mail_config
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+        mail = self.mail_config
+        smtp = aiosmtplib.SMTP(
+            hostname=mail.MAIL_SERVER,
+            port=mail.MAIL_PORT,
+            use_tls=mail.MAIL_SSL_TLS,
+            start_tls=mail.MAIL_STARTTLS,
+            validate_certs=mail.VALIDATE_CERTS,
+            timeout=mail.TIMEOUT,
+        )
+        await smtp.connect()
+        if mail.USE_CREDENTIALS:
+            await smtp.login(mail.MAIL_USERNAME, mail.MAIL_PASSWORD.get_secret_value())
+        self._smtp = smtp
+        self.metrics.record_connection()
+        return smtp
+
+    async def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            if self._smtp.is_connected:
+                await self._smtp.quit()
+        except aiosmtplib.SMTPException as e:
+            logger.warning(f"Failed to close SMTP connection cleanly: {e}")
+        self._smtp = None
+
+    def _build_message(self, item: EmailOutbox) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((self.mail_config.MAIL_FROM_NAME or "", str(self.mail_config.MAIL_FROM)))
+        message["To"] = item.recipient
+        message["Subject"] = item.subject
+        message.set_content(item.body, subtype="html")
+        return message
+
+    async def _claim(self, session: AsyncSession) -> List[EmailOutbox]:
+        now = utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status.in_(("pending", "retry", "sending")), EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        # Claiming flips the rows to "sending" in one statement, so concurrent
+        # workers never pick up the same message.
+        statement = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due))
+            .values(status="sending", next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        items = (await session.scalars(statement)).all()
+        await session.commit()
+        return sorted(items, key=lambda item: item.id)
+
+    async def _deliver(self, item: EmailOutbox) -> Optional[str]:
+        try:
+            smtp = await self._connection()
+            await smtp.send_message(self._build_message(item))
+            return None
+        except (aiosmtplib.SMTPException, OSError) as e:
+            if self._smtp is not None and not self._smtp.is_connected:
+                self._smtp = None
+            return str(e) or type(e).__name__
+
+    async def run_once(self) -> int:
+        async with self.session_factory() as session:
+            items = await self._claim(session)
+            if not items:
+                return 0
+            started = time.perf_counter()
+            sent = retried = failed = 0
+            try:
+                await self._connection()
+                connect_error = None
+            except (aiosmtplib.SMTPException, OSError) as e:
+                connect_error = f"SMTP connection failed: {e}"
+                logger.error(connect_error)
+            for item in items:
+                error = connect_error or await self._deliver(item)
+                item.attempts += 1
+                if error is None:
+                    item.status = "sent"
+                    item.sent_at = utcnow()
+                    item.last_error = None
+                    sent += 1
+                elif item.attempts >= self.max_attempts:
+                    item.status = "failed"
+                    item.last_error = error
+                    failed += 1
+                    logger.error(f"Giving up on email {item.id} to {item.recipient}: {error}")
+                else:
+                    item.status = "retry"
+                    item.next_attempt_at = utcnow() + timedelta(seconds=retry_delay(item.attempts))
+                    item.last_error = error
+                    retried += 1
+            await session.commit()
+            self.metrics.record_batch(sent, retried, failed, time.perf_counter() - started)
+            logger.info(f"Email outbox batch: {sent} sent, {retried} retried, {failed} failed")
+            return len(items)
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker failed: {e}")
+                processed = 0
+            if processed >= self.batch_size:
+                continue
+            # The queue is drained; keep the SMTP connection only while there is work.
+            await self.close()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.close()
+
+
+outbox_worker = OutboxWorker()
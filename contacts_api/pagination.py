@@ -0,0 +1,47 @@
+import base64
+import json
+from typing import Tuple
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(payload, dict):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return payload
+
+
+def _non_negative(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def encode_cursor(last_id: int) -> str:
+    return _encode({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    last_id = _decode(cursor).get("id")
+    if not _non_negative(last_id):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return last_id
+
+
+def encode_change_cursor(seq: int, phase: int, last_id: int, full: bool, until: int) -> str:
+    return _encode({"seq": seq, "phase": phase, "id": last_id, "full": full, "until": until})
+
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int, int, bool, int]:
+    payload = _decode(cursor)
+    position = (payload.get("seq"), payload.get("phase"), payload.get("id"), payload.get("full"), payload.get("until"))
+    if (not all(_non_negative(value) for value in (*position[:3], position[4])) or position[1] > 1
+            or not isinstance(position[3], bool)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return position
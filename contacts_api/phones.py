@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+
+from decouple import config
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.auth import get_current_user
+from contacts_api.cache import CONTACT_FIELDS, contact_cache
+from contacts_api.database import AsyncSessionLocal, get_db
+from contacts_api.models import Contact
+from contacts_api.normalization import NON_DIGITS_RE, derived_keys, e164
+from contacts_api.schemas import PhoneMatch
+from contacts_api.serialization import contact_columns
+from contacts_api.user_cache import CurrentUser
+
+logger = logging.getLogger(__name__)
+
+# Enough for the national number, so "+380 67 ...", "067 ..." and "67 ..." find the same contact.
+PHONE_LOOKUP_DIGITS = config("PHONE_LOOKUP_DIGITS", default=9, cast=int)
+PHONE_BACKFILL_BATCH_SIZE = config("PHONE_BACKFILL_BATCH_SIZE", default=1000, cast=int)
+MIN_LOOKUP_DIGITS = 4
+DEFAULT_LOOKUP_LIMIT = 20
+MAX_LOOKUP_LIMIT = 100
+PHONE_KEYS = ("phone_e164", "phone_reversed")
+
+phones_router = APIRouter()
+
+
+def lookup_prefix(phone: str, digits: int = PHONE_LOOKUP_DIGITS) -> str:
+    number = NON_DIGITS_RE.sub("", e164(phone) or phone)[-digits:]
+    if len(number) < MIN_LOOKUP_DIGITS:
+        raise ValueError(f"A lookup needs at least {MIN_LOOKUP_DIGITS} digits")
+    return number[::-1]
+
+
+def lookup_statement(user_id: int, prefix: str, limit: int = DEFAULT_LOOKUP_LIMIT):
+    # One range seek on (user_id, phone_reversed); ":" sorts right after "9".
+    return (
+        select(Contact)
+        .where(Contact.user_id == user_id, Contact.phone_reversed >= prefix, Contact.phone_reversed < prefix + ":")
+        .order_by(Contact.phone_reversed, Contact.id)
+        .limit(limit)
+    )
+
+
+@phones_router.get("/lookup", response_model=List[PhoneMatch])
+async def lookup_phone(
+    phone: str = Query(..., min_length=1, max_length=64),
+    digits: int = Query(PHONE_LOOKUP_DIGITS, ge=MIN_LOOKUP_DIGITS, le=15),
+    limit: int = Query(DEFAULT_LOOKUP_LIMIT, ge=1, le=MAX_LOOKUP_LIMIT),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+) -> ORJSONResponse:
+    try:
+        prefix = lookup_prefix(phone, digits)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    number = e164(phone)
+
+    async def load() -> list:
+        statement = contact_columns(lookup_statement(current_user.id, prefix, limit)).add_columns(Contact.phone_e164)
+        return [list(row) for row in await db.execute(statement)]
+
+    params = {"prefix": prefix, "limit": limit}
+    rows = await contact_cache.get_or_load(current_user.id, "lookup", params, load)
+    matches = [{**dict(zip(CONTACT_FIELDS, row)), "exact": number is not None and row[-1] == number} for row in rows]
+    matches.sort(key=lambda match: not match["exact"])
+    return ORJSONResponse(matches)
+
+
+async def backfill_phones(session_factory=AsyncSessionLocal, batch_size: int = PHONE_BACKFILL_BATCH_SIZE,
+                          after_id: int = 0) -> int:
+    # Short transactions in id order, so it can run next to live traffic and resume with after_id.
+    # Only the derived lookup columns are written; the phone stays exactly as the user typed it.
+    refresh = (
+        update(Contact.__table__)
+        .where(Contact.id == bindparam("contact_id"))
+        .values(**{name: bindparam(f"new_{name}") for name in PHONE_KEYS})
+    )
+    updated = 0
+    last_id = after_id
+    while True:
+        async with session_factory() as session:
+            rows = (await session.execute(
+                select(Contact.id, Contact.user_id, Contact.phone, *(getattr(Contact, name) for name in PHONE_KEYS))
+                .where(Contact.id > last_id)
+                .order_by(Contact.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            refreshes, owners = [], set()
+            for row in rows:
+                keys = derived_keys({"phone": row.phone})
+                if all(keys[name] == getattr(row, name) for name in PHONE_KEYS):
+                    continue
+                refreshes.append({"contact_id": row.id, **{f"new_{name}": keys[name] for name in PHONE_KEYS}})
+                owners.add(row.user_id)
+            if refreshes:
+                await session.execute(refresh, refreshes)
+            await session.commit()
+        # Cached lookups for these owners were computed without the new keys.
+        for user_id in owners:
+            await contact_cache.invalidate(user_id)
+        updated += len(refreshes)
+        last_id = rows[-1].id
+        logger.info(f"Phone backfill reached contact {last_id}, {updated} updated")
+    return updated
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fill the phone lookup columns from the stored phones")
+    parser.add_argument("--batch-size", type=int, default=PHONE_BACKFILL_BATCH_SIZE)
+    parser.add_argument("--after-id", type=int, default=0, help="resume after this contact id")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    updated = asyncio.run(backfill_phones(batch_size=args.batch_size, after_id=args.after_id))
+    print(f"{updated} contacts updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from decouple import config
+from fastapi import HTTPException, Request
+
+from contacts_api.metrics import timed_redis
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_AUTH = config("RATE_LIMIT_AUTH", default="10/60")
+RATE_LIMIT_READ = config("RATE_LIMIT_READ", default="300/60")
+RATE_LIMIT_WRITE = config("RATE_LIMIT_WRITE", default="60/60")
+RATE_LIMIT_LOCAL_SIZE = config("RATE_LIMIT_LOCAL_SIZE", default=10000, cast=int)
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Token bucket: `limit` tokens, refilled evenly over `window` ms. Redis' clock is
+# used so every worker agrees on time. Returns allowed, remaining, ms until the
+# bucket is full again and ms until the next token.
+TOKEN_BUCKET_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or limit
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * limit / window)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), math.ceil((limit - tokens) * window / limit),
+        math.ceil(math.max(0, 1 - tokens) * window / limit)}
+"""
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_LUA.encode()).hexdigest()
+
+
+class Rule:
+    __slots__ = ("limit", "window")
+
+    def __init__(self, limit: int, window: float):
+        if limit < 1 or window <= 0:
+            raise ValueError("A rate limit needs at least one request per positive window")
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def parse(cls, value: str) -> "Rule":
+        # "<requests>/<seconds>", e.g. "10/60".
+        limit, _, window = value.partition("/")
+        return cls(int(limit), float(window or 1))
+
+    @property
+    def policy(self) -> str:
+        return f"{self.limit};w={self.window:g}"
+
+
+class Decision:
+    __slots__ = ("allowed", "rule", "remaining", "reset", "retry_after")
+
+    def __init__(self, allowed: bool, rule: Rule, remaining: int, reset_ms: int, retry_ms: int):
+        self.allowed = allowed
+        self.rule = rule
+        self.remaining = remaining
+        self.reset = math.ceil(reset_ms / 1000)
+        self.retry_after = max(1, math.ceil(retry_ms / 1000))
+
+    def headers(self) -> dict:
+        headers = {
+            "RateLimit-Limit": str(self.rule.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": self.rule.policy,
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+class LocalBuckets:
+    # Same token bucket as the Lua script, per process. Used while Redis is unreachable.
+    def __init__(self, maxsize: int = RATE_LIMIT_LOCAL_SIZE):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = Lock()
+
+    def hit(self, key: str, rule: Rule) -> Tuple[int, int, int, int]:
+        window = rule.window * 1000
+        now = time.monotonic() * 1000
+        with self._lock:
+            tokens, ts = self._buckets.pop(key, (rule.limit, now))
+            tokens = min(rule.limit, tokens + max(0.0, now - ts) * rule.limit / window)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now]
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return (
+            int(allowed),
+            math.floor(tokens),
+            math.ceil((rule.limit - tokens) * window / rule.limit),
+            math.ceil(max(0.0, 1 - tokens) * window / rule.limit),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def _is_noscript(result) -> bool:
+    # redis is imported lazily with the client, so the exception class is looked up here.
+    if not isinstance(result, Exception):
+        return False
+    from redis.exceptions import NoScriptError
+
+    return isinstance(result, NoScriptError)
+
+
+class RateLimiter:
+    def __init__(self, rules: dict, enabled: bool = RATE_LIMIT_ENABLED, local: Optional[LocalBuckets] = None):
+        self.rules = rules
+        self.enabled = enabled
+        self.local = local or LocalBuckets()
+        self.degraded = False
+        self.allowed = 0
+        self.rejected = 0
+        self.fallbacks = 0
+
+    def route_class(self, request: Optional[Request]) -> Optional[str]:
+        if not self.enabled or request is None:
+            return None
+        return "read" if request.method in READ_METHODS else "write"
+
+    async def hit(self, redis_client, route_class: str, identity: str, fetch: Optional[str] = None) -> tuple:
+        # One round trip: the bucket script, plus a GET of `fetch` when the caller
+        # needs a cached value anyway (the user lookup in get_current_user).
+        rule = self.rules[route_class]
+        key = f"rl:{route_class}:{identity}"
+        args = (rule.limit, int(rule.window * 1000))
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                if fetch is not None:
+                    pipe.get(fetch)
+                pipe.evalsha(TOKEN_BUCKET_SHA, 1, key, *args)
+                results = await timed_redis("pipeline", pipe.execute(raise_on_error=False))
+            result = results[-1]
+            if _is_noscript(result):
+                # Only after a Redis restart or failover; EVAL loads the script again.
+                result = await timed_redis("eval", redis_client.eval(TOKEN_BUCKET_LUA, 1, key, *args))
+            if isinstance(result, Exception):
+                raise result
+            if self.degraded:
+                self.degraded = False
+                logger.info("Rate limiter is using Redis again")
+        except Exception as e:
+            if not self.degraded:
+                self.degraded = True
+                logger.error(f"Rate limiter falling back to in-process buckets: {e}")
+            self.fallbacks += 1
+            return self._decide(rule, self.local.hit(key, rule)), None
+        fetched = results[0] if fetch is not None and not isinstance(results[0], Exception) else None
+        return self._decide(rule, result), fetched
+
+    def _decide(self, rule: Rule, result) -> Decision:
+        allowed, remaining, reset_ms, retry_ms = (int(value) for value in result)
+        decision = Decision(bool(allowed), rule, remaining, reset_ms, retry_ms)
+        if decision.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return decision
+
+    async def enforce(self, redis_client, request: Request, route_class: str, identity: str, fetch: Optional[str] = None):
+        decision, fetched = await self.hit(redis_client, route_class, identity, fetch)
+        if not decision.allowed:
+            raise HTTPException(status_code=429, detail="Too many requests", headers=decision.headers())
+        # Picked up by RateLimitHeadersMiddleware once the response starts.
+        request.state.rate_limit = decision
+        return fetched
+
+    def reset(self) -> None:
+        self.local.clear()
+        self.degraded = False
+        self.allowed = self.rejected = self.fallbacks = 0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "degraded": self.degraded,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "fallbacks": self.fallbacks,
+        }
+
+
+rate_limiter = RateLimiter({
+    "auth": Rule.parse(RATE_LIMIT_AUTH),
+    "read": Rule.parse(RATE_LIMIT_READ),
+    "write": Rule.parse(RATE_LIMIT_WRITE),
+})
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimitHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                decision = scope.get("state", {}).get("rate_limit")
+                if decision is not None:
+                    headers = list(message.get("headers", []))
+                    headers.extend((name.lower().encode(), value.encode()) for name, value in decision.headers().items())
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
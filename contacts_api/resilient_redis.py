@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+from decouple import config
+from redis.asyncio.client import Pipeline
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+
+logger = logging.getLogger(__name__)
+
+REDIS_HOST = config("REDIS_HOST", default="localhost")
+REDIS_PORT = config("REDIS_PORT", default=6379, cast=int)
+REDIS_DB = config("REDIS_DB", default=0, cast=int)
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)
+REDIS_POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=0.5, cast=float)
+REDIS_CONNECT_TIMEOUT = config("REDIS_CONNECT_TIMEOUT", default=0.5, cast=float)
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=0.25, cast=float)
+REDIS_RETRIES = config("REDIS_RETRIES", default=0, cast=int)
+REDIS_HEALTH_CHECK_INTERVAL = config("REDIS_HEALTH_CHECK_INTERVAL", default=15, cast=int)
+REDIS_BREAKER_THRESHOLD = config("REDIS_BREAKER_THRESHOLD", default=5, cast=int)
+REDIS_BREAKER_COOLDOWN = config("REDIS_BREAKER_COOLDOWN", default=5.0, cast=float)
+
+# Errors that say Redis is unreachable or too slow, as opposed to a bad command.
+UNAVAILABLE = (ConnectionError, TimeoutError, OSError, asyncio.TimeoutError)
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    # Closed until `threshold` consecutive failures, then open for `cooldown`
+    # seconds, after which a single request is let through to probe Redis.
+    def __init__(self, threshold: int = REDIS_BREAKER_THRESHOLD, cooldown: float = REDIS_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.opens = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+            self.short_circuited += 1
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Redis circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None:
+            self.opened_at = time.monotonic()
+        elif self.failures >= self.threshold:
+            logger.error(f"Redis circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+            self.opens += 1
+
+    async def guard(self, awaitable):
+        if not self.allow():
+            awaitable.close()
+            raise CircuitOpenError("Redis circuit is open")
+        reached = False
+        try:
+            result = await awaitable
+            reached = True
+            return result
+        except UNAVAILABLE:
+            self.record_failure()
+            raise
+        except Exception:
+            # The server answered, just not with success.
+            reached = True
+            raise
+        finally:
+            if reached:
+                self.record_success()
+            else:
+                self.probing = False
+
+    def reset(self) -> None:
+        self.failures = self.opens = self.short_circuited = 0
+        self.opened_at = None
+        self.probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opens": self.opens,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class ResilientPipeline(Pipeline):
+    breaker: CircuitBreaker
+
+    async def execute(self, raise_on_error: bool = True):
+        return await self.breaker.guard(super().execute(raise_on_error))
+
+
+class ResilientRedis(redis.Redis):
+    def __init__(self, *args, breaker: Optional[CircuitBreaker] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker or CircuitBreaker()
+
+    async def execute_command(self, *args, **options):
+        return await self.breaker.guard(super().execute_command(*args, **options))
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> ResilientPipeline:
+        pipe = ResilientPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+        pipe.breaker = self.breaker
+        return pipe
+
+    async def health(self) -> dict:
+        # Bypasses the breaker, so a successful check also closes it.
+        started = time.perf_counter()
+        try:
+            await super().execute_command("PING")
+        except Exception as e:
+            return {"status": "unavailable", "error": str(e), **self.breaker.stats()}
+        self.breaker.record_success()
+        return {"status": "ok", "latency_ms": round((time.perf_counter() - started) * 1000, 3), **self.breaker.stats()}
+
+
+# One breaker per Redis server, shared by every client that talks to it.
+redis_breaker = CircuitBreaker()
+
+
+def create_redis(
+    decode_responses: bool = True,
+    breaker: CircuitBreaker = redis_breaker,
+    host: str = REDIS_HOST,
+    port: int = REDIS_PORT,
+    db: int = REDIS_DB,
+    max_connections: int = REDIS_MAX_CONNECTIONS,
+    socket_timeout: float = REDIS_SOCKET_TIMEOUT,
+) -> ResilientRedis:
+    # A bounded pool: when every connection is busy, callers wait up to
+    # REDIS_POOL_TIMEOUT and then fail like any other Redis outage.
+    pool = redis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        db=db,
+        max_connections=max_connections,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=socket_timeout,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(NoBackoff(), REDIS_RETRIES),
+        decode_responses=decode_responses,
+        # RESP2 replies are what the callers parse, whatever the client library defaults to.
+        protocol=2,
+    )
+    return ResilientRedis(connection_pool=pool, breaker=breaker)
@@ -0,0 +1,53 @@
+import logging
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def _redis():
+    from contacts_api.resilient_redis import create_redis
+
+    return create_redis()
+
+
+def _mail_config():
+    from contacts_api.email_utils import build_mail_config
+
+    return build_mail_config()
+
+
+class Resources:
+    # Clients and settings objects that are expensive to import or build, or
+    # that need configuration. Each one is created on first use, so importing
+    # the app stays cheap and a missing setting fails at startup instead of import.
+    def __init__(self, factories: Dict[str, Callable] = None):
+        self._factories = factories if factories is not None else {"redis": _redis, "mail_config": _mail_config}
+
+    def __getattr__(self, name: str):
+        factories = self.__dict__.get("_factories", {})
+        if name not in factories:
+            raise AttributeError(name)
+        value = factories[name]()
+        setattr(self, name, value)
+        return value
+
+    def built(self, name: str) -> bool:
+        return name in self.__dict__
+
+    async def startup(self) -> None:
+        # Build everything the server needs up front, so configuration errors stop the worker from starting.
+        for name in self._factories:
+            getattr(self, name)
+        logger.info(f"Resources ready: {', '.join(self._factories)}")
+
+    async def shutdown(self) -> None:
+        if self.built("redis"):
+            try:
+                await self.redis.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close Redis connections: {e}")
+        for name in self._factories:
+            self.__dict__.pop(name, None)
+
+
+resources = Resources()
@@ -1,12 +1,45 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from typing import Optional
+import re
+from functools import lru_cache
+from pydantic import AfterValidator, BaseModel, EmailStr, ConfigDict, Field, WithJsonSchema, field_validator
+from pydantic.networks import validate_email
+from pydantic_core import PydanticCustomError
+from typing import Annotated, List, Optional
 from datetime import date
 
+MAX_BATCH_IDS = 1000
+MAX_MERGE_IDS = 100
+SIMPLE_EMAIL_RE = re.compile(
+    r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*"
+    r"@((?:[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?\.)+[A-Za-z0-9-]+)"
+)
+
+
+@lru_cache(maxsize=4096)
+def _normalized_domain(domain: str) -> Optional[str]:
+    try:
+        return validate_email(f"postmaster@{domain}")[1].rpartition("@")[2]
+    except PydanticCustomError:
+        return None
+
+
+def normalize_email(value: str) -> str:
+    # Same result as EmailStr, but plain ASCII addresses only pay for domain
+    # (IDNA) validation once per domain, which dominates bulk import cost.
+    match = SIMPLE_EMAIL_RE.fullmatch(value)
+    if match and len(value) <= 254 and match.start(1) <= 65:
+        domain = _normalized_domain(match.group(1))
+        if domain is not None:
+            return value[:match.start(1)] + domain
+    return validate_email(value)[1]
+
+
+ContactEmail = Annotated[str, AfterValidator(normalize_email), WithJsonSchema({"type": "string", "format": "email"})]
+
 
 class ContactCreate(BaseModel):
     first_name: str
     last_name: str
-    email: EmailStr
+    email: ContactEmail
     phone: str
     birthday: Optional[date] = None
     additional_info: Optional[str] = None
@@ -14,9 +47,88 @@ class ContactCreate(BaseModel):
 
 class ContactResponse(ContactCreate):
     id: int
+    phone: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ContactUpdate(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[ContactEmail] = None
+    phone: Optional[str] = None
+    birthday: Optional[date] = None
+    additional_info: Optional[str] = None
+
+    @field_validator("first_name", "last_name", "email", "phone")
+    @classmethod
+    def required_not_null(cls, value):
+        # Required fields may be left out of a partial update, but not cleared.
+        if value is None:
+            raise ValueError("field may be omitted but not set to null")
+        return value
+
+
+class ContactBatchDelete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class ContactBatchUpdate(ContactBatchDelete):
+    changes: ContactUpdate
+
+
+class ContactBatchResult(BaseModel):
+    affected: List[int]
+    not_found: List[int]
+
+
+class PhoneMatch(ContactResponse):
+    exact: bool
+
+
+class ContactMerge(BaseModel):
+    primary_id: int
+    duplicate_ids: List[int] = Field(min_length=1, max_length=MAX_MERGE_IDS)
+
+    @field_validator("duplicate_ids")
+    @classmethod
+    def unique_ids(cls, value):
+        # A repeated id would be merged, deleted and tombstoned twice.
+        return list(dict.fromkeys(value))
+
+
+class DuplicatePair(BaseModel):
+    score: float
+    matched: List[str]
+    contacts: List[ContactResponse]
+
+
+class DuplicateReport(BaseModel):
+    candidates: int
+    pairs: List[DuplicatePair]
+
+
+class ContactPage(BaseModel):
+    items: List[ContactResponse]
+    next_cursor: Optional[str] = None
+
+
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class ContactChanges(BaseModel):
+    updated: List[ContactResponse]
+    deleted: List[int]
+    next_cursor: Optional[str] = None
+    next_since: Optional[int] = None
+
 
-    class Config:
-        model_config = ConfigDict(from_attributes=True)
+class BulkImportResult(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: List[BulkRowError] = []
 
 
 class UserCreate(BaseModel):
@@ -30,9 +142,9 @@ class UserResponse(BaseModel):
     email: EmailStr
     full_name: str
     is_verified: bool
+    avatar_url: Optional[str] = None
 
-    class Config:
-        model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
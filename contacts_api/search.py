@@ -0,0 +1,221 @@
+from typing import Dict, Optional
+
+from sqlalchemy import column, event, func, literal, literal_column, or_, select, table, text
+from sqlalchemy.engine import Connection
+
+from contacts_api.models import Contact
+
+SEARCH_FIELDS = ("first_name", "last_name", "email")
+SEARCH_TABLE = "contacts_fts"
+SEARCH_TRIGGERS = ("contacts_fts_ai", "contacts_fts_ad", "contacts_fts_au")
+contacts_fts = table("contacts_fts", column("rowid"))
+# bm25 column weights: name hits rank above email hits.
+BM25_WEIGHTS = (10.0, 10.0, 5.0)
+# Trigram indexes cannot serve terms shorter than this.
+MIN_INDEXED_TERM = 3
+# Must match the indexed expression exactly for Postgres to use the trigram index.
+SEARCH_DOCUMENT_SQL = "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))"
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+        first_name, last_name, email,
+        content='contacts', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, email ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+)
+
+POSTGRES_TRGM_INDEXES = {
+    "ix_contacts_first_name_trgm": "first_name",
+    "ix_contacts_last_name_trgm": "last_name",
+    "ix_contacts_email_trgm": "email",
+    "ix_contacts_search_trgm": SEARCH_DOCUMENT_SQL,
+}
+
+
+def create_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'")
+        ).first()
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            rebuild_search_index(connection)
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for name, expression in POSTGRES_TRGM_INDEXES.items():
+            connection.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON contacts USING gin ({expression} gin_trgm_ops)"
+            ))
+
+
+def drop_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        for trigger in SEARCH_TRIGGERS:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    elif connection.dialect.name == "postgresql":
+        for name in POSTGRES_TRGM_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')"))
+
+
+def suspend_insert_indexing(connection: Connection) -> Optional[int]:
+    # Per-row trigger maintenance is several times slower than indexing the
+    # new rows in one statement, so bulk loads drop the insert trigger for the
+    # duration of their transaction and call resume_insert_indexing before commit.
+    if connection.dialect.name != "sqlite":
+        return None
+    # pysqlite only opens a transaction for DML; a no-op write takes the write
+    # lock first so the DROP below is rolled back with everything else.
+    connection.execute(text("DELETE FROM contacts WHERE 0"))
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {SEARCH_TRIGGERS[0]}"))
+    return connection.execute(text("SELECT coalesce(max(id), 0) FROM contacts")).scalar()
+
+
+def resume_insert_indexing(connection: Connection, last_id: Optional[int]) -> None:
+    if last_id is None:
+        return
+    connection.execute(
+        text(
+            "INSERT INTO contacts_fts(rowid, first_name, last_name, email) "
+            "SELECT id, first_name, last_name, email FROM contacts WHERE id > :last_id"
+        ),
+        {"last_id": last_id},
+    )
+    connection.execute(text(SQLITE_DDL[1]))
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # The FTS5 tables and trigram indexes are managed here, not by autogenerate.
+    if type_ == "table":
+        return not name.startswith(SEARCH_TABLE)
+    if type_ == "index":
+        return name not in POSTGRES_TRGM_INDEXES
+    return True
+
+
+@event.listens_for(Contact.__table__, "after_create")
+def _after_contacts_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Contact.__table__, "before_drop")
+def _before_contacts_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(term: str) -> list:
+    term = term.lower()
+    return sorted({term[i:i + MIN_INDEXED_TERM] for i in range(len(term) - MIN_INDEXED_TERM + 1)})
+
+
+def build_match_expression(q: Optional[str], fields: Dict[str, str], fuzzy: bool = False) -> Optional[str]:
+    clauses = []
+    for field, term in fields.items():
+        if len(term) >= MIN_INDEXED_TERM:
+            clauses.append(f"{field} : {_quote(term)}")
+    if q and len(q) >= MIN_INDEXED_TERM:
+        if fuzzy:
+            clauses.append("(" + " OR ".join(_quote(gram) for gram in _trigrams(q)) + ")")
+        else:
+            clauses.append(_quote(q))
+    return " AND ".join(clauses) if clauses else None
+
+
+def _short_term_filters(q: Optional[str], fields: Dict[str, str]) -> list:
+    filters = [
+        getattr(Contact, field).ilike(f"%{term}%")
+        for field, term in fields.items()
+        if len(term) < MIN_INDEXED_TERM
+    ]
+    if q and len(q) < MIN_INDEXED_TERM:
+        filters.append(or_(*(getattr(Contact, field).ilike(f"%{q}%") for field in SEARCH_FIELDS)))
+    return filters
+
+
+def _sqlite_statement(user_id: int, q: Optional[str], fields: Dict[str, str], fuzzy: bool, limit: int):
+    statement = select(Contact).where(Contact.user_id == user_id, *_short_term_filters(q, fields))
+    match = build_match_expression(q, fields, fuzzy)
+    if match is None:
+        return statement.order_by(Contact.id).limit(limit)
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    return (
+        statement
+        .join(contacts_fts, contacts_fts.c.rowid == Contact.id)
+        .where(text("contacts_fts MATCH :match").bindparams(match=match))
+        .order_by(text(f"bm25(contacts_fts, {weights})"), Contact.id)
+        .limit(limit)
+    )
+
+
+def _postgres_statement(user_id: int, q: Optional[str], fields: Dict[str, str], fuzzy: bool, limit: int):
+    statement = select(Contact).where(Contact.user_id == user_id)
+    for field, term in fields.items():
+        statement = statement.where(getattr(Contact, field).ilike(f"%{term}%"))
+    if not q:
+        return statement.order_by(Contact.id).limit(limit)
+    document = literal_column(SEARCH_DOCUMENT_SQL)
+    score = func.word_similarity(q, document)
+    if fuzzy:
+        # `<%` honours pg_trgm.word_similarity_threshold and is served by the gin index.
+        statement = statement.where(literal(q).op("<%")(document))
+    else:
+        statement = statement.where(document.ilike(f"%{q}%"))
+    return statement.order_by(score.desc(), Contact.id).limit(limit)
+
+
+def search_statement(
+    dialect: str,
+    user_id: int,
+    q: Optional[str] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    email: Optional[str] = None,
+    fuzzy: bool = False,
+    limit: int = 50,
+):
+    fields = {
+        field: term
+        for field, term in (("first_name", first_name), ("last_name", last_name), ("email", email))
+        if term
+    }
+    if dialect == "sqlite":
+        return _sqlite_statement(user_id, q, fields, fuzzy, limit)
+    if dialect == "postgresql":
+        return _postgres_statement(user_id, q, fields, fuzzy, limit)
+    statement = select(Contact).where(Contact.user_id == user_id)
+    for field, term in fields.items():
+        statement = statement.where(getattr(Contact, field).ilike(f"%{term}%"))
+    if q:
+        statement = statement.where(or_(*(getattr(Contact, field).ilike(f"%{q}%") for field in SEARCH_FIELDS)))
+    return statement.order_by(Contact.id).limit(limit)
@@ -0,0 +1,42 @@
+from typing import Iterable, List, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from contacts_api.cache import CONTACT_FIELDS, unpack_contacts
+from contacts_api.models import Contact
+
+# Columns in ContactResponse field order, so a result row is already a packed cache row.
+CONTACT_COLUMNS = tuple(getattr(Contact, field) for field in CONTACT_FIELDS)
+ID_POSITION = CONTACT_FIELDS.index("id")
+
+
+def contact_columns(statement: Select) -> Select:
+    # Keeps the filters, joins and ordering of an entity query but loads plain
+    # tuples: no identity map, no ORM objects and no per-row model validation.
+    return statement.with_only_columns(*CONTACT_COLUMNS)
+
+
+async def fetch_contact_rows(db: AsyncSession, statement: Select) -> List[list]:
+    result = await db.execute(contact_columns(statement))
+    return [list(row) for row in result]
+
+
+def contacts_response(rows: Iterable[list], headers: Optional[dict] = None) -> ORJSONResponse:
+    # Rows were validated on the way in; birthdays are stored as ISO strings,
+    # so they go straight to orjson without another pydantic round-trip.
+    return ORJSONResponse(unpack_contacts(rows), headers=headers)
+
+
+def contact_response(row: list, headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse(dict(zip(CONTACT_FIELDS, row)), headers=headers)
+
+
+def contact_page_response(rows: Iterable[list], next_cursor: Optional[str], headers: Optional[dict] = None) -> ORJSONResponse:
+    return ORJSONResponse({"items": unpack_contacts(rows), "next_cursor": next_cursor}, headers=headers)
+
+
+def contact_ndjson(row) -> bytes:
+    return orjson.dumps(dict(zip(CONTACT_FIELDS, row))) + b"\n"
@@ -0,0 +1,128 @@
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import List, Optional
+
+from decouple import config
+
+JWT_BACKEND = config("JWT_BACKEND", default="jose")
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+
+
+class TokenError(Exception):
+    pass
+
+
+class JoseBackend:
+    name = "jose"
+
+    def __init__(self):
+        from jose import JWTError, jwt
+
+        self._jwt = jwt
+        self._error = JWTError
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: List[str]) -> dict:
+        try:
+            return self._jwt.decode(token, key, algorithms=algorithms)
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+class PyJWTBackend:
+    name = "pyjwt"
+
+    def __init__(self):
+        import jwt
+
+        self._jwt = jwt
+        self._error = jwt.PyJWTError
+
+    def encode(self, claims: dict, key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: List[str]) -> dict:
+        try:
+            # python-jose accepts a non-string "sub"; keep that behaviour.
+            return self._jwt.decode(token, key, algorithms=algorithms, options={"verify_sub": False})
+        except self._error as e:
+            raise TokenError(str(e)) from e
+
+
+BACKENDS = {"jose": JoseBackend, "pyjwt": PyJWTBackend}
+
+
+def create_backend(name: str = JWT_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JWT backend: {name}")
+    return BACKENDS[name]()
+
+
+class VerifiedTokenCache:
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        # Tokens without an expiry are verified every time.
+        if not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TokenCodec:
+    def __init__(self, key: str, algorithm: str, backend=None, cache: Optional[VerifiedTokenCache] = None):
+        self.key = key
+        self.algorithm = algorithm
+        self.backend = backend or create_backend()
+        self.cache = cache if cache is not None else VerifiedTokenCache()
+
+    def encode(self, claims: dict) -> str:
+        return self.backend.encode(claims, self.key, self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        claims = self.cache.get(token)
+        if claims is not None:
+            return claims
+        claims = self.backend.decode(token, self.key, [self.algorithm])
+        self.cache.put(token, claims)
+        return claims
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from decouple import config
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_SIZE = config("USER_CACHE_SIZE", default=10000, cast=int)
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=60.0, cast=float)
+INVALIDATION_CHANNEL = "auth:user-invalidated"
+LISTENER_RETRY_SECONDS = 1.0
+
+
+class CurrentUser:
+    __slots__ = ("id", "email", "full_name", "is_verified")
+
+    def __init__(self, id: int, email: str, full_name: Optional[str] = None, is_verified: bool = False):
+        self.id = id
+        self.email = email
+        self.full_name = full_name
+        self.is_verified = is_verified
+
+    @classmethod
+    def from_user(cls, user) -> "CurrentUser":
+        return cls(user.id, user.email, user.full_name, user.is_verified)
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "email": self.email, "full_name": self.full_name, "is_verified": self.is_verified}
+
+    def __repr__(self) -> str:
+        return f"CurrentUser(id={self.id!r}, email={self.email!r})"
+
+
+class UserCache:
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, Optional[int]], tuple]" = OrderedDict()
+        self._lock = Lock()
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, email: str, iat: Optional[int]) -> Optional[CurrentUser]:
+        key = (email, iat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, email: str, iat: Optional[int], user: CurrentUser) -> None:
+        with self._lock:
+            self._entries[(email, iat)] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end((email, iat))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            # Bounded by maxsize; invalidations are rare compared to lookups.
+            for key in [key for key in self._entries if key[0] == email]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def reset(self) -> None:
+        self.clear()
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    async def listen(self, redis_client) -> None:
+        while True:
+            try:
+                async with redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            email = message["data"]
+                            self.invalidate(email.decode() if isinstance(email, bytes) else email)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries published while disconnected may be missed, so drop everything.
+                logger.error(f"User cache invalidation listener failed: {e}")
+                self.clear()
+                await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
+    def start_listener(self, redis_client) -> asyncio.Task:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self.listen(redis_client))
+        return self._listener
+
+    async def stop_listener(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+
+user_cache = UserCache()
+
+
+async def publish_invalidation(redis_client, email: str) -> None:
+    user_cache.invalidate(email)
+    try:
+        await redis_client.publish(INVALIDATION_CHANNEL, email)
+    except Exception as e:
+        logger.error(f"Failed to publish user cache invalidation for {email}: {e}")
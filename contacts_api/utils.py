@@ -1,9 +1,100 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Optional, Tuple
+
+from decouple import config
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_CONCURRENCY = config("PASSWORD_HASH_CONCURRENCY", default=PASSWORD_HASH_WORKERS, cast=int)
+
+# min/max pin the cost factor, so hashes made with any other rounds value need an update.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, concurrency: int = PASSWORD_HASH_CONCURRENCY):
+        # bcrypt releases the GIL, so threads give real parallelism here.
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._lock = Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rehashed = 0
+        self.wait_seconds_max = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        semaphore = self._get_semaphore()
+        started = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+        try:
+            with self._lock:
+                self.active += 1
+                self.wait_seconds_max = max(self.wait_seconds_max, time.perf_counter() - started)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            semaphore.release()
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        verified, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rehashed": self.rehashed,
+                "concurrency": self.concurrency,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,101 @@
+"""contacts search index and birthday month-day key
+
+Revision ID: 0002_search_and_birthdays
+Revises: 0001_baseline
+Create Date: 2025-01-20 12:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002_search_and_birthdays"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the search index DDL as of this revision; later changes to
+# contacts_api.search must not change what this migration creates.
+SQLITE_TRIGGERS = ("contacts_fts_ai", "contacts_fts_ad", "contacts_fts_au")
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+        first_name, last_name, email,
+        content='contacts', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, email ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+)
+POSTGRES_TRGM_INDEXES = {
+    "ix_contacts_first_name_trgm": "first_name",
+    "ix_contacts_last_name_trgm": "last_name",
+    "ix_contacts_email_trgm": "email",
+    "ix_contacts_search_trgm": "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, ''))",
+}
+
+
+def create_search_index() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        exists = bind.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'")
+        ).first()
+        for statement in SQLITE_DDL:
+            op.execute(statement)
+        if not exists:
+            op.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, expression in POSTGRES_TRGM_INDEXES.items():
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON contacts USING gin ({expression} gin_trgm_ops)")
+
+
+def drop_search_index() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS contacts_fts")
+    elif bind.dialect.name == "postgresql":
+        for name in POSTGRES_TRGM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.add_column(sa.Column("birthday_md", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE contacts SET birthday_md = "
+        "CAST(substr(birthday, 6, 2) AS INTEGER) * 100 + CAST(substr(birthday, 9, 2) AS INTEGER) "
+        "WHERE birthday IS NOT NULL AND birthday != ''"
+    )
+    op.create_index("ix_contacts_user_birthday_md", "contacts", ["user_id", "birthday_md"])
+    create_search_index()
+
+
+def downgrade() -> None:
+    drop_search_index()
+    op.drop_index("ix_contacts_user_birthday_md", table_name="contacts")
+    with op.batch_alter_table("contacts") as batch_op:
+        batch_op.drop_column("birthday_md")
@@ -0,0 +1,34 @@
+"""per-user composite indexes and per-user contact email uniqueness
+
+Revision ID: 0003_contacts_user_indexes
+Revises: 0002_search_and_birthdays
+Create Date: 2025-01-20 12:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0003_contacts_user_indexes"
+down_revision: Union[str, None] = "0002_search_and_birthdays"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_contacts_email", table_name="contacts")
+    op.drop_index("ix_contacts_first_name", table_name="contacts")
+    op.drop_index("ix_contacts_last_name", table_name="contacts")
+    op.create_index("ix_contacts_user_id_id", "contacts", ["user_id", "id"])
+    op.create_index("ix_contacts_user_name", "contacts", ["user_id", "last_name", "first_name"])
+    op.create_index("uq_contacts_user_email", "contacts", ["user_id", "email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_contacts_user_email", table_name="contacts")
+    op.drop_index("ix_contacts_user_name", table_name="contacts")
+    op.drop_index("ix_contacts_user_id_id", table_name="contacts")
+    op.create_index("ix_contacts_last_name", "contacts", ["last_name"])
+    op.create_index("ix_contacts_first_name", "contacts", ["first_name"])
+    op.create_index("ix_contacts_email", "contacts", ["email"], unique=True)
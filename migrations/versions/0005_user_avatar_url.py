@@ -0,0 +1,27 @@
+"""store the avatar URL on users
+
+Revision ID: 0005_user_avatar_url
+Revises: 0004_email_outbox
+Create Date: 2025-01-23 09:30:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "0005_user_avatar_url"
+down_revision: Union[str, None] = "0004_email_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("avatar_url", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("avatar_url")
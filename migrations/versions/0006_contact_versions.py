@@ -0,0 +1,35 @@
+"""contact versions and per-user change generation
+
+Revision ID: 0006_contact_versions
+Revises: 0005_user_avatar_url
+Create Date: 2025-01-24 11:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "0006_contact_versions"
+down_revision: Union[str, None] = "0005_user_avatar_url"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMN: recreating contacts in batch mode would drop its FTS triggers.
+    op.add_column("contacts", sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("1")))
+    op.add_column("contacts", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE contacts SET updated_at = CURRENT_TIMESTAMP")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("contacts_generation", sa.Integer(), nullable=False, server_default=sa.text("0")))
+        batch_op.add_column(sa.Column("contacts_updated_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("contacts_updated_at")
+        batch_op.drop_column("contacts_generation")
+    op.drop_column("contacts", "updated_at")
+    op.drop_column("contacts", "version")
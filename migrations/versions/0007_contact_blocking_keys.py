@@ -0,0 +1,160 @@
+"""contact blocking keys for duplicate detection
+
+Revision ID: 0007_contact_blocking_keys
+Revises: 0006_contact_versions
+Create Date: 2025-01-27 10:00:00
+
+"""
+import re
+import unicodedata
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from decouple import config
+
+
+revision: str = "0007_contact_blocking_keys"
+down_revision: Union[str, None] = "0006_contact_versions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCE_COLUMNS = ("email", "phone", "first_name", "last_name")
+KEY_COLUMNS = ("email_key", "phone_e164", "first_name_key", "last_name_key")
+BACKFILL_BATCH_SIZE = 1000
+
+# Self-contained copy of the key derivation in contacts_api.normalization, so later
+# changes there cannot change what this migration writes.
+# Empty means numbers without "+" or "00" get no E.164 key: their country is unknown.
+PHONE_DEFAULT_COUNTRY_CODE = config("PHONE_DEFAULT_COUNTRY_CODE", default="")
+PHONE_TRUNK_PREFIX = config("PHONE_TRUNK_PREFIX", default="0")
+# Providers that ignore dots in the local part of an address.
+DOTLESS_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+
+PHONE_EXTENSION_RE = re.compile(r"\s*(?:ext\.?|x|#|;)\s*\d+$", re.IGNORECASE)
+PHONE_CHARS_RE = re.compile(r"[+\d\s().\-/]+")
+NON_DIGITS_RE = re.compile(r"\D")
+CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ye", "ж": "zh", "з": "z",
+    "и": "y", "і": "i", "ї": "yi", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "shch", "ь": "", "ю": "yu", "я": "ya", "ы": "y", "э": "e", "ё": "yo", "ъ": "",
+}
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+
+def email_key(value: Optional[str]) -> Optional[str]:
+    # Case, "+tag" suffixes and Gmail dots do not change where mail is delivered.
+    if not value or "@" not in value:
+        return None
+    local, _, domain = value.strip().casefold().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local, domain = local.replace(".", ""), DOTLESS_DOMAINS[domain]
+    return f"{local}@{domain}" if local else None
+
+
+def e164(value: Optional[str], country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    # Only derived when the country is known: an explicit "+" or "00", or a trunk prefix with a
+    # configured default country.
+    if not value:
+        return None
+    value = PHONE_EXTENSION_RE.sub("", value.strip())
+    if not PHONE_CHARS_RE.fullmatch(value):
+        return None
+    digits = NON_DIGITS_RE.sub("", value)
+    if value.startswith("+"):
+        pass
+    elif value.startswith("00"):
+        digits = digits[2:]
+    elif country_code and PHONE_TRUNK_PREFIX and digits.startswith(PHONE_TRUNK_PREFIX):
+        digits = country_code + digits[len(PHONE_TRUNK_PREFIX):]
+    else:
+        return None
+    if not 8 <= len(digits) <= 15 or digits[0] == "0":
+        return None
+    return f"+{digits}"
+
+
+def transliterate(value: str) -> str:
+    return "".join(CYRILLIC.get(char, char) for char in value.casefold())
+
+
+def _latin(value: str) -> str:
+    value = transliterate(value)
+    return "".join(char for char in unicodedata.normalize("NFKD", value) if "a" <= char <= "z")
+
+
+def name_key(value: Optional[str]) -> Optional[str]:
+    # Soundex of the transliterated name, so "Jon"/"John" and "Іван"/"Ivan" share a key.
+    letters = _latin(value or "")
+    if not letters:
+        return None
+    key, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0])
+    for char in letters[1:]:
+        code = SOUNDEX_CODES.get(char)
+        if code and code != previous:
+            key += code
+            if len(key) == 4:
+                break
+        if char not in "hw":
+            previous = code
+    return key.ljust(4, "0")
+
+
+BLOCKING_KEYS = {
+    "email": ("email_key", email_key),
+    "phone": ("phone_e164", e164),
+    "first_name": ("first_name_key", name_key),
+    "last_name": ("last_name_key", name_key),
+}
+
+
+def blocking_keys(values: dict) -> dict:
+    # Derived columns for whichever source fields are present in `values`.
+    return {column: derive(values[field]) for field, (column, derive) in BLOCKING_KEYS.items() if field in values}
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMN: recreating contacts in batch mode would drop its FTS triggers.
+    for name in KEY_COLUMNS:
+        op.add_column("contacts", sa.Column(name, sa.String(), nullable=True))
+
+    # The keys are computed in Python, so existing rows are backfilled in id order, one batch at a time.
+    bind = op.get_bind()
+    contacts = sa.table("contacts", *(sa.column(name) for name in ("id", *SOURCE_COLUMNS, *KEY_COLUMNS)))
+    update = (
+        sa.update(contacts)
+        .where(contacts.c.id == sa.bindparam("contact_id"))
+        .values({name: sa.bindparam(f"new_{name}") for name in KEY_COLUMNS})
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(contacts.c.id, *(contacts.c[name] for name in SOURCE_COLUMNS))
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        bind.execute(update, [
+            {"contact_id": row["id"], **{f"new_{name}": value for name, value in blocking_keys(dict(row)).items()}}
+            for row in rows
+        ])
+        last_id = rows[-1]["id"]
+
+    op.create_index("ix_contacts_user_email_key", "contacts", ["user_id", "email_key"])
+    op.create_index("ix_contacts_user_phone_e164", "contacts", ["user_id", "phone_e164"])
+    op.create_index("ix_contacts_user_name_keys", "contacts", ["user_id", "last_name_key", "first_name_key"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_name_keys", table_name="contacts")
+    op.drop_index("ix_contacts_user_phone_e164", table_name="contacts")
+    op.drop_index("ix_contacts_user_email_key", table_name="contacts")
+    for name in reversed(KEY_COLUMNS):
+        op.drop_column("contacts", name)
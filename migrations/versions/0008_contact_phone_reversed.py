@@ -0,0 +1,101 @@
+"""reversed phone digits for suffix lookup
+
+Revision ID: 0008_contact_phone_reversed
+Revises: 0007_contact_blocking_keys
+Create Date: 2025-01-28 09:30:00
+
+"""
+import re
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from decouple import config
+
+
+revision: str = "0008_contact_phone_reversed"
+down_revision: Union[str, None] = "0007_contact_blocking_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Self-contained copy of reversed_digits in contacts_api.normalization, so later
+# changes there cannot change what this migration writes.
+PHONE_DEFAULT_COUNTRY_CODE = config("PHONE_DEFAULT_COUNTRY_CODE", default="")
+PHONE_TRUNK_PREFIX = config("PHONE_TRUNK_PREFIX", default="0")
+PHONE_EXTENSION_RE = re.compile(r"\s*(?:ext\.?|x|#|;)\s*\d+$", re.IGNORECASE)
+PHONE_CHARS_RE = re.compile(r"[+\d\s().\-/]+")
+NON_DIGITS_RE = re.compile(r"\D")
+
+
+def e164(value: Optional[str], country_code: str = PHONE_DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    if not value:
+        return None
+    value = PHONE_EXTENSION_RE.sub("", value.strip())
+    if not PHONE_CHARS_RE.fullmatch(value):
+        return None
+    digits = NON_DIGITS_RE.sub("", value)
+    if value.startswith("+"):
+        pass
+    elif value.startswith("00"):
+        digits = digits[2:]
+    elif country_code and PHONE_TRUNK_PREFIX and digits.startswith(PHONE_TRUNK_PREFIX):
+        digits = country_code + digits[len(PHONE_TRUNK_PREFIX):]
+    else:
+        return None
+    if not 8 <= len(digits) <= 15 or digits[0] == "0":
+        return None
+    return f"+{digits}"
+
+
+def reversed_digits(value: Optional[str]) -> Optional[str]:
+    # Without a known country the line's own digits are used, so national-format numbers are still found.
+    number = e164(value)
+    if number:
+        return number[:0:-1]
+    if not value:
+        return None
+    line = PHONE_EXTENSION_RE.sub("", value.strip())
+    if not PHONE_CHARS_RE.fullmatch(line):
+        return None
+    return NON_DIGITS_RE.sub("", line)[::-1] or None
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMN, as in 0007, so the FTS triggers on contacts survive.
+    op.add_column("contacts", sa.Column("phone_reversed", sa.String(), nullable=True))
+
+    # Filled here, in id order and one batch at a time, so existing contacts are found by lookup right away.
+    bind = op.get_bind()
+    contacts = sa.table("contacts", sa.column("id"), sa.column("phone"), sa.column("phone_reversed"))
+    update = (
+        sa.update(contacts)
+        .where(contacts.c.id == sa.bindparam("contact_id"))
+        .values(phone_reversed=sa.bindparam("new_phone_reversed"))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(contacts.c.id, contacts.c.phone)
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            key = reversed_digits(row.phone)
+            if key is not None:
+                params.append({"contact_id": row.id, "new_phone_reversed": key})
+        if params:
+            bind.execute(update, params)
+        last_id = rows[-1].id
+
+    op.create_index("ix_contacts_user_phone_reversed", "contacts", ["user_id", "phone_reversed"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_phone_reversed", table_name="contacts")
+    op.drop_column("contacts", "phone_reversed")
@@ -0,0 +1,34 @@
+"""checkpoints for resumable batch jobs
+
+Revision ID: 0009_job_checkpoints
+Revises: 0008_contact_phone_reversed
+Create Date: 2025-01-29 08:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "0009_job_checkpoints"
+down_revision: Union[str, None] = "0008_contact_phone_reversed"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "job_checkpoints",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("run_key", sa.String(), nullable=True),
+        sa.Column("last_key", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("completed", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_checkpoints")
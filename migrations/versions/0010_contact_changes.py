@@ -0,0 +1,53 @@
+"""contact change sequence and tombstones for delta sync
+
+Revision ID: 0010_contact_changes
+Revises: 0009_job_checkpoints
+Create Date: 2025-01-30 10:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "0010_contact_changes"
+down_revision: Union[str, None] = "0009_job_checkpoints"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Plain ADD COLUMN on contacts, as in 0006, so its FTS triggers survive.
+    op.add_column("contacts", sa.Column("change_seq", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("tombstones_compacted_seq", sa.Integer(), nullable=False, server_default=sa.text("0")))
+    op.create_table(
+        "contact_tombstones",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("contact_id", sa.Integer(), nullable=False),
+        sa.Column("change_seq", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_contact_tombstones_user_change_seq", "contact_tombstones", ["user_id", "change_seq"])
+    op.create_index("ix_contact_tombstones_deleted_at", "contact_tombstones", ["deleted_at"])
+    # Existing contacts get their owner's next generation, so a sync from since=0 returns all of them.
+    op.execute("UPDATE users SET contacts_generation = contacts_generation + 1 WHERE id IN (SELECT user_id FROM contacts)")
+    op.execute(
+        "UPDATE contacts SET change_seq = (SELECT contacts_generation FROM users WHERE users.id = contacts.user_id) "
+        "WHERE user_id IS NOT NULL"
+    )
+    op.create_index("ix_contacts_user_change_seq", "contacts", ["user_id", "change_seq"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_user_change_seq", table_name="contacts")
+    op.drop_index("ix_contact_tombstones_deleted_at", table_name="contact_tombstones")
+    op.drop_index("ix_contact_tombstones_user_change_seq", table_name="contact_tombstones")
+    op.drop_table("contact_tombstones")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("tombstones_compacted_seq")
+    op.drop_column("contacts", "change_seq")
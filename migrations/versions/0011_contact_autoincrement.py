@@ -0,0 +1,71 @@
+"""never reuse contact ids on SQLite
+
+Revision ID: 0011_contact_autoincrement
+Revises: 0010_contact_changes
+Create Date: 2025-01-31 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0011_contact_autoincrement"
+down_revision: Union[str, None] = "0010_contact_changes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rebuilding contacts drops its triggers, so the search triggers from 0002 are recreated as they were.
+SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, email ON contacts BEGIN
+        INSERT INTO contacts_fts(contacts_fts, rowid, first_name, last_name, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email);
+        INSERT INTO contacts_fts(rowid, first_name, last_name, email)
+        VALUES (new.id, new.first_name, new.last_name, new.email);
+    END
+    """,
+)
+
+
+def _rebuild_contacts(autoincrement: bool) -> None:
+    with op.batch_alter_table(
+        "contacts", recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}
+    ):
+        pass
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    # Without AUTOINCREMENT SQLite hands out max(id) + 1, so deleting the newest contact frees its id
+    # for the next insert: delta sync would list it as deleted and updated, and ETags could repeat.
+    # Other backends already use sequences that never go back.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _rebuild_contacts(autoincrement=True)
+    # Ids already deleted past the current maximum stay retired too.
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'contacts'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'contacts', max("
+        "(SELECT coalesce(max(id), 0) FROM contacts), "
+        "(SELECT coalesce(max(contact_id), 0) FROM contact_tombstones))"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    _rebuild_contacts(autoincrement=False)
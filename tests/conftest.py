@@ -1,12 +1,17 @@
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 from contacts_api.database import Base, get_db
 from contacts_api.models import User
 from contacts_api.utils import hash_password
-from contacts_api.auth import create_access_token, get_current_user
+from contacts_api.auth import create_access_token, get_current_user, token_codec
+from contacts_api.cache import MemoryBackend, contact_cache
+from contacts_api.rate_limit import rate_limiter
+from contacts_api.resources import resources
+from contacts_api.user_cache import user_cache
 from contacts_api.main import app
 import redis.asyncio as redis
 from unittest.mock import AsyncMock, MagicMock
@@ -16,37 +21,33 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DATABASE_URL = "sqlite:///:memory:"
+DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 @pytest.fixture(scope="function")
-def test_engine():
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(bind=engine)
+async def test_engine():
+    engine = create_async_engine(DATABASE_URL, poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     logger.info("Test engine created and database schema initialized.")
     yield engine
-    Base.metadata.drop_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
     logger.info("Test engine disposed and database schema dropped.")
 
 @pytest.fixture(scope="function")
-def db_session(test_engine):
-    connection = test_engine.connect()
-    transaction = connection.begin()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=connection)
-    session = SessionLocal()
-    logger.info("Database session started.")
-    try:
+async def db_session(test_engine):
+    SessionLocal = async_sessionmaker(bind=test_engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as session:
+        logger.info("Database session started.")
         yield session
-    finally:
-        session.close()
-        transaction.rollback()
-        connection.close()
-        logger.info("Database session closed.")
+    logger.info("Database session closed.")
 
 @pytest.fixture(autouse=True)
 def override_get_db(db_session):
-    def _get_db_override():
+    async def _get_db_override():
         yield db_session
     app.dependency_overrides[get_db] = _get_db_override
     logger.info("Dependency 'get_db' overridden with test session.")
@@ -55,13 +56,18 @@ def override_get_db(db_session):
     logger.info("Dependency 'get_db' override removed.")
 
 @pytest.fixture
-def test_user(db_session: Session):
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+@pytest.fixture
+async def test_user(db_session: AsyncSession):
     email = "testuser@example.com"
     password = "securepassword"
     hashed_password = hash_password(password)
     user = User(email=email, password=hashed_password, full_name="Test User", is_verified=True)
     db_session.add(user)
-    db_session.commit()
+    await db_session.commit()
     logger.info("Test user created: %s", email)
     return user
 
@@ -88,6 +94,27 @@ def mock_redis(mocker):
     mock_redis_client.setex = mocker.AsyncMock(return_value=True)
     mock_redis_client.delete = mocker.AsyncMock(return_value=1)
 
-    mocker.patch("contacts_api.auth.redis_client", mock_redis_client)
+    mocker.patch.object(resources, "redis", mock_redis_client)
 
     return mock_redis_client
+
+@pytest.fixture(autouse=True)
+def contact_cache_backend(mocker):
+    backend = MemoryBackend()
+    mocker.patch.object(contact_cache, "backend", backend)
+    contact_cache.stats.reset()
+    return backend
+
+@pytest.fixture(autouse=True)
+def disable_rate_limit(mocker):
+    # The AsyncMock Redis client cannot run the limiter script; tests that need it use fakeredis.
+    mocker.patch.object(rate_limiter, "enabled", False)
+    rate_limiter.reset()
+
+@pytest.fixture(autouse=True)
+def reset_user_cache():
+    user_cache.reset()
+    token_codec.cache.clear()
+    yield
+    user_cache.reset()
+    token_codec.cache.clear()
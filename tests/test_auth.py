@@ -1,39 +1,42 @@
 import pytest
-from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from sqlalchemy import select
 from contacts_api.auth import create_access_token
-from contacts_api.main import app
-import tempfile
-
-client = TestClient(app)
+from contacts_api.avatars import LocalStorage, avatar_pipeline
+from contacts_api.models import EmailOutbox
+from contacts_api.utils import pwd_context
+import io
+from PIL import Image
 
 @pytest.mark.asyncio
-async def test_forgot_password(mocker, test_user, db_session):
-    mock_send_email = mocker.patch("contacts_api.auth.send_email", new_callable=mocker.AsyncMock)
-    mock_send_email.return_value = None
+async def test_forgot_password(mocker, client, test_user, db_session):
+    notify = mocker.patch("contacts_api.auth.outbox_worker.notify")
 
     client_spy = mocker.spy(client, "post")
 
     payload = {"email": test_user.email}
-    response = client.post("/auth/forgot-password", json=payload)
-
+    response = await client.post("/auth/forgot-password", json=payload)
     assert response.status_code == 200
     assert response.json()["message"] == "Password reset link sent to your email"
-    mock_send_email.assert_awaited_once_with(
-        "Сброс пароля", test_user.email, mocker.ANY
-    )
+    response = await client.post("/auth/forgot-password", json=payload)
+    assert response.status_code == 200
+
+    queued = (await db_session.scalars(select(EmailOutbox))).all()
+    assert [(m.recipient, m.subject, m.status) for m in queued] == [(test_user.email, "Сброс пароля", "pending")]
+    assert notify.call_count == 2
 
-    assert client_spy.call_count == 1
+    assert client_spy.call_count == 2
 
 
 @pytest.mark.asyncio
-async def test_reset_password(mocker, test_user, db_session, mock_redis):
+async def test_reset_password(mocker, client, test_user, db_session, mock_redis):
     mock_redis.get.return_value = None
     mock_redis.delete.return_value = 1
 
     reset_token = create_access_token({"sub": test_user.email})
 
     payload = {"token": reset_token, "new_password": "newsecurepassword"}
-    response = client.post("/auth/reset-password", json=payload)
+    response = await client.post("/auth/reset-password", json=payload)
 
     assert response.status_code == 200
     assert response.json()["message"] == "Password has been reset successfully"
@@ -42,29 +45,40 @@ async def test_reset_password(mocker, test_user, db_session, mock_redis):
     mock_redis.delete.assert_awaited_once_with(test_user.email)
 
 @pytest.mark.asyncio
-async def test_upload_avatar(mocker, test_user, auth_headers):
-    mock_upload = mocker.patch("contacts_api.auth.upload", new_callable=mocker.Mock)
-    mock_upload.return_value = {"public_id": "avatar_1"}
-
-    mock_cloudinary_url = mocker.patch(
-        "contacts_api.auth.cloudinary_url",
-        return_value=("http://example.com/avatar.jpg", None),
+async def test_upload_avatar(mocker, client, test_user, auth_headers, db_session, mock_redis, tmp_path):
+    mocker.patch.object(avatar_pipeline, "storage", LocalStorage(str(tmp_path), "/media/avatars"))
+    image = io.BytesIO()
+    Image.new("RGB", (640, 480), "red").save(image, "PNG")
+
+    response = await client.post(
+        "/auth/upload-avatar",
+        headers=auth_headers,
+        files={"file": ("avatar.png", image.getvalue(), "image/png")},
     )
 
-    print("Mock upload return value:", mock_upload.return_value)
-    print("Mock cloudinary_url return value:", mock_cloudinary_url.return_value)
+    assert response.status_code == 200
+    avatar_url = response.json()["avatar_url"]
+    assert avatar_url.startswith("/media/avatars/1-")
+    with Image.open(tmp_path / avatar_url.rsplit("/", 1)[1]) as stored:
+        assert (stored.format, stored.size) == ("JPEG", (256, 256))
 
-    with tempfile.NamedTemporaryFile(suffix=".jpg") as temp_file:
-        temp_file.write(b"fake_image_data")
-        temp_file.seek(0)
-        response = client.post(
-            "/auth/upload-avatar",
-            headers=auth_headers,
-            files={"file": ("avatar.jpg", temp_file, "image/jpeg")},
-        )
+    await db_session.refresh(test_user)
+    assert test_user.avatar_url == avatar_url
+    mock_redis.delete.assert_awaited_once_with(test_user.email)
+    mock_redis.publish.assert_awaited_once()
 
-    assert response.status_code == 200
-    assert response.json()["avatar_url"] == "http://example.com/avatar.jpg"
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password(client, test_user, db_session):
+    test_user.password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("securepassword")
+    await db_session.commit()
+    outdated = test_user.password
+
+    response = await client.post("/auth/login", data={"username": test_user.email, "password": "wrong"})
+    assert response.status_code == 401
 
-    mock_upload.assert_called_once()
-    mock_cloudinary_url.assert_called_once_with("avatar_1", format="jpg")
+    response = await client.post("/auth/login", data={"username": test_user.email, "password": "securepassword"})
+    assert response.status_code == 200
+    assert response.json()["token_type"] == "bearer"
+    await db_session.refresh(test_user)
+    assert test_user.password != outdated
+    assert not pwd_context.needs_update(test_user.password)
@@ -0,0 +1,92 @@
+import asyncio
+import io
+import pytest
+from PIL import Image
+from contacts_api import avatars
+from contacts_api.avatars import CloudinaryStorage, LocalStorage, avatar_pipeline, detect_image_type, make_thumbnail
+
+
+def _image(fmt: str, size=(300, 200), mode="RGB") -> bytes:
+    output = io.BytesIO()
+    Image.new(mode, size, "blue").save(output, fmt)
+    return output.getvalue()
+
+
+@pytest.fixture
+def local_storage(mocker, tmp_path):
+    storage = LocalStorage(str(tmp_path), "/media/avatars")
+    mocker.patch.object(avatar_pipeline, "storage", storage)
+    return storage
+
+
+def test_detect_image_type():
+    assert detect_image_type(_image("JPEG")[:16]) == "image/jpeg"
+    assert detect_image_type(_image("PNG")[:16]) == "image/png"
+    assert detect_image_type(_image("GIF")[:16]) is None
+    assert detect_image_type(b"<svg") is None
+
+
+def test_make_thumbnail_crops_to_square_jpeg():
+    thumbnail = make_thumbnail(_image("PNG", (800, 400), "RGBA"), size=64)
+    with Image.open(io.BytesIO(thumbnail)) as image:
+        assert (image.format, image.size, image.mode) == ("JPEG", (64, 64), "RGB")
+
+
+def test_make_thumbnail_rejects_decompression_bombs():
+    with pytest.raises(avatars.InvalidImage):
+        make_thumbnail(_image("PNG", (200, 200)), size=64, max_pixels=1000)
+
+
+def test_local_storage_replaces_previous_avatar(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/media/avatars/")
+    first = storage._write(1, b"first")
+    second = storage._write(1, b"second")
+    storage._write(2, b"other")
+    assert first != second
+    assert second.startswith("/media/avatars/1-")
+    assert sorted(path.name.split("-")[0] for path in tmp_path.iterdir()) == ["1", "2"]
+
+
+async def test_cloudinary_storage_uploads_thumbnail(mocker):
+    upload = mocker.patch("cloudinary.uploader.upload", return_value={"public_id": "avatars/user-1", "version": 3})
+    url = await CloudinaryStorage().save(1, b"jpeg-bytes")
+    assert upload.call_args.kwargs["public_id"] == "avatars/user-1"
+    assert upload.call_args.args[0].read() == b"jpeg-bytes"
+    assert "avatars/user-1.jpg" in url
+
+
+async def test_upload_rejects_non_image_bytes(client, auth_headers, local_storage):
+    response = await client.post(
+        "/auth/upload-avatar",
+        headers=auth_headers,
+        files={"file": ("avatar.jpg", b"fake_image_data", "image/jpeg")},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("overhead", [0, 10 ** 9], ids=["content-length", "streamed"])
+async def test_upload_rejects_oversized_file(mocker, client, auth_headers, local_storage, overhead):
+    mocker.patch.object(avatars, "AVATAR_MAX_BYTES", 1024)
+    mocker.patch.object(avatars, "MULTIPART_OVERHEAD", overhead)
+    response = await client.post(
+        "/auth/upload-avatar",
+        headers=auth_headers,
+        files={"file": ("avatar.png", _image("PNG", (600, 600)) + b"\0" * 4096, "image/png")},
+    )
+    assert response.status_code == 413
+
+
+async def test_upload_requires_file_field(client, auth_headers, local_storage):
+    response = await client.post(
+        "/auth/upload-avatar",
+        headers=auth_headers,
+        files={"image": ("avatar.png", _image("PNG"), "image/png")},
+    )
+    assert response.status_code == 400
+
+
+async def test_local_storage_handles_concurrent_identical_uploads(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/media/avatars")
+    urls = await asyncio.gather(*(storage.save(1, b"same") for _ in range(8)))
+    assert len(set(urls)) == 1
+    assert [path.name for path in tmp_path.iterdir()] == [urls[0].rsplit("/", 1)[1]]
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+from contacts_api.birthdays import birthday_ranges, upcoming_birthdays_statement
+from contacts_api.models import Contact
+
+def test_birthday_ranges_within_year():
+    assert birthday_ranges(date(2025, 5, 10), 7) == [(510, 517)]
+
+def test_birthday_ranges_wrap_year_end():
+    assert birthday_ranges(date(2025, 12, 28), 7) == [(1228, 1231), (101, 104)]
+
+def test_birthday_ranges_feb_29():
+    assert birthday_ranges(date(2025, 2, 21), 7) == [(221, 229)]
+    assert birthday_ranges(date(2024, 2, 21), 7) == [(221, 228)]
+    assert birthday_ranges(date(2025, 2, 25), 7) == [(225, 304)]
+
+def test_birthday_ranges_full_year():
+    assert birthday_ranges(date(2025, 6, 1), 365) == [(101, 1231)]
+
+async def test_upcoming_birthdays_statement(db_session):
+    birthdays = {"Eve": "1990-12-30", "Newyear": "1985-01-02", "Leap": "2000-02-29", "Later": "1970-01-20"}
+    for name, birthday in birthdays.items():
+        db_session.add(Contact(first_name=name, last_name="X", email=f"{name}@example.com",
+                               phone="1", birthday=birthday, user_id=1))
+    await db_session.commit()
+
+    rows = (await db_session.scalars(upcoming_birthdays_statement(1, date(2025, 12, 28), 7))).all()
+    assert [c.first_name for c in rows] == ["Eve", "Newyear"]
+
+    rows = (await db_session.scalars(upcoming_birthdays_statement(1, date(2026, 2, 25), 3))).all()
+    assert [c.first_name for c in rows] == ["Leap"]
+
+async def test_upcoming_birthdays_endpoint(client, db_session, auth_headers):
+    today = date.today()
+    for name, offset in (("Soon", 3), ("Later", 10)):
+        birthday = (today + timedelta(days=offset)).replace(year=1992)
+        db_session.add(Contact(first_name=name, last_name="X", email=f"{name}@example.com",
+                               phone="1", birthday=birthday.isoformat(), user_id=1))
+    await db_session.commit()
+
+    response = await client.get("/contacts/upcoming-birthdays/", headers=auth_headers)
+    assert response.status_code == 200
+    assert [c["first_name"] for c in response.json()] == ["Soon"]
+
+    response = await client.get("/contacts/upcoming-birthdays/", params={"days": 14}, headers=auth_headers)
+    assert [c["first_name"] for c in response.json()] == ["Soon", "Later"]
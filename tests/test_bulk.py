@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+from sqlalchemy import select, text
+from contacts_api.models import Contact
+
+CSV_UPLOAD = (
+    "first_name,last_name,email,phone,birthday,additional_info\n"
+    "John,Doe,john@example.com,123,1990-12-30,\n"
+    "Jane,Roe,not-an-email,456,,\n"
+    "Jim,Poe,jim@example.com,789,,Friend\n"
+    "Jim,Poe,jim@example.com,789,,Again\n"
+)
+
+async def test_bulk_import_csv(client, db_session, auth_headers):
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.csv", CSV_UPLOAD.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 4]
+    assert result["errors"][0]["errors"][0].startswith("email:")
+
+    contacts = (await db_session.scalars(select(Contact).order_by(Contact.id))).all()
+    assert [c.email for c in contacts] == ["john@example.com", "jim@example.com"]
+    assert contacts[0].birthday_md == 1230
+    assert contacts[1].additional_info == "Friend"
+
+async def test_bulk_import_ndjson_skips_existing(client, db_session, auth_headers):
+    db_session.add(Contact(first_name="Old", last_name="One", email="old@example.com", phone="1", user_id=1))
+    await db_session.commit()
+    lines = [
+        {"first_name": "Old", "last_name": "One", "email": "old@example.com", "phone": "1"},
+        {"first_name": "New", "last_name": "One", "email": "new@example.com", "phone": "2"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.ndjson", body.encode(), "application/x-ndjson")},
+        headers=auth_headers,
+    )
+    result = response.json()
+    assert result["inserted"] == 1
+    assert [error["row"] for error in result["errors"]] == [1, 3]
+
+    response = await client.get("/contacts/search/", params={"q": "new@"}, headers=auth_headers)
+    assert [c["email"] for c in response.json()] == ["new@example.com"]
+
+async def test_bulk_import_continues_past_rejected_batches(client, db_session, auth_headers, monkeypatch):
+    monkeypatch.setattr("contacts_api.bulk.BATCH_SIZE", 1)
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.csv", CSV_UPLOAD.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    result = response.json()
+    assert result["inserted"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 4]
+
+async def test_bulk_import_concurrent_insert_is_a_conflict(client, db_session, auth_headers, monkeypatch):
+    db_session.add(Contact(first_name="Old", last_name="One", email="john@example.com", phone="1", user_id=1))
+    await db_session.commit()
+
+    async def nothing_exists(db, user_id, emails):
+        # The row above lands between the existence check and the insert.
+        return set()
+
+    monkeypatch.setattr("contacts_api.bulk._existing_emails", nothing_exists)
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.csv", CSV_UPLOAD.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Contacts were added concurrently, retry the import"
+    emails = (await db_session.scalars(select(Contact.email))).all()
+    assert emails == ["john@example.com"]
+
+async def test_bulk_import_rejects_unknown_format(client, auth_headers):
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.xlsx", b"data", "application/octet-stream")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+async def test_export_csv_and_ndjson(client, db_session, auth_headers):
+    for i in range(3):
+        db_session.add(Contact(first_name=f"Name{i}", last_name="Doe", email=f"user{i}@example.com",
+                               phone="1", birthday="1990-01-01", user_id=1))
+    db_session.add(Contact(first_name="Other", last_name="User", email="other@example.com", phone="1", user_id=2))
+    await db_session.commit()
+
+    response = await client.get("/contacts/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["first_name"] for row in rows] == ["Name0", "Name1", "Name2"]
+    assert rows[0]["birthday"] == "1990-01-01"
+
+    response = await client.get("/contacts/export", params={"format": "ndjson"}, headers=auth_headers)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["email"] for line in lines] == ["user0@example.com", "user1@example.com", "user2@example.com"]
+
+async def test_bulk_import_restores_search_trigger(client, db_session, auth_headers):
+    response = await client.post(
+        "/contacts/bulk",
+        files={"file": ("contacts.csv", CSV_UPLOAD.encode(), "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.json()["inserted"] == 2
+    db_session.add(Contact(first_name="Later", last_name="Added", email="later@example.com", phone="1", user_id=1))
+    await db_session.commit()
+
+    triggers = await db_session.scalars(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))
+    assert "contacts_fts_ai" in set(triggers)
+    for q, expected in (("john", ["john@example.com"]), ("later", ["later@example.com"])):
+        response = await client.get("/contacts/search/", params={"q": q}, headers=auth_headers)
+        assert [c["email"] for c in response.json()] == expected
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from contacts_api.cache import ContactCache, MemoryBackend, contact_cache, decode, encode
+from contacts_api.models import Contact
+
+
+async def test_get_or_load_hits_after_first_miss():
+    cache = ContactCache(MemoryBackend())
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return [[1, "John"]]
+
+    assert await cache.get_or_load(1, "list", {"limit": 10}, load) == [[1, "John"]]
+    assert await cache.get_or_load(1, "list", {"limit": 10}, load) == [[1, "John"]]
+    assert len(calls) == 1
+    assert cache.stats.snapshot()["hits"] == 1
+    assert cache.stats.snapshot()["misses"] == 1
+
+
+async def test_invalidate_bumps_generation_for_one_user():
+    cache = ContactCache(MemoryBackend())
+    values = iter(["old", "new", "other"])
+
+    async def load():
+        return next(values)
+
+    assert await cache.get_or_load(1, "contact", {"id": 1}, load) == "old"
+    await cache.invalidate(1)
+    assert await cache.get_or_load(1, "contact", {"id": 1}, load) == "new"
+    assert await cache.get_or_load(2, "contact", {"id": 1}, load) == "other"
+    assert await cache.get_or_load(1, "contact", {"id": 1}, load) == "new"
+    assert cache.stats.snapshot()["invalidations"] == 1
+
+
+async def test_concurrent_misses_share_one_load():
+    cache = ContactCache(MemoryBackend())
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["row"]
+
+    results = await asyncio.gather(*(cache.get_or_load(1, "search", {"q": "jo"}, load) for _ in range(10)))
+    assert results == [["row"]] * 10
+    assert len(calls) == 1
+    assert cache.stats.snapshot()["coalesced"] == 9
+
+
+async def test_cancelled_leader_does_not_fail_waiters():
+    cache = ContactCache(MemoryBackend())
+    release = asyncio.Event()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await release.wait()
+        await asyncio.sleep(0.01)
+        return ["row"]
+
+    leader = asyncio.create_task(cache.get_or_load(1, "search", {"q": "jo"}, load))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load(1, "search", {"q": "jo"}, load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == [["row"]] * 3
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # One waiter took over the load and the others joined it.
+    assert len(calls) == 2
+
+
+async def test_backend_errors_fall_back_to_loader(mocker):
+    backend = MemoryBackend()
+    backend.get = mocker.AsyncMock(side_effect=ConnectionError("down"))
+    cache = ContactCache(backend)
+
+    async def load():
+        return ["fresh"]
+
+    assert await cache.get_or_load(1, "list", {}, load) == ["fresh"]
+    assert cache.stats.snapshot()["errors"] == 1
+
+
+async def test_fakeredis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = ContactCache(fakeredis.FakeAsyncRedis(), ttl=30)
+
+    async def load():
+        return {"items": [[1, "Jane"]]}
+
+    await cache.get_or_load(7, "list", {}, load)
+    key = cache.entry_key(7, 0, "list", {})
+    assert decode(await cache.backend.get(key)) == {"items": [[1, "Jane"]]}
+    assert 0 < await cache.backend.ttl(key) <= 30
+    await cache.invalidate(7)
+    assert int(await cache.backend.get(cache.generation_key(7))) == 1
+
+
+def test_encode_is_compact():
+    assert encode([[1, "Jöhn", None]]) == '[[1,"Jöhn",null]]'.encode()
+
+
+async def test_contact_routes_use_cache_and_invalidate(client, db_session, auth_headers):
+    db_session.add(Contact(first_name="John", last_name="Doe", email="john@example.com", phone="1", user_id=1))
+    await db_session.commit()
+
+    first = await client.get("/contacts/1", headers=auth_headers)
+    second = await client.get("/contacts/1", headers=auth_headers)
+    assert first.json() == second.json()
+    assert contact_cache.stats.snapshot()["hits"] == 1
+
+    payload = {"first_name": "Johnny", "last_name": "Doe", "email": "john@example.com", "phone": "1"}
+    await client.put("/contacts/1", json=payload, headers=auth_headers)
+    response = await client.get("/contacts/1", headers=auth_headers)
+    assert response.json()["first_name"] == "Johnny"
+
+    await client.delete("/contacts/1", headers=auth_headers)
+    response = await client.get("/contacts/1", headers=auth_headers)
+    assert response.status_code == 404
+
+    response = await client.get("/internal/stats/contact-cache")
+    assert response.json()["invalidations"] == 2
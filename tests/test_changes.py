@@ -0,0 +1,155 @@
+from datetime import timedelta
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from contacts_api.changes import compact_tombstones
+from contacts_api.models import Contact, ContactTombstone, User, utcnow
+from contacts_api.pagination import decode_change_cursor, encode_change_cursor
+
+NDJSON = "".join(
+    f'{{"first_name": "Import{i}", "last_name": "Bulk", "email": "import{i}@example.com", "phone": "{i}"}}\n' for i in range(3)
+)
+
+
+async def _create(client, auth_headers, name):
+    contact = {"first_name": name, "last_name": "Melnyk", "email": f"{name.lower()}@example.com", "phone": "+380671112233"}
+    response = await client.post("/contacts/", json=contact, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+async def _sync(client, auth_headers, since, limit=500):
+    # Follows next_cursor to the end, as a client would.
+    updated, deleted, params = [], [], {"since": since, "limit": limit}
+    while True:
+        response = await client.get("/contacts/changes", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        body = response.json()
+        updated += [contact["first_name"] for contact in body["updated"]]
+        deleted += body["deleted"]
+        if body["next_cursor"] is None:
+            return updated, deleted, body["next_since"]
+        assert body["next_since"] is None
+        params = {"cursor": body["next_cursor"], "limit": limit}
+
+
+def test_change_cursor_round_trip():
+    assert decode_change_cursor(encode_change_cursor(7, 1, 42, False, 9)) == (7, 1, 42, False, 9)
+    for cursor in ("garbage", encode_change_cursor(7, 2, 42, False, 9), encode_change_cursor(-1, 0, 1, True, 9),
+                   encode_change_cursor(7, 1, 42, False, -1)):
+        with pytest.raises(ValueError):
+            decode_change_cursor(cursor)
+
+
+async def test_deleted_ids_are_not_reused(client, auth_headers):
+    first = await _create(client, auth_headers, "Anna")
+    newest = await _create(client, auth_headers, "Bohdan")
+    await client.delete(f"/contacts/{newest}", headers=auth_headers)
+    replacement = await _create(client, auth_headers, "Daria")
+    assert replacement > newest
+    response = await client.get("/contacts/changes", params={"since": 1}, headers=auth_headers)
+    body = response.json()
+    assert [contact["id"] for contact in body["updated"]] == [replacement]
+    assert body["deleted"] == [newest]
+    assert first not in body["deleted"]
+
+
+async def test_full_then_delta_sync(client, auth_headers):
+    ids = [await _create(client, auth_headers, name) for name in ("Anna", "Bohdan", "Daria")]
+    updated, deleted, since = await _sync(client, auth_headers, 0, limit=2)
+    assert (updated, deleted, since) == (["Anna", "Bohdan", "Daria"], [], 3)
+
+    assert (await _sync(client, auth_headers, since)) == ([], [], 3)
+
+    await client.patch(f"/contacts/{ids[0]}", json={"first_name": "Hanna"}, headers=auth_headers)
+    await client.delete(f"/contacts/{ids[1]}", headers=auth_headers)
+    await client.patch("/contacts/batch", json={"ids": [ids[2], 9999], "changes": {"last_name": "Bondarenko"}},
+                       headers=auth_headers)
+    assert (await _sync(client, auth_headers, since)) == (["Hanna", "Daria"], [ids[1]], 6)
+
+    # Failed writes do not advance the sequence.
+    assert (await client.delete("/contacts/9999", headers=auth_headers)).status_code == 404
+    assert (await client.post("/contacts/batch-delete", json={"ids": [9999]}, headers=auth_headers)).status_code == 200
+    assert (await _sync(client, auth_headers, 6)) == ([], [], 6)
+
+
+async def test_delete_during_full_sync_reaches_the_next_delta(client, auth_headers):
+    ids = [await _create(client, auth_headers, name) for name in ("Anna", "Bohdan", "Daria")]
+    first = (await client.get("/contacts/changes", params={"since": 0, "limit": 1}, headers=auth_headers)).json()
+    assert [contact["id"] for contact in first["updated"]] == [ids[0]]
+
+    # Already sent on page 1, deleted before the client asks for the rest.
+    await client.delete(f"/contacts/{ids[0]}", headers=auth_headers)
+    updated, deleted = [], []
+    params = {"cursor": first["next_cursor"], "limit": 1}
+    while params:
+        body = (await client.get("/contacts/changes", params=params, headers=auth_headers)).json()
+        updated += [contact["first_name"] for contact in body["updated"]]
+        deleted += body["deleted"]
+        params = {"cursor": body["next_cursor"], "limit": 1} if body["next_cursor"] else None
+    assert (updated, deleted, body["next_since"]) == (["Bohdan", "Daria"], [], 3)
+
+    response = await client.get("/contacts/changes", params={"since": body["next_since"]}, headers=auth_headers)
+    assert response.json()["deleted"] == [ids[0]]
+
+
+async def test_writes_during_a_delta_are_left_for_the_next_one(client, auth_headers):
+    ids = [await _create(client, auth_headers, name) for name in ("Anna", "Bohdan", "Daria")]
+    await client.patch(f"/contacts/{ids[0]}", json={"first_name": "Hanna"}, headers=auth_headers)
+    await client.patch(f"/contacts/{ids[1]}", json={"first_name": "Borys"}, headers=auth_headers)
+    first = (await client.get("/contacts/changes", params={"since": 3, "limit": 1}, headers=auth_headers)).json()
+    assert [contact["first_name"] for contact in first["updated"]] == ["Hanna"]
+
+    # A delete at 6 and an update at 7 land between the pages.
+    await client.delete(f"/contacts/{ids[2]}", headers=auth_headers)
+    await client.patch(f"/contacts/{ids[0]}", json={"last_name": "Koval"}, headers=auth_headers)
+    body = (await client.get("/contacts/changes", params={"cursor": first["next_cursor"]}, headers=auth_headers)).json()
+    assert ([contact["first_name"] for contact in body["updated"]], body["deleted"], body["next_since"]) == (["Borys"], [], 5)
+    assert (await _sync(client, auth_headers, 5)) == (["Hanna"], [ids[2]], 7)
+
+
+async def test_every_write_path_is_tracked(client, auth_headers, db_session, test_user):
+    ids = [await _create(client, auth_headers, name) for name in ("Anna", "Bohdan", "Daria")]
+    response = await client.post("/contacts/bulk", files={"file": ("c.ndjson", NDJSON.encode(), "application/x-ndjson")},
+                                 headers=auth_headers)
+    assert response.json()["inserted"] == 3
+    response = await client.post("/contacts/merge", json={"primary_id": ids[0], "duplicate_ids": [ids[1]]}, headers=auth_headers)
+    assert response.status_code == 200
+    await client.post("/contacts/batch-delete", json={"ids": [ids[2]]}, headers=auth_headers)
+
+    seqs = dict((await db_session.execute(select(Contact.first_name, Contact.change_seq))).all())
+    assert seqs == {"Anna": 5, "Import0": 4, "Import1": 4, "Import2": 4}
+    tombstones = (await db_session.execute(
+        select(ContactTombstone.contact_id, ContactTombstone.change_seq).order_by(ContactTombstone.id)
+    )).all()
+    assert tombstones == [(ids[1], 5), (ids[2], 6)]
+
+    # The three imported rows share sequence 4, so pages split inside it.
+    updated, deleted, since = await _sync(client, auth_headers, 3, limit=1)
+    assert (updated, deleted, since) == (["Import0", "Import1", "Import2", "Anna"], [ids[1], ids[2]], 6)
+
+
+async def test_compaction(client, auth_headers, db_session, test_engine):
+    ids = [await _create(client, auth_headers, name) for name in ("Anna", "Bohdan", "Daria")]
+    for contact_id in ids[:2]:
+        await client.delete(f"/contacts/{contact_id}", headers=auth_headers)
+    await db_session.execute(
+        update(ContactTombstone).where(ContactTombstone.contact_id == ids[0]).values(deleted_at=utcnow() - timedelta(days=100))
+    )
+    await db_session.commit()
+
+    session_factory = async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    assert await compact_tombstones(session_factory, retention_days=90, batch_size=1) == 1
+    assert await db_session.scalar(select(User.tombstones_compacted_seq)) == 4
+    assert (await db_session.scalars(select(ContactTombstone.contact_id))).all() == [ids[1]]
+
+    response = await client.get("/contacts/changes", params={"since": 3}, headers=auth_headers)
+    assert response.status_code == 410
+    assert (await _sync(client, auth_headers, 4)) == ([], [ids[1]], 5)
+    assert (await _sync(client, auth_headers, 0)) == (["Daria"], [], 5)
+
+
+async def test_changes_errors(client, auth_headers):
+    assert (await client.get("/contacts/changes", params={"cursor": "garbage"}, headers=auth_headers)).status_code == 400
+    assert (await client.get("/contacts/changes", params={"since": -1}, headers=auth_headers)).status_code == 422
+    assert (await client.get("/contacts/changes")).status_code == 401
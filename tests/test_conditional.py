@@ -0,0 +1,72 @@
+import pytest
+from contacts_api.conditional import etag_matches
+
+CONTACT = {"first_name": "Daria", "last_name": "Melnyk", "email": "daria@example.com", "phone": "+380501234567"}
+
+
+@pytest.fixture
+async def contact(client, auth_headers):
+    response = await client.post("/contacts/", json=CONTACT, headers=auth_headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_etag_matching_rules():
+    assert etag_matches('"c1.2"', '"c1.2"')
+    assert etag_matches('"x", W/"c1.2"', '"c1.2"')
+    assert not etag_matches('W/"c1.2"', '"c1.2"', weak=False)
+    assert etag_matches("*", '"c1.2"', weak=False)
+    assert not etag_matches(None, '"c1.2"')
+
+
+async def test_contact_revalidation(client, auth_headers, contact):
+    contact_id = contact.json()["id"]
+    etag = contact.headers["etag"]
+    assert contact.headers["last-modified"].endswith("GMT")
+
+    response = await client.get(f"/contacts/{contact_id}", headers=auth_headers)
+    assert response.headers["etag"] == etag
+
+    response = await client.get(f"/contacts/{contact_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    updated = await client.put(f"/contacts/{contact_id}", json={**CONTACT, "phone": "1"}, headers=auth_headers)
+    assert updated.headers["etag"] != etag
+    response = await client.get(f"/contacts/{contact_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["phone"] == "1"
+
+
+async def test_collection_revalidation(client, auth_headers, contact):
+    first = await client.get("/contacts/", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    response = await client.get("/contacts/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    other_page = await client.get("/contacts/", params={"limit": 5}, headers={**auth_headers, "If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    await client.post("/contacts/", json={**CONTACT, "email": "second@example.com"}, headers=auth_headers)
+    response = await client.get("/contacts/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+
+async def test_if_match_guards_writes(client, auth_headers, contact):
+    contact_id = contact.json()["id"]
+    etag = contact.headers["etag"]
+
+    response = await client.put(f"/contacts/{contact_id}", json=CONTACT, headers={**auth_headers, "If-Match": '"c0.0"'})
+    assert response.status_code == 412
+    updated = await client.put(
+        f"/contacts/{contact_id}", json={**CONTACT, "last_name": "Bondarenko"}, headers={**auth_headers, "If-Match": etag}
+    )
+    assert updated.status_code == 200
+
+    response = await client.delete(f"/contacts/{contact_id}", headers={**auth_headers, "If-Match": etag})
+    assert response.status_code == 412
+    response = await client.delete(f"/contacts/{contact_id}", headers={**auth_headers, "If-Match": updated.headers["etag"]})
+    assert response.status_code == 200
@@ -1,47 +1,80 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from contacts_api.database import Base, get_db
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from contacts_api.database import (
+    Base, DB_POOL_SIZE, MeteredAsyncQueuePool, engine_options, get_db, install_pool_metrics,
+    install_sqlite_pragmas, pool_metrics, to_async_url,
+)
 from contacts_api.main import app
 
-DATABASE_URL = "sqlite:///:memory:"
+DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-@pytest.fixture(scope="module")
-def engine():
-    test_engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(bind=test_engine)
+@pytest.fixture
+async def engine():
+    test_engine = create_async_engine(DATABASE_URL, poolclass=StaticPool)
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     yield test_engine
-    Base.metadata.drop_all(bind=test_engine)
-
-@pytest.fixture(scope="function")
-def test_db(test_engine):
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await test_engine.dispose()
 
-def test_get_db(test_db):
-    result = list(get_db())
+async def test_get_db(test_db):
+    result = [db async for db in get_db()]
     assert len(result) == 1
+    assert isinstance(result[0], AsyncSession)
     assert test_db.bind is not None
 
+def test_to_async_url():
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert to_async_url("postgresql://user:secret@db/contacts") == "postgresql+asyncpg://user:secret@db/contacts"
+    assert to_async_url("sqlite+aiosqlite:///:memory:") == "sqlite+aiosqlite:///:memory:"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://user@db/contacts")
+
 @pytest.fixture
-def test_db(engine):
-    connection = engine.connect()
-    transaction = connection.begin()
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=connection)
-    db = SessionLocal()
-    yield db
-    db.close()
-    transaction.rollback()
-    connection.close()
+async def test_db(engine):
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    async with SessionLocal() as db:
+        yield db
 
 @pytest.fixture(autouse=True)
 def override_get_db(test_db):
-    def _override_get_db():
+    async def _override_get_db():
         yield test_db
     app.dependency_overrides[get_db] = _override_get_db
     yield
     app.dependency_overrides[get_db] = None
+
+def test_engine_options_for_memory_and_file_urls():
+    assert engine_options("sqlite+aiosqlite:///:memory:") == {"poolclass": StaticPool}
+    options = engine_options("postgresql+asyncpg://user:secret@db/contacts")
+    assert options["poolclass"] is MeteredAsyncQueuePool
+    assert options["pool_size"] == DB_POOL_SIZE
+    assert options["pool_pre_ping"] is True
+
+async def test_sqlite_pragmas_and_pool_metrics(tmp_path):
+    file_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+                                      **engine_options("sqlite+aiosqlite:///pool.db"))
+    install_sqlite_pragmas(file_engine.sync_engine)
+    install_pool_metrics(file_engine.sync_engine)
+    pool_metrics.reset()
+    try:
+        async with file_engine.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1
+        snapshot = pool_metrics.snapshot()
+        assert snapshot["connects"] == 1
+        assert snapshot["checkouts"] == 1
+        assert snapshot["checkins"] == 1
+        assert snapshot["timeouts"] == 0
+    finally:
+        await file_engine.dispose()
+        pool_metrics.reset()
+
+async def test_db_pool_stats_endpoint(client):
+    response = await client.get("/internal/stats/db-pool")
+    assert response.status_code == 200
+    stats = response.json()
+    assert {"pool", "checkouts", "wait_seconds_max", "overflow_peak"} <= stats.keys()
@@ -0,0 +1,87 @@
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from contacts_api.digests import claim_run, render_digest, run_birthday_digests, seconds_until
+from contacts_api.models import Contact, EmailOutbox, JobCheckpoint, User
+
+
+class Crash(BaseException):
+    # Stands in for the process dying: send errors are caught per digest, this is not.
+    pass
+
+
+@pytest.fixture
+def session_factory(test_engine):
+    return async_sessionmaker(bind=test_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+async def owners(db_session):
+    await db_session.execute(insert(User), [
+        {"id": i, "email": f"owner{i}@example.com", "full_name": f"Owner {i}", "is_verified": i != 4} for i in range(1, 5)
+    ])
+    contacts = [
+        (1, "Anna", "2000-12-30"), (1, "Bohdan", "1990-01-02"), (1, "Daria", "1985-06-01"),
+        (2, "Ivan", "1970-12-29"), (3, "Oleh", "1999-03-03"), (4, "Taras", "1980-12-30"),
+    ]
+    db_session.add_all(Contact(first_name=name, last_name="Melnyk", email=f"{name.lower()}@example.com",
+                               birthday=birthday, user_id=user_id) for user_id, name, birthday in contacts)
+    await db_session.commit()
+
+
+def test_render_digest_orders_across_new_year():
+    subject, body = render_digest("Owner <1>", [("Bohdan", None, 102), ("Anna", "Melnyk", 1230)], date(2025, 12, 28))
+    assert subject == "Ближайшие дни рождения"
+    assert body.index("30.12 — Anna Melnyk") < body.index("02.01 — Bohdan")
+    assert "Owner &lt;1&gt;" in body
+
+
+def test_seconds_until():
+    now = datetime(2025, 5, 1, 8, 0, tzinfo=timezone.utc)
+    assert seconds_until(now, "09:30") == 5400
+    assert seconds_until(now, "07:00") == 23 * 3600
+
+
+async def test_one_digest_per_user(session_factory, owners):
+    send = AsyncMock()
+    stats = await run_birthday_digests(date(2025, 12, 28), 7, session_factory, send, batch_size=1)
+    assert (stats["status"], stats["users"], stats["sent"], stats["failed"]) == ("done", 2, 2, 0)
+    recipients = [call.args[1] for call in send.await_args_list]
+    assert recipients == ["owner1@example.com", "owner2@example.com"]
+    assert "Anna" in send.await_args_list[0].args[2] and "Bohdan" in send.await_args_list[0].args[2]
+
+    # A finished run is not repeated.
+    assert (await run_birthday_digests(date(2025, 12, 28), 7, session_factory, send))["status"] == "skipped"
+    assert send.await_count == 2
+
+
+async def test_resumes_after_checkpoint(session_factory, owners):
+    failing = AsyncMock(side_effect=[None, Crash()])
+    with pytest.raises(Crash):
+        await run_birthday_digests(date(2025, 12, 28), 7, session_factory, failing, batch_size=1)
+
+    send = AsyncMock()
+    stats = await run_birthday_digests(date(2025, 12, 28), 7, session_factory, send, batch_size=1)
+    assert stats["resumed_after"] == 1
+    assert [call.args[1] for call in send.await_args_list] == ["owner2@example.com"]
+
+
+async def test_failed_sends_go_to_the_outbox(session_factory, owners, db_session):
+    send = AsyncMock(side_effect=[RuntimeError("smtp down"), None])
+    stats = await run_birthday_digests(date(2025, 12, 28), 7, session_factory, send)
+    assert (stats["sent"], stats["failed"]) == (1, 1)
+    queued = (await db_session.scalars(select(EmailOutbox))).all()
+    assert [(message.recipient, message.status) for message in queued] == [("owner1@example.com", "pending")]
+    assert "Anna" in queued[0].body
+    assert queued[0].dedupe_key == "birthday-digest:2025-12-28/7:owner1@example.com"
+
+
+async def test_claim_is_exclusive(session_factory, db_session):
+    async with session_factory() as session:
+        assert await claim_run(session, "2025-05-01/7") == 0
+    async with session_factory() as session:
+        assert await claim_run(session, "2025-05-01/7") is None
+    checkpoint = await db_session.scalar(select(JobCheckpoint))
+    assert checkpoint.locked_until is not None
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import select
+from contacts_api.duplicates import candidate_pairs, merge_changes
+from contacts_api.models import Contact, ContactTombstone
+from contacts_api.mutations import update_contact_statement
+
+
+@pytest.fixture
+async def contacts(db_session, test_user):
+    rows = [
+        Contact(first_name="Ivan", last_name="Petrenko", email="ivan.petrenko@gmail.com", phone="+380671112233", user_id=test_user.id),
+        Contact(first_name="Ivan", last_name="Petrenko", email="IvanPetrenko@gmail.com", phone="067 111 2233",
+                birthday="1990-04-02", additional_info="from phone", user_id=test_user.id),
+        Contact(first_name="Іван", last_name="Петренко", email="ivan@work.example.com", phone="+380501234567",
+                birthday="1990-04-02", user_id=test_user.id),
+        Contact(first_name="Maria", last_name="Kovalenko", email="maria@example.com", phone="+380930000000", user_id=test_user.id),
+    ]
+    db_session.add_all(rows)
+    await db_session.commit()
+    return [row.id for row in rows]
+
+
+async def test_candidate_pairs_come_from_shared_keys(db_session, test_user, contacts):
+    first, second, third, _ = contacts
+    pairs = await candidate_pairs(db_session, test_user.id)
+    assert pairs == {(first, second): {"email", "phone", "name"}, (first, third): {"name"}, (second, third): {"name"}}
+    assert await candidate_pairs(db_session, test_user.id, max_block=2) == {(first, second): {"email", "phone"}}
+
+
+async def test_get_duplicates(client, auth_headers, contacts):
+    first, second, third, _ = contacts
+    response = await client.get("/contacts/duplicates", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["candidates"] == 3
+    assert [[contact["id"] for contact in pair["contacts"]] for pair in body["pairs"]] == [[first, second], [second, third]]
+    assert body["pairs"][0]["score"] == 1.0
+    assert body["pairs"][0]["matched"] == ["email", "phone", "name"]
+    assert body["pairs"][1]["matched"] == ["birthday", "name"]
+
+    response = await client.get("/contacts/duplicates?min_score=0.9", headers=auth_headers)
+    assert len(response.json()["pairs"]) == 1
+
+
+async def test_merge_contacts(client, auth_headers, db_session, contacts):
+    first, second, third, other = contacts
+    payload = {"primary_id": first, "duplicate_ids": [second, third]}
+    response = await client.post("/contacts/merge", json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["id"], body["birthday"], body["additional_info"]) == (first, "1990-04-02", "from phone")
+    assert response.headers["etag"] == f'"c{first}.2"'
+    remaining = (await db_session.scalars(select(Contact.id).order_by(Contact.id))).all()
+    assert remaining == [first, other]
+    assert (await client.get("/contacts/duplicates", headers=auth_headers)).json()["pairs"] == []
+
+    response = await client.post("/contacts/merge", json={"primary_id": first, "duplicate_ids": [second]}, headers=auth_headers)
+    assert response.status_code == 404
+    response = await client.post("/contacts/merge", json={"primary_id": first, "duplicate_ids": [first]}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+async def test_merge_ignores_repeated_duplicate_ids(client, auth_headers, db_session, contacts):
+    first, second, third, other = contacts
+    payload = {"primary_id": first, "duplicate_ids": [second, third, second]}
+    response = await client.post("/contacts/merge", json=payload, headers=auth_headers)
+    assert response.status_code == 200
+    tombstones = (await db_session.scalars(select(ContactTombstone.contact_id).order_by(ContactTombstone.contact_id))).all()
+    assert tombstones == [second, third]
+
+
+async def test_merge_rolls_back_when_primary_disappears(client, auth_headers, db_session, contacts, monkeypatch):
+    first, second, third, other = contacts
+
+    def primary_deleted_meanwhile(user_id, contact_id, changes, change_seq, *args):
+        return update_contact_statement(user_id, -1, changes, change_seq, *args)
+
+    monkeypatch.setattr("contacts_api.duplicates.update_contact_statement", primary_deleted_meanwhile)
+    response = await client.post("/contacts/merge", json={"primary_id": first, "duplicate_ids": [second]},
+                                 headers=auth_headers)
+    assert response.status_code == 404
+    remaining = (await db_session.scalars(select(Contact.id).order_by(Contact.id))).all()
+    assert remaining == [first, second, third, other]
+    assert (await db_session.scalars(select(ContactTombstone.id))).all() == []
+
+
+def test_merge_changes_fill_empty_fields():
+    primary = {"first_name": "Ivan", "last_name": "Petrenko", "phone": None, "birthday": None, "additional_info": "a"}
+    duplicate = {"first_name": "I.", "last_name": "P.", "phone": "+380671112233", "birthday": "1990-04-02", "additional_info": "b"}
+    changes = merge_changes(primary, [duplicate])
+    assert changes["phone"] == "+380671112233"
+    assert changes["birthday"].isoformat() == "1990-04-02"
+    assert changes["additional_info"] == "a\nb"
+    assert "first_name" not in changes
+
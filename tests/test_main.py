@@ -1,21 +1,18 @@
-from fastapi.testclient import TestClient
+import json
 import pytest
-from contacts_api.main import app
 from contacts_api.auth import create_access_token
 from contacts_api.models import Contact, User
 from contacts_api.utils import hash_password
-from sqlalchemy.orm import Session
-
-client = TestClient(app)
+from sqlalchemy.ext.asyncio import AsyncSession
 
 @pytest.fixture
-def test_user(db_session: Session):
+async def test_user(db_session: AsyncSession):
     email = "testuser@example.com"
     password = "securepassword"
     hashed_password = hash_password(password)
     user = User(email=email, password=hashed_password, full_name="Test User", is_verified=True)
     db_session.add(user)
-    db_session.commit()
+    await db_session.commit()
     return user
 
 @pytest.fixture
@@ -24,7 +21,7 @@ def auth_headers(test_user):
     assert token
     return {"Authorization": f"Bearer {token}"}
 
-def test_create_contact(db_session, auth_headers):
+async def test_create_contact(client, db_session, auth_headers):
     contact_data = {
         "first_name": "John",
         "last_name": "Doe",
@@ -32,26 +29,76 @@ def test_create_contact(db_session, auth_headers):
         "phone": "123-456-7890",
         "birthday": "1990-01-01"
     }
-    response = client.post("/contacts/", json=contact_data, headers=auth_headers)
+    response = await client.post("/contacts/", json=contact_data, headers=auth_headers)
 
     assert response.status_code == 200
 
-def test_get_contacts(db_session, auth_headers):
+async def test_get_contacts(client, db_session, auth_headers):
     contact = Contact(first_name="John", last_name="Doe", email="john.doe@example.com", user_id=1)
     db_session.add(contact)
-    db_session.commit()
+    await db_session.commit()
 
-    response = client.get("/contacts/", headers=auth_headers)
+    response = await client.get("/contacts/", headers=auth_headers)
     assert response.status_code == 200
-    contacts = response.json()
+    contacts = response.json()["items"]
     assert len(contacts) > 0
 
-def test_delete_contact(db_session, auth_headers):
+async def _add_contacts(db_session, count):
+    for i in range(count):
+        db_session.add(Contact(first_name=f"Name{i}", last_name="Doe", email=f"user{i}@example.com",
+                               phone="123-456-7890", user_id=1))
+    await db_session.commit()
+
+async def test_get_contacts_keyset_pagination(client, db_session, auth_headers):
+    await _add_contacts(db_session, 5)
+
+    response = await client.get("/contacts/", params={"limit": 2}, headers=auth_headers)
+    first = response.json()
+    assert [c["first_name"] for c in first["items"]] == ["Name0", "Name1"]
+    assert first["next_cursor"]
+
+    response = await client.get("/contacts/", params={"limit": 2, "cursor": first["next_cursor"]},
+                                headers=auth_headers)
+    second = response.json()
+    assert [c["first_name"] for c in second["items"]] == ["Name2", "Name3"]
+
+    response = await client.get("/contacts/", params={"limit": 2, "cursor": second["next_cursor"]},
+                                headers=auth_headers)
+    last = response.json()
+    assert [c["first_name"] for c in last["items"]] == ["Name4"]
+    assert last["next_cursor"] is None
+
+    response = await client.get("/contacts/", params={"after_id": first["items"][-1]["id"]}, headers=auth_headers)
+    assert len(response.json()["items"]) == 3
+
+async def test_get_contacts_invalid_cursor(client, db_session, auth_headers):
+    response = await client.get("/contacts/", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+async def test_get_contacts_ndjson_stream(client, db_session, auth_headers):
+    await _add_contacts(db_session, 3)
+
+    response = await client.get("/contacts/", params={"stream": True}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [c["first_name"] for c in lines] == ["Name0", "Name1", "Name2"]
+
+async def test_delete_contact(client, db_session, auth_headers):
     contact = Contact(first_name="John", last_name="Doe", email="john.doe@example.com", phone="123-456-7890",
                       user_id=1, birthday="1990-01-01")
     db_session.add(contact)
-    db_session.commit()
+    await db_session.commit()
 
-    response = client.delete(f"/contacts/{contact.id}", headers=auth_headers)
+    response = await client.delete(f"/contacts/{contact.id}", headers=auth_headers)
     assert response.status_code == 200
-    
\ No newline at end of file
+    
+async def test_create_contact_duplicate_email(client, db_session, auth_headers):
+    contact_data = {"first_name": "John", "last_name": "Doe", "email": "john.doe@example.com", "phone": "1"}
+    assert (await client.post("/contacts/", json=contact_data, headers=auth_headers)).status_code == 200
+    response = await client.post("/contacts/", json=contact_data, headers=auth_headers)
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Contact with this email already exists"}
+
+    db_session.add(Contact(first_name="John", last_name="Doe", email="john.doe@example.com", user_id=2))
+    await db_session.commit()
@@ -0,0 +1,113 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from contacts_api.main import app
+from contacts_api.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    RequestStats,
+    current_request,
+    install_query_metrics,
+    metrics,
+    timed_redis,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert (histogram.count, histogram.sum) == (4, 3.65)
+
+
+async def test_metrics_endpoint_reports_routes_and_queries(client, auth_headers, mock_redis):
+    response = await client.get("/contacts/", headers=auth_headers)
+    assert response.status_code == 200
+    await client.get("/no-such-page")
+
+    body = (await client.get("/metrics")).text
+    assert 'http_request_duration_seconds_count{method="GET",route="/contacts/",status="200"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"} 1' in body
+    assert 'http_requests_in_flight{method="GET"} 1' in body
+    assert 'redis_command_duration_seconds_count{command="get"} 1' in body
+
+    histogram = metrics.db_queries[("GET", "/contacts/")]
+    assert histogram.count == 1 and histogram.sum >= 1
+    assert metrics.response_size[("GET", "/contacts/")].sum == len(response.content)
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/internal/stats/db-pool", "/internal/stats/contact-cache"])
+async def test_internal_endpoints_need_an_allowed_client_or_token(path, monkeypatch):
+    monkeypatch.setattr("contacts_api.metrics.INTERNAL_API_TOKEN", "scrape-token")
+    transport = ASGITransport(app=app, client=("203.0.113.7", 4000))
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        assert (await ac.get(path)).status_code == 403
+        assert (await ac.get(path, headers={"Authorization": "Bearer wrong"})).status_code == 403
+        assert (await ac.get(path, headers={"Authorization": "Bearer scrape-token"})).status_code == 200
+
+        monkeypatch.setattr("contacts_api.metrics.INTERNAL_API_TOKEN", "")
+        assert (await ac.get(path, headers={"Authorization": "Bearer "})).status_code == 403
+
+
+def test_failed_statements_leave_no_timing_state():
+    engine = create_engine("sqlite://")
+    install_query_metrics()
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+            assert "query_started" not in conn.info
+    finally:
+        current_request.reset(token)
+        engine.dispose()
+    assert stats.db_queries == 1
+    assert 0 <= stats.db_seconds < 1
+
+
+async def test_server_timing_header():
+    registry = MetricsRegistry()
+    inner = FastAPI()
+
+    @inner.get("/ping")
+    async def ping() -> dict:
+        await timed_redis("get", _value("pong"), registry)
+        return {"ok": True}
+
+    app = MetricsMiddleware(inner, registry=registry, server_timing=True)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.get("/ping")
+
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    assert 'redis;dur=' in timing and 'desc="1 calls"' in timing
+    assert registry.latency[("GET", "/ping", "200")].count == 1
+
+
+async def test_timed_redis_counts_failures():
+    registry = MetricsRegistry()
+    with pytest.raises(ConnectionError):
+        await timed_redis("setex", _fail(), registry)
+    assert registry.redis_errors == {"setex": 1}
+    assert registry.redis_latency[("setex",)].count == 1
+
+
+async def _value(value):
+    return value
+
+
+async def _fail():
+    raise ConnectionError("redis is down")
@@ -0,0 +1,182 @@
+from pathlib import Path
+from datetime import date
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import IntegrityError
+from contacts_api.birthdays import upcoming_birthdays_statement
+from contacts_api.changes import changed_contacts_statement, tombstones_statement
+from contacts_api.database import Base
+from contacts_api.digests import digest_statement
+from contacts_api.duplicates import BLOCKS, block_members_statement
+from contacts_api.models import Contact
+from contacts_api.normalization import derived_keys
+from contacts_api.phones import lookup_statement
+from contacts_api.search import include_name
+
+ROOT = Path(__file__).resolve().parents[1]
+
+@pytest.fixture
+def alembic_config(tmp_path):
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "migrations"))
+    cfg.set_main_option("sqlalchemy.url", f"sqlite:///{tmp_path / 'migrations.db'}")
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+@pytest.fixture
+def migrated_engine(alembic_config):
+    command.upgrade(alembic_config, "head")
+    engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+    yield engine
+    engine.dispose()
+
+def _explain(engine, statement):
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return " | ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+
+def test_migrations_match_models(migrated_engine):
+    with migrated_engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": include_name})
+        assert compare_metadata(context, Base.metadata) == []
+
+def test_upgrade_backfills_existing_rows(alembic_config):
+    command.upgrade(alembic_config, "0001_baseline")
+    engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'owner@example.com')"))
+        conn.execute(text("INSERT INTO contacts (first_name, last_name, email, birthday, user_id) "
+                          "VALUES ('Jonathan', 'Smith', 'jon@example.com', '1990-12-30', 1)"))
+    command.upgrade(alembic_config, "head")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT birthday_md FROM contacts")).scalar() == 1230
+        assert conn.execute(text("SELECT last_name_key FROM contacts")).scalar() == "S530"
+        assert conn.execute(text("SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'jonat'")).scalar() == 1
+        rows = conn.execute(upcoming_birthdays_statement(1, date(2025, 12, 28), 7)).all()
+        assert len(rows) == 1
+    command.downgrade(alembic_config, "base")
+    engine.dispose()
+
+def test_revisions_do_not_import_app_code():
+    # A released revision must keep doing what it did when it shipped, whatever the app code becomes.
+    for path in (ROOT / "migrations" / "versions").glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        assert "import contacts_api" not in source and "from contacts_api" not in source, path.name
+
+def test_blocking_keys_backfill_matches_new_writes(alembic_config):
+    # Existing rows must get the keys the app computes for the same values, or blocking misses them.
+    contacts = [
+        ("Ivan", "I.van+work@gmail.com", "+380 50 123 4567 ext 12"),
+        ("Olena", "olena@example.com", "050 123 4567"),
+        ("John", "john@example.com", "0044 20 7946 0958"),
+        ("Anna", "anna@example.com", "12345678"),
+        ("Petro", "petro@example.com", "call me"),
+    ]
+    command.upgrade(alembic_config, "0006_contact_versions")
+    engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'owner@example.com')"))
+        conn.execute(text("INSERT INTO contacts (first_name, email, phone, user_id) VALUES (:name, :email, :phone, 1)"),
+                     [{"name": name, "email": email, "phone": phone} for name, email, phone in contacts])
+    command.upgrade(alembic_config, "0007_contact_blocking_keys")
+    columns = ("email_key", "phone_e164", "first_name_key")
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT {', '.join(columns)} FROM contacts ORDER BY id")).all()
+    expected = []
+    for name, email, phone in contacts:
+        keys = derived_keys({"first_name": name, "email": email, "phone": phone})
+        expected.append(tuple(keys[column] for column in columns))
+    assert [tuple(row) for row in rows] == expected
+    assert rows[0] == ("ivan@gmail.com", "+380501234567", "I150")
+    assert [row[1] for row in rows[2:]] == ["+442079460958", None, None]
+    engine.dispose()
+
+def test_phone_reversed_backfill_matches_new_writes(alembic_config):
+    phones = ["+380 50 123 4567 ext 12", "050 123 4567", "(212) 555-0100", "call me"]
+    command.upgrade(alembic_config, "0007_contact_blocking_keys")
+    engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'owner@example.com')"))
+        conn.execute(text("INSERT INTO contacts (email, phone, user_id) VALUES (:email, :phone, 1)"),
+                     [{"email": f"c{i}@example.com", "phone": phone} for i, phone in enumerate(phones)])
+    command.upgrade(alembic_config, "0008_contact_phone_reversed")
+    with engine.connect() as conn:
+        stored = conn.execute(text("SELECT phone_reversed FROM contacts ORDER BY id")).scalars().all()
+    assert stored == [derived_keys({"phone": phone})["phone_reversed"] for phone in phones]
+    assert stored[0] == "765432105083" and stored[2] == "0010555212" and stored[3] is None
+    engine.dispose()
+
+def test_contact_ids_are_not_reused_after_upgrade(alembic_config):
+    command.upgrade(alembic_config, "0010_contact_changes")
+    engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'owner@example.com')"))
+        conn.execute(text("INSERT INTO contacts (id, first_name, email, user_id) "
+                          "VALUES (1, 'Kept', 'kept@example.com', 1), (2, 'Gone', 'gone@example.com', 1)"))
+        conn.execute(text("DELETE FROM contacts WHERE id = 2"))
+        conn.execute(text("INSERT INTO contact_tombstones (user_id, contact_id, change_seq, deleted_at) "
+                          "VALUES (1, 2, 1, '2025-01-30 10:00:00')"))
+    command.upgrade(alembic_config, "head")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO contacts (first_name, email, user_id) VALUES ('Fresh', 'fresh@example.com', 1)"))
+        assert conn.execute(text("SELECT id FROM contacts WHERE first_name = 'Fresh'")).scalar() == 3
+        assert conn.execute(text("SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'fresh'")).scalar() == 3
+        assert conn.execute(text("SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'kept'")).scalar() == 1
+        conn.execute(text("DELETE FROM contacts WHERE id = 3"))
+        conn.execute(text("INSERT INTO contacts (first_name, email, user_id) VALUES ('Next', 'next@example.com', 1)"))
+        assert conn.execute(text("SELECT id FROM contacts WHERE first_name = 'Next'")).scalar() == 4
+        assert conn.execute(text("SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH 'fresh'")).first() is None
+    command.downgrade(alembic_config, "0010_contact_changes")
+    with engine.connect() as conn:
+        triggers = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger' ORDER BY name")).scalars().all()
+        assert triggers == ["contacts_fts_ad", "contacts_fts_ai", "contacts_fts_au"]
+    engine.dispose()
+
+def test_contact_email_unique_per_user(migrated_engine):
+    with migrated_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'a@example.com'), (2, 'b@example.com')"))
+        conn.execute(text("INSERT INTO contacts (email, user_id) VALUES ('same@example.com', 1), ('same@example.com', 2)"))
+    with pytest.raises(IntegrityError):
+        with migrated_engine.begin() as conn:
+            conn.execute(text("INSERT INTO contacts (email, user_id) VALUES ('same@example.com', 1)"))
+
+def test_hot_queries_use_user_indexes(migrated_engine):
+    plans = {
+        "get_contact": select(Contact).where(Contact.id == 1, Contact.user_id == 1),
+        "get_contacts": select(Contact).where(Contact.user_id == 1, Contact.id > 5).order_by(Contact.id).limit(101),
+        "by_email": select(Contact).where(Contact.user_id == 1, Contact.email == "a@example.com"),
+        "by_name": select(Contact).where(Contact.user_id == 1).order_by(Contact.last_name, Contact.first_name),
+        "birthdays": upcoming_birthdays_statement(1, date(2025, 5, 1), 7),
+        "phone_lookup": lookup_statement(1, "332211176"),
+        "digest": digest_statement(date(2025, 5, 1), 7, 10),
+        "changes": changed_contacts_statement(1, 40, None, 60, 501),
+        "changes_page": changed_contacts_statement(1, 40, 17, 60, 501),
+        "tombstones_page": tombstones_statement(1, 40, 17, 60, 501),
+        **{f"{kind}_blocks": block_members_statement(1, columns) for kind, columns in BLOCKS.items()},
+    }
+    plans = {name: _explain(migrated_engine, statement) for name, statement in plans.items()}
+    assert "INTEGER PRIMARY KEY" in plans["get_contact"]
+    assert "ix_contacts_user_id_id (user_id=? AND id>?)" in plans["get_contacts"]
+    assert "TEMP B-TREE" not in plans["get_contacts"]
+    assert "uq_contacts_user_email (user_id=? AND email=?)" in plans["by_email"]
+    assert "ix_contacts_user_name" in plans["by_name"]
+    assert "TEMP B-TREE" not in plans["by_name"]
+    assert "ix_contacts_user_birthday_md (user_id=? AND birthday_md>? AND birthday_md<?)" in plans["birthdays"]
+    assert "ix_contacts_user_phone_reversed (user_id=? AND phone_reversed>? AND phone_reversed<?)" in plans["phone_lookup"]
+    assert "TEMP B-TREE" not in plans["phone_lookup"]
+    assert "ix_contacts_user_birthday_md (user_id=? AND birthday_md>? AND birthday_md<?)" in plans["digest"]
+    assert "TEMP B-TREE" not in plans["digest"]
+    assert "ix_contacts_user_change_seq (user_id=? AND change_seq>? AND change_seq<?)" in plans["changes"]
+    assert "ix_contacts_user_change_seq (user_id=? AND change_seq>? AND change_seq<?)" in plans["changes_page"]
+    assert "ix_contact_tombstones_user_change_seq (user_id=? AND change_seq>? AND change_seq<?)" in plans["tombstones_page"]
+    for name in ("changes", "changes_page", "tombstones_page"):
+        assert "TEMP B-TREE" not in plans[name]
+    for kind, index in (("email", "ix_contacts_user_email_key"), ("phone", "ix_contacts_user_phone_e164"),
+                        ("name", "ix_contacts_user_name_keys")):
+        assert f"COVERING INDEX {index} (user_id=?)" in plans[f"{kind}_blocks"]
+        assert "TEMP B-TREE" not in plans[f"{kind}_blocks"]
+    assert all("SCAN contacts" not in plan for plan in plans.values())
@@ -1,3 +1,4 @@
+from datetime import date
 from contacts_api.models import User, Contact
 
 def test_user_model():
@@ -24,3 +25,10 @@ def test_contact_model():
     )
     assert contact.first_name == "John"
     assert contact.email == "john.doe@example.com"
+
+def test_contact_birthday_key():
+    contact = Contact(first_name="John", birthday=date(1992, 2, 29))
+    assert contact.birthday == "1992-02-29"
+    assert contact.birthday_md == 229
+    contact.birthday = None
+    assert contact.birthday_md is None
@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import select
+from contacts_api.conditional import if_match_version
+from contacts_api.metrics import metrics
+from contacts_api.models import Contact
+
+CONTACT = {"first_name": "Oleh", "last_name": "Petrenko", "email": "oleh@example.com", "phone": "+380671112233"}
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+async def _create(client, auth_headers, **overrides):
+    response = await client.post("/contacts/", json={**CONTACT, **overrides}, headers=auth_headers)
+    assert response.status_code == 200
+    return response
+
+
+def test_if_match_version():
+    assert if_match_version(None, 5) is None
+    assert if_match_version("*", 5) is None
+    assert if_match_version('"c4.2", "c5.3"', 5) == 3
+    assert if_match_version('"c15.3"', 5) == -1
+    assert if_match_version('W/"c5.3"', 5) == -1
+
+
+async def test_patch_updates_only_sent_fields(client, auth_headers, db_session):
+    created = await _create(client, auth_headers, birthday="1990-03-14", additional_info="met at work")
+    contact_id = created.json()["id"]
+
+    response = await client.patch(f"/contacts/{contact_id}", json={"birthday": "1991-12-01"}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["birthday"] == "1991-12-01"
+    assert body["additional_info"] == "met at work"
+    assert body["first_name"] == "Oleh"
+    assert response.headers["etag"] == f'"c{contact_id}.2"'
+
+    stored = await db_session.scalar(select(Contact).where(Contact.id == contact_id))
+    assert (stored.birthday_md, stored.version) == (1201, 2)
+
+    response = await client.patch(f"/contacts/{contact_id}", json={"additional_info": None}, headers=auth_headers)
+    assert response.json()["additional_info"] is None
+    response = await client.patch(f"/contacts/{contact_id}", json={"first_name": None}, headers=auth_headers)
+    assert response.status_code == 422
+    response = await client.patch(f"/contacts/{contact_id}", json={}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+async def test_patch_and_delete_errors(client, auth_headers):
+    created = await _create(client, auth_headers)
+    contact_id = created.json()["id"]
+    await _create(client, auth_headers, email="taken@example.com")
+
+    response = await client.patch("/contacts/9999", json={"phone": "1"}, headers=auth_headers)
+    assert response.status_code == 404
+    response = await client.patch("/contacts/9999", json={"phone": "1"}, headers={**auth_headers, "If-Match": '"c9999.1"'})
+    assert response.status_code == 404
+    response = await client.patch(f"/contacts/{contact_id}", json={"email": "taken@example.com"}, headers=auth_headers)
+    assert response.status_code == 409
+
+    stale = {**auth_headers, "If-Match": created.headers["etag"]}
+    assert (await client.patch(f"/contacts/{contact_id}", json={"phone": "2"}, headers=stale)).status_code == 200
+    assert (await client.patch(f"/contacts/{contact_id}", json={"phone": "3"}, headers=stale)).status_code == 412
+    assert (await client.delete(f"/contacts/{contact_id}", headers=stale)).status_code == 412
+    assert (await client.delete(f"/contacts/{contact_id}", headers=auth_headers)).status_code == 200
+    assert (await client.delete(f"/contacts/{contact_id}", headers=auth_headers)).status_code == 404
+
+
+async def test_writes_are_single_statements(client, auth_headers):
+    contact_id = (await _create(client, auth_headers)).json()["id"]
+    metrics.reset()
+
+    await client.patch(f"/contacts/{contact_id}", json={"phone": "1"}, headers=auth_headers)
+    await client.put(f"/contacts/{contact_id}", json=CONTACT, headers=auth_headers)
+    await client.delete(f"/contacts/{contact_id}", headers=auth_headers)
+
+    # The contact write itself plus the collection generation bump; a delete also leaves a tombstone.
+    for method, statements in (("PATCH", 2), ("PUT", 2), ("DELETE", 3)):
+        assert metrics.db_queries[(method, "/contacts/{contact_id}")].sum == statements
+
+
+async def test_batch_update_and_delete(client, auth_headers, db_session):
+    ids = [(await _create(client, auth_headers, email=f"batch{i}@example.com")).json()["id"] for i in range(3)]
+    listing = await client.get("/contacts/", headers=auth_headers)
+
+    response = await client.patch(
+        "/contacts/batch", json={"ids": ids[:2] + [9999], "changes": {"last_name": "Shevchenko"}}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": ids[:2], "not_found": [9999]}
+    names = (await db_session.scalars(select(Contact.last_name).where(Contact.id.in_(ids)).order_by(Contact.id))).all()
+    assert names == ["Shevchenko", "Shevchenko", "Petrenko"]
+
+    response = await client.get("/contacts/", headers={**auth_headers, "If-None-Match": listing.headers["etag"]})
+    assert response.status_code == 200
+
+    response = await client.patch("/contacts/batch", json={"ids": ids, "changes": {"email": "x@example.com"}}, headers=auth_headers)
+    assert response.status_code == 400
+    response = await client.patch("/contacts/batch", json={"ids": [], "changes": {"phone": "1"}}, headers=auth_headers)
+    assert response.status_code == 422
+
+    response = await client.post("/contacts/batch-delete", json={"ids": [ids[0], ids[2], 9999]}, headers=auth_headers)
+    assert response.json() == {"affected": [ids[0], ids[2]], "not_found": [9999]}
+    remaining = (await client.get("/contacts/", headers=auth_headers)).json()["items"]
+    assert [item["id"] for item in remaining] == [ids[1]]
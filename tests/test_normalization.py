@@ -0,0 +1,53 @@
+import pytest
+from contacts_api.normalization import derived_keys, e164, email_key, name_key, reversed_digits
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("+380 67 111-22-33", "+380671112233"),
+    ("067 111 2233", "+380671112233"),
+    ("00380671112233", "+380671112233"),
+    ("+1 (415) 555-0100 ext. 12", "+14155550100"),
+    ("+1 415 555 0100 x12", "+14155550100"),
+    ("123", None),
+    ("", None),
+    # National formats without a known country are not guessed at.
+    ("(212) 555-0100", None),
+    ("555-123-4567", None),
+    ("1234567890", None),
+    ("+1 415 CALL NOW", None),
+])
+def test_e164(value, expected):
+    assert e164(value) == expected
+
+
+def test_e164_without_default_country():
+    assert e164("067 111 2233", country_code="") is None
+    assert e164("+380 67 111 2233", country_code="") == "+380671112233"
+
+
+def test_email_key():
+    assert email_key("Ivan.Petrenko+work@GoogleMail.com") == "ivanpetrenko@gmail.com"
+    assert email_key("Ivan.Petrenko+work@example.com") == "ivan.petrenko@example.com"
+    assert email_key("not-an-email") is None
+
+
+def test_name_key():
+    assert name_key("Jon") == name_key("John") == "J500"
+    assert name_key("Іван") == name_key("Ivan") == "I150"
+    assert name_key("Шевченко") == name_key("Shevchenko")
+    assert name_key("Tymczak") == "T522"
+    assert name_key("42") is None
+
+
+def test_reversed_digits_fall_back_to_the_typed_line():
+    assert reversed_digits("+1 415 555 0100 ext. 12") == "00105555141"
+    assert reversed_digits("(212) 555-0100 x7") == "0010555212"
+    assert reversed_digits("call me") is None
+    assert reversed_digits(None) is None
+
+
+def test_derived_keys_only_for_present_fields():
+    assert derived_keys({"phone": "067 111 2233", "birthday": None}) == {
+        "phone_e164": "+380671112233",
+        "phone_reversed": "332211176083",
+    }
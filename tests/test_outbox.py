@@ -0,0 +1,149 @@
+import socket
+from datetime import timedelta
+import pytest
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from contacts_api.models import EmailOutbox, utcnow
+from contacts_api.outbox import OutboxWorker, enqueue_email, retry_delay
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _mail_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="noreply@example.com",
+        MAIL_FROM_NAME="Contacts API",
+        MAIL_PORT=port,
+        MAIL_SERVER="127.0.0.1",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=False,
+        VALIDATE_CERTS=False,
+        TIMEOUT=5,
+    )
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server():
+    controller_module = pytest.importorskip("aiosmtpd.controller")
+    handler = RecordingHandler()
+    controller = controller_module.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def session_factory(test_engine):
+    return async_sessionmaker(bind=test_engine, autoflush=False, expire_on_commit=False)
+
+
+async def test_enqueue_dedupes_pending_messages(db_session):
+    await enqueue_email(db_session, "a@example.com", "Reset", "first", dedupe_key="reset:a@example.com")
+    await db_session.commit()
+    await enqueue_email(db_session, "a@example.com", "Reset", "second", dedupe_key="reset:a@example.com")
+    await enqueue_email(db_session, "b@example.com", "Hello", "other")
+    await db_session.commit()
+
+    rows = (await db_session.scalars(select(EmailOutbox).order_by(EmailOutbox.id))).all()
+    assert [(row.recipient, row.body) for row in rows] == [("a@example.com", "second"), ("b@example.com", "other")]
+
+
+async def test_enqueue_over_a_retry_row_sends_it_now(db_session):
+    message = await enqueue_email(db_session, "a@example.com", "Reset", "first", dedupe_key="reset:a@example.com")
+    message.status, message.attempts, message.last_error = "retry", 3, "timeout"
+    message.next_attempt_at = utcnow() + timedelta(hours=1)
+    await db_session.commit()
+
+    again = await enqueue_email(db_session, "a@example.com", "Reset", "second", dedupe_key="reset:a@example.com")
+    await db_session.commit()
+
+    assert again.id == message.id
+    assert (again.status, again.attempts, again.last_error, again.body) == ("pending", 0, None, "second")
+    assert (await db_session.scalar(select(func.count()).select_from(EmailOutbox))) == 1
+    due = select(func.count()).select_from(EmailOutbox).where(EmailOutbox.next_attempt_at <= utcnow())
+    assert (await db_session.scalar(due)) == 1
+
+
+async def test_enqueue_leaves_a_claimed_row_alone(db_session):
+    message = await enqueue_email(db_session, "a@example.com", "Reset", "first", dedupe_key="reset:a@example.com")
+    message.status, message.attempts = "sending", 1
+    await db_session.commit()
+
+    again = await enqueue_email(db_session, "a@example.com", "Reset", "second", dedupe_key="reset:a@example.com")
+    await db_session.commit()
+
+    assert again.id != message.id
+    rows = (await db_session.execute(
+        select(EmailOutbox.body, EmailOutbox.status, EmailOutbox.attempts).order_by(EmailOutbox.id)
+    )).all()
+    assert [tuple(row) for row in rows] == [("first", "sending", 1), ("second", "pending", 0)]
+
+
+async def test_worker_sends_batch_over_one_connection(smtp_server, session_factory, db_session):
+    handler, port = smtp_server
+    for i in range(5):
+        await enqueue_email(db_session, f"user{i}@example.com", "Hi", f"<p>{i}</p>")
+    await db_session.commit()
+
+    worker = OutboxWorker(session_factory, _mail_config(port), batch_size=3)
+    assert await worker.run_once() == 3
+    assert await worker.run_once() == 2
+    assert await worker.run_once() == 0
+    await worker.close()
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == [f"user{i}@example.com" for i in range(5)]
+    assert len(handler.sessions) == 1
+    stats = worker.metrics.snapshot()
+    assert stats["sent"] == 5
+    assert stats["connections"] == 1
+    db_session.expire_all()
+    rows = (await db_session.scalars(select(EmailOutbox))).all()
+    assert {row.status for row in rows} == {"sent"}
+    assert all(row.sent_at is not None for row in rows)
+
+
+async def test_worker_retries_with_backoff_then_gives_up(session_factory, db_session):
+    await enqueue_email(db_session, "a@example.com", "Hi", "body")
+    await db_session.commit()
+    worker = OutboxWorker(session_factory, _mail_config(_free_port()), max_attempts=2)
+
+    assert await worker.run_once() == 1
+    db_session.expire_all()
+    message = await db_session.scalar(select(EmailOutbox))
+    assert (message.status, message.attempts) == ("retry", 1)
+    assert message.last_error.startswith("SMTP connection failed")
+    assert await worker.run_once() == 0
+
+    message.next_attempt_at = utcnow()
+    await db_session.commit()
+    assert await worker.run_once() == 1
+    db_session.expire_all()
+    message = await db_session.scalar(select(EmailOutbox))
+    assert (message.status, message.attempts) == ("failed", 2)
+    assert worker.metrics.snapshot()["retried"] == 1
+    assert worker.metrics.snapshot()["failed"] == 1
+
+
+def test_retry_delay_grows_exponentially():
+    assert 24 <= retry_delay(1) <= 36
+    assert 96 <= retry_delay(3) <= 144
+    assert retry_delay(20) <= 3600 * 1.2
@@ -0,0 +1,12 @@
+import pytest
+from contacts_api.pagination import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(42)
+    assert "42" not in cursor
+    assert decode_cursor(cursor) == 42
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(-1), "eyJpZCI6ImEifQ"])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
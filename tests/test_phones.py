@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from contacts_api.models import Contact, User
+from contacts_api.phones import backfill_phones, lookup_prefix
+
+
+@pytest.fixture
+async def contacts(client, auth_headers):
+    created = []
+    for name, phone in (("Oleh", "067 111 2233"), ("Daria", "+380 50 111 2233"), ("Taras", "+1 415 555 0100")):
+        contact = {"first_name": name, "last_name": "Melnyk", "email": f"{name.lower()}@example.com", "phone": phone}
+        response = await client.post("/contacts/", json=contact, headers=auth_headers)
+        assert response.status_code == 200
+        created.append(response.json())
+    return created
+
+
+def test_lookup_prefix():
+    assert lookup_prefix("+380 67 111 22 33") == "332211176"
+    assert lookup_prefix("2233", digits=4) == "3322"
+    with pytest.raises(ValueError):
+        lookup_prefix("112")
+
+
+async def test_phones_are_kept_as_typed(client, auth_headers, contacts, db_session):
+    assert [contact["phone"] for contact in contacts] == ["067 111 2233", "+380 50 111 2233", "+1 415 555 0100"]
+    for phone, key in (("(212) 555-0100", None), ("555-123-4567", None), ("+1 415 555 0100 ext. 12", "+14155550100")):
+        response = await client.patch(f"/contacts/{contacts[0]['id']}", json={"phone": phone}, headers=auth_headers)
+        assert response.json()["phone"] == phone
+        stored = await db_session.scalar(select(Contact.phone_e164).where(Contact.id == contacts[0]["id"]))
+        assert stored == key
+
+
+async def test_lookup(client, auth_headers, contacts):
+    response = await client.get("/contacts/lookup", params={"phone": "0671112233"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert [(match["first_name"], match["exact"]) for match in response.json()] == [("Oleh", True)]
+
+    response = await client.get("/contacts/lookup", params={"phone": "111-22-33", "digits": 7}, headers=auth_headers)
+    assert [(match["first_name"], match["exact"]) for match in response.json()] == [("Daria", False), ("Oleh", False)]
+    response = await client.get("/contacts/lookup", params={"phone": "+380501112233", "digits": 7}, headers=auth_headers)
+    assert [match["first_name"] for match in response.json()] == ["Daria", "Oleh"]
+
+    assert (await client.get("/contacts/lookup", params={"phone": "12"}, headers=auth_headers)).status_code == 400
+    assert (await client.get("/contacts/lookup", params={"phone": "999999999"}, headers=auth_headers)).json() == []
+
+
+async def test_lookup_finds_numbers_without_a_known_country(client, auth_headers, contacts):
+    await client.patch(f"/contacts/{contacts[2]['id']}", json={"phone": "(212) 555-0100 ext 7"}, headers=auth_headers)
+    response = await client.get("/contacts/lookup", params={"phone": "212 555 0100", "digits": 7}, headers=auth_headers)
+    assert [(match["first_name"], match["exact"]) for match in response.json()] == [("Taras", False)]
+
+
+async def test_backfill_phones(test_engine, db_session, test_user):
+    await db_session.execute(insert(Contact.__table__), [
+        {"first_name": "A", "email": "a@example.com", "phone": "067 111 2233", "user_id": test_user.id},
+        {"first_name": "B", "email": "b@example.com", "phone": "+380501112233", "user_id": test_user.id},
+        {"first_name": "C", "email": "c@example.com", "phone": "112", "user_id": test_user.id},
+        {"first_name": "D", "email": "d@example.com", "phone": "(212) 555-0100 ext 7", "user_id": test_user.id},
+    ])
+    await db_session.commit()
+
+    session_factory = async_sessionmaker(bind=test_engine, expire_on_commit=False)
+    assert await backfill_phones(session_factory, batch_size=2) == 4
+    rows = (await db_session.execute(
+        select(Contact.phone, Contact.phone_e164, Contact.phone_reversed, Contact.version).order_by(Contact.id)
+    )).all()
+    assert [tuple(row) for row in rows] == [
+        ("067 111 2233", "+380671112233", "332211176083", 1),
+        ("+380501112233", "+380501112233", "332211105083", 1),
+        ("112", None, "211", 1),
+        ("(212) 555-0100 ext 7", None, "0010555212", 1),
+    ]
+    # Only derived columns changed, which is not a visible write.
+    assert await db_session.scalar(select(User.contacts_generation).where(User.id == test_user.id)) == 0
+    assert await backfill_phones(session_factory) == 0
@@ -0,0 +1,99 @@
+import pytest
+from redis.exceptions import ConnectionError
+from contacts_api.metrics import metrics
+from contacts_api.rate_limit import LocalBuckets, RateLimiter, Rule, rate_limiter
+from contacts_api.resources import resources
+
+
+@pytest.fixture
+def fake_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture
+def limited(mocker, fake_redis):
+    mocker.patch.object(resources, "redis", fake_redis)
+    mocker.patch.object(rate_limiter, "enabled", True)
+    mocker.patch.object(rate_limiter, "rules", {"auth": Rule(2, 60), "read": Rule(3, 60), "write": Rule(1, 60)})
+    metrics.reset()
+    yield fake_redis
+    metrics.reset()
+
+
+class BrokenRedis:
+    def pipeline(self, transaction=True):
+        raise ConnectionError("Connection refused")
+
+
+def test_rule_parsing():
+    rule = Rule.parse("10/60")
+    assert (rule.limit, rule.window, rule.policy) == (10, 60.0, "10;w=60")
+    with pytest.raises(ValueError):
+        Rule.parse("0/60")
+
+
+def test_local_buckets_refill(mocker):
+    clock = mocker.patch("contacts_api.rate_limit.time.monotonic", return_value=100.0)
+    buckets = LocalBuckets()
+    rule = Rule(2, 10)
+    assert [buckets.hit("k", rule)[0] for _ in range(3)] == [1, 1, 0]
+    assert buckets.hit("k", rule)[3] == 5000
+    clock.return_value = 105.0
+    assert buckets.hit("k", rule)[:2] == (1, 0)
+
+
+async def test_redis_token_bucket(fake_redis):
+    limiter = RateLimiter({"read": Rule(2, 60)}, enabled=True)
+    decisions = [(await limiter.hit(fake_redis, "read", "a@example.com"))[0] for _ in range(3)]
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+    assert decisions[0].headers()["RateLimit-Remaining"] == "1"
+    assert decisions[2].headers()["Retry-After"] == "30"
+    other, _ = await limiter.hit(fake_redis, "read", "b@example.com")
+    assert other.allowed
+    assert limiter.stats()["rejected"] == 1
+
+
+async def test_fetch_shares_the_round_trip(fake_redis):
+    metrics.reset()
+    await fake_redis.set("a@example.com", "cached")
+    limiter = RateLimiter({"read": Rule(5, 60)}, enabled=True)
+    # The first call loads the script after NOSCRIPT; later calls are a single pipeline.
+    await limiter.hit(fake_redis, "read", "a@example.com")
+    decision, fetched = await limiter.hit(fake_redis, "read", "a@example.com", fetch="a@example.com")
+    assert fetched == "cached"
+    assert decision.remaining == 3
+    assert metrics.redis_latency[("pipeline",)].count == 2
+    assert metrics.redis_latency[("eval",)].count == 1
+    metrics.reset()
+
+
+async def test_falls_back_to_local_buckets():
+    limiter = RateLimiter({"auth": Rule(1, 60)}, enabled=True)
+    first, fetched = await limiter.hit(BrokenRedis(), "auth", "10.0.0.1", fetch="ignored")
+    second, _ = await limiter.hit(BrokenRedis(), "auth", "10.0.0.1")
+    assert (first.allowed, second.allowed, fetched) == (True, False, None)
+    assert limiter.stats()["degraded"] is True
+    assert limiter.fallbacks == 2
+
+
+async def test_requests_are_limited_per_user(client, auth_headers, limited):
+    responses = [await client.get("/contacts/", headers=auth_headers) for _ in range(4)]
+    assert [response.status_code for response in responses] == [200, 200, 200, 429]
+    assert responses[0].headers["ratelimit-limit"] == "3"
+    assert responses[0].headers["ratelimit-remaining"] == "2"
+    assert responses[0].headers["ratelimit-policy"] == "3;w=60"
+    assert int(responses[3].headers["retry-after"]) == 20
+
+    # Writes have their own, stricter bucket.
+    contact = {"first_name": "Ivan", "last_name": "Brown", "email": "ivan@example.com", "phone": "1"}
+    assert (await client.post("/contacts/", json=contact, headers=auth_headers)).status_code == 200
+    assert (await client.post("/contacts/", json=contact, headers=auth_headers)).status_code == 429
+    assert await limited.get("testuser@example.com")
+
+
+async def test_auth_endpoints_are_limited_per_client(client, test_user, limited):
+    form = {"username": "testuser@example.com", "password": "wrong"}
+    statuses = [(await client.post("/auth/login", data=form)).status_code for _ in range(3)]
+    assert statuses == [401, 401, 429]
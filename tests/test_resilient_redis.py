@@ -0,0 +1,176 @@
+import asyncio
+import time
+import pytest
+from redis.exceptions import ConnectionError, TimeoutError
+from contacts_api.resilient_redis import CircuitBreaker, CircuitOpenError, create_redis
+from contacts_api.resources import resources
+
+
+class FakeRedisServer:
+    # Speaks just enough RESP for these tests; `delay` and `fail` inject slowness and dropped connections.
+    def __init__(self):
+        self.data = {}
+        self.delay = 0.0
+        self.fail = False
+        self.commands = []
+        self.connections = 0
+        self.peak_connections = 0
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                command = await self.read_command(reader)
+                if command is None:
+                    break
+                self.commands.append(command[0].upper())
+                if self.fail:
+                    break
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(self.reply(command))
+                await writer.drain()
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    async def read_command(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            parts.append((await reader.readexactly(size + 2))[:-2].decode())
+        return parts
+
+    def reply(self, command) -> bytes:
+        name = command[0].upper()
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name in ("SET", "SETEX"):
+            self.data[command[1]] = command[-1]
+            return b"+OK\r\n"
+        if name == "GET":
+            value = self.data.get(command[1])
+            if value is None:
+                return b"$-1\r\n"
+            return f"${len(value.encode())}\r\n{value}\r\n".encode()
+        if name == "CLIENT":
+            return b"+OK\r\n"
+        return f"-ERR unknown command '{name}'\r\n".encode()
+
+
+@pytest.fixture
+async def fake_server():
+    server = FakeRedisServer()
+    server.port = await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(threshold=2, cooldown=0.2)
+
+
+@pytest.fixture
+async def redis_conn(fake_server, breaker):
+    redis_client = create_redis(breaker=breaker, host="127.0.0.1", port=fake_server.port)
+    yield redis_client
+    await redis_client.aclose()
+
+
+async def test_round_trip_and_health(redis_conn, fake_server):
+    await redis_conn.set("a", "1")
+    assert await redis_conn.get("a") == "1"
+    health = await redis_conn.health()
+    assert health["status"] == "ok" and health["state"] == "closed"
+
+
+async def test_slow_redis_times_out(fake_server, breaker):
+    fake_server.delay = 1.0
+    redis_client = create_redis(breaker=breaker, host="127.0.0.1", port=fake_server.port, socket_timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        await redis_client.get("a")
+    assert time.monotonic() - started < 0.5
+    assert breaker.failures == 1
+    await redis_client.aclose()
+
+
+async def test_breaker_opens_and_recovers(redis_conn, fake_server, breaker):
+    fake_server.fail = True
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await redis_conn.get("a")
+    assert breaker.state == "open"
+
+    seen = len(fake_server.commands)
+    with pytest.raises(CircuitOpenError):
+        await redis_conn.get("a")
+    with pytest.raises(CircuitOpenError):
+        await redis_conn.pipeline(transaction=False).get("a").execute()
+    assert len(fake_server.commands) == seen
+    assert breaker.short_circuited == 2
+
+    await asyncio.sleep(0.25)
+    assert breaker.state == "half-open"
+    fake_server.fail = False
+    assert await redis_conn.get("a") is None
+    assert breaker.stats() == {"state": "closed", "consecutive_failures": 0, "opens": 1, "short_circuited": 2}
+
+
+async def test_failed_probe_reopens(redis_conn, fake_server, breaker):
+    fake_server.fail = True
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await redis_conn.get("a")
+    await asyncio.sleep(0.25)
+    with pytest.raises(ConnectionError):
+        await redis_conn.get("a")
+    assert breaker.state == "open"
+
+    health = await redis_conn.health()
+    assert health["status"] == "unavailable"
+    fake_server.fail = False
+    assert (await redis_conn.health())["status"] == "ok"
+    assert breaker.state == "closed"
+
+
+async def test_command_errors_do_not_trip_the_breaker(redis_conn, breaker):
+    for _ in range(3):
+        with pytest.raises(Exception):
+            await redis_conn.execute_command("NOSUCHCOMMAND")
+    assert breaker.state == "closed"
+
+
+async def test_pool_is_bounded(fake_server, breaker):
+    fake_server.delay = 0.05
+    redis_client = create_redis(breaker=breaker, host="127.0.0.1", port=fake_server.port, max_connections=2)
+    results = await asyncio.gather(*(redis_client.get("a") for _ in range(6)))
+    assert results == [None] * 6
+    assert fake_server.peak_connections == 2
+    await redis_client.aclose()
+
+
+async def test_user_lookup_survives_redis_outage(mocker, client, auth_headers, fake_server, redis_conn):
+    fake_server.fail = True
+    mocker.patch.object(resources, "redis", redis_conn)
+    response = await client.get("/contacts/", headers=auth_headers)
+    assert response.status_code == 200
+    assert (await client.get("/internal/health/redis")).status_code == 503
+    assert (await client.get("/internal/stats/redis")).json()["state"] == "open"
@@ -0,0 +1,28 @@
+import json
+import subprocess
+import sys
+from unittest.mock import AsyncMock
+from contacts_api.resources import Resources
+
+DEFERRED = ["fastapi_mail", "jinja2", "cloudinary", "redis", "PIL"]
+
+
+def test_importing_the_app_defers_heavy_modules():
+    code = f"import json, sys, contacts_api.main; print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
+
+
+async def test_resources_are_built_once_and_closed():
+    calls = []
+    redis_client = AsyncMock()
+    resources = Resources({"redis": lambda: calls.append("redis") or redis_client, "mail_config": lambda: "conf"})
+    assert not resources.built("redis")
+    assert resources.redis is resources.redis
+    assert calls == ["redis"]
+
+    await resources.startup()
+    assert resources.built("mail_config")
+    await resources.shutdown()
+    redis_client.aclose.assert_awaited_once()
+    assert not resources.built("redis")
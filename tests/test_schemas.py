@@ -1,5 +1,5 @@
-from contacts_api.schemas import ContactCreate, UserCreate
-from pydantic import ValidationError
+from contacts_api.schemas import ContactCreate, ContactEmail, UserCreate
+from pydantic import EmailStr, TypeAdapter, ValidationError
 import pytest
 
 def test_contact_create_valid_data():
@@ -44,3 +44,56 @@ def test_user_create_missing_password():
     }
     with pytest.raises(ValidationError):
         UserCreate(**data)
+
+EMAIL_CASES = [
+    "jane.doe@example.com",
+    "Jane.Doe+tag@Example.COM",
+    "o'brien@example.co.uk",
+    "a!#$%&*/=?^_`{|}~-b@example.com",
+    "user@xn--80ak6aa92e.com",
+    "user@пример.укр",
+    "user@Bücher.example",
+    "пользователь@example.com",
+    "José@example.com",
+    '"quoted local"@example.com',
+    '"john..doe"@example.com',
+    "Jane Doe <jane@example.com>",
+    "john..doe@example.com",
+    ".john@example.com",
+    "john.@example.com",
+    "john@example",
+    "john@-example.com",
+    "john@example-.com",
+    "john@exam_ple.com",
+    "john@123.123.123.123",
+    "john@[127.0.0.1]",
+    "john@localhost",
+    "john@example.com.",
+    "john@@example.com",
+    "john doe@example.com",
+    "@example.com",
+    "john@",
+    "",
+    "a" * 64 + "@example.com",
+    "a" * 65 + "@example.com",
+    "john@" + "a" * 63 + ".com",
+    "john@" + "a" * 64 + ".com",
+    "john@" + ".".join(["a" * 60] * 4) + ".com",
+    "a" * 64 + "@" + "b" * 63 + "." + "c" * 63 + "." + "d" * 57 + ".com",
+    "a" * 64 + "@" + "b" * 63 + "." + "c" * 63 + "." + "d" * 58 + ".com",
+    "john@example.invalid",
+    "john@example.test",
+]
+
+@pytest.mark.parametrize("value", EMAIL_CASES)
+def test_contact_email_matches_email_str(value):
+    # The fast path in normalize_email must accept, reject and normalize exactly like EmailStr.
+    try:
+        expected = TypeAdapter(EmailStr).validate_python(value)
+    except ValidationError:
+        expected = None
+    try:
+        actual = TypeAdapter(ContactEmail).validate_python(value)
+    except ValidationError:
+        actual = None
+    assert actual == expected
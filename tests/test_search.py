@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import text
+from contacts_api.cache import contact_cache
+from contacts_api.models import Contact
+from contacts_api.search import build_match_expression
+
+def test_build_match_expression():
+    assert build_match_expression(None, {}) is None
+    assert build_match_expression("jo", {"last_name": "do"}) is None
+    assert build_match_expression("john", {"email": 'a"b@x.com'}) == 'email : "a""b@x.com" AND "john"'
+    assert build_match_expression("john", {}, fuzzy=True) == '("joh" OR "ohn")'
+
+@pytest.fixture
+async def contacts(db_session):
+    rows = [
+        Contact(first_name="Jonathan", last_name="Smith", email="jon@example.com", phone="1", user_id=1),
+        Contact(first_name="Johanna", last_name="Brown", email="jo.brown@example.com", phone="2", user_id=1),
+        Contact(first_name="Mary", last_name="Jonasson", email="mary@example.com", phone="3", user_id=1),
+        Contact(first_name="Jonathan", last_name="Other", email="other@example.com", phone="4", user_id=2),
+    ]
+    db_session.add_all(rows)
+    await db_session.commit()
+    return rows
+
+async def _search(client, auth_headers, **params):
+    response = await client.get("/contacts/search/", params=params, headers=auth_headers)
+    assert response.status_code == 200
+    return [f"{c['first_name']} {c['last_name']}" for c in response.json()]
+
+async def test_search_substring_and_ranking(client, contacts, auth_headers):
+    assert await _search(client, auth_headers, q="jona") == ["Jonathan Smith", "Mary Jonasson"]
+    assert await _search(client, auth_headers, q="jona", limit=1) == ["Jonathan Smith"]
+    assert await _search(client, auth_headers, last_name="brown") == ["Johanna Brown"]
+    assert await _search(client, auth_headers, first_name="jo", email="example") == [
+        "Jonathan Smith", "Johanna Brown",
+    ]
+
+async def test_search_fuzzy(client, contacts, auth_headers):
+    assert await _search(client, auth_headers, q="jonathon") == []
+    assert (await _search(client, auth_headers, q="jonathon", fuzzy=True))[0] == "Jonathan Smith"
+
+async def test_search_index_follows_writes(client, db_session, contacts, auth_headers):
+    contacts[0].last_name = "Walker"
+    await db_session.commit()
+    # Direct session writes bypass the routes, so the read cache is bumped by hand.
+    await contact_cache.invalidate(1)
+    assert await _search(client, auth_headers, q="walker") == ["Jonathan Walker"]
+    assert await _search(client, auth_headers, q="smith") == []
+
+    await db_session.delete(contacts[0])
+    await db_session.commit()
+    await contact_cache.invalidate(1)
+    assert await _search(client, auth_headers, q="walker") == []
+    result = await db_session.execute(text("SELECT count(*) FROM contacts_fts WHERE contacts_fts MATCH 'walker'"))
+    assert result.scalar() == 0
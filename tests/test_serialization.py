@@ -0,0 +1,39 @@
+import json
+from sqlalchemy import select
+from contacts_api.models import Contact, User
+from contacts_api.schemas import ContactPage, ContactResponse, UserResponse
+from contacts_api.search import search_statement
+from contacts_api.serialization import ID_POSITION, contact_ndjson, contact_page_response, fetch_contact_rows
+
+
+async def _seed(db_session):
+    db_session.add_all([
+        Contact(first_name="Daria", last_name="Melnyk", email="daria@example.com", phone="+380501", birthday="1990-05-17", user_id=1),
+        Contact(first_name="Ivan", last_name="Shevchenko", email="ivan@example.com", phone=None, user_id=1, additional_info="x"),
+        Contact(first_name="Other", last_name="Owner", email="other@example.com", phone="1", user_id=2),
+    ])
+    await db_session.commit()
+
+
+async def test_fast_page_matches_pydantic_output(db_session):
+    await _seed(db_session)
+    statement = select(Contact).where(Contact.user_id == 1).order_by(Contact.id)
+    rows = await fetch_contact_rows(db_session, statement)
+    contacts = (await db_session.scalars(statement)).all()
+
+    expected = ContactPage(items=[ContactResponse.model_validate(c) for c in contacts], next_cursor="abc")
+    assert json.loads(contact_page_response(rows, "abc").body) == json.loads(expected.model_dump_json())
+    assert json.loads(contact_ndjson(rows[0])) == json.loads(ContactResponse.model_validate(contacts[0]).model_dump_json())
+
+
+async def test_fetch_rows_keeps_search_joins_and_ordering(db_session):
+    await _seed(db_session)
+    statement = search_statement("sqlite", 1, q="shevch")
+    rows = await fetch_contact_rows(db_session, statement)
+    assert [row[ID_POSITION] for row in rows] == [c.id for c in (await db_session.scalars(statement)).all()]
+    assert rows[0][0] == "Ivan"
+
+
+def test_user_response_reads_attributes():
+    user = User(id=3, email="a@example.com", full_name="A", is_verified=True)
+    assert UserResponse.model_validate(user).email == "a@example.com"
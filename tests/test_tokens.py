@@ -0,0 +1,58 @@
+import time
+import pytest
+from contacts_api.tokens import JoseBackend, PyJWTBackend, TokenCodec, TokenError, VerifiedTokenCache, create_backend
+
+BACKENDS = [JoseBackend, PyJWTBackend]
+SECRET = "test-secret-key-of-at-least-32-bytes"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_roundtrip_and_errors(backend):
+    if backend is PyJWTBackend:
+        pytest.importorskip("jwt")
+    backend = backend()
+    token = backend.encode({"sub": "a@example.com", "exp": int(time.time()) + 60}, SECRET, "HS256")
+    assert backend.decode(token, SECRET, ["HS256"])["sub"] == "a@example.com"
+    with pytest.raises(TokenError):
+        backend.decode(token, "another-key-that-is-at-least-32-bytes", ["HS256"])
+    expired = backend.encode({"sub": "a@example.com", "exp": int(time.time()) - 1}, SECRET, "HS256")
+    with pytest.raises(TokenError):
+        backend.decode(expired, SECRET, ["HS256"])
+
+
+def test_backends_are_interchangeable():
+    pytest.importorskip("jwt")
+    token = JoseBackend().encode({"sub": "a@example.com", "exp": int(time.time()) + 60}, SECRET, "HS256")
+    assert PyJWTBackend().decode(token, SECRET, ["HS256"])["sub"] == "a@example.com"
+
+
+def test_create_backend():
+    assert create_backend().name == "jose"
+    with pytest.raises(ValueError):
+        create_backend("unknown")
+
+
+def test_codec_caches_verified_tokens(mocker):
+    codec = TokenCodec(SECRET, "HS256")
+    token = codec.encode({"sub": "a@example.com", "exp": int(time.time()) + 60})
+    decode = mocker.spy(codec.backend, "decode")
+    assert codec.decode(token)["sub"] == "a@example.com"
+    assert codec.decode(token)["sub"] == "a@example.com"
+    assert decode.call_count == 1
+    assert codec.cache.stats()["hits"] == 1
+
+
+def test_cache_expires_at_token_exp(mocker):
+    cache = VerifiedTokenCache(maxsize=1)
+    clock = mocker.patch("contacts_api.tokens.time.time", return_value=100.0)
+    cache.put("a", {"exp": 110})
+    cache.put("b", {"sub": "no expiry"})
+    assert cache.get("a") == {"exp": 110}
+    assert cache.get("b") is None
+    clock.return_value = 110.0
+    assert cache.get("a") is None
+
+    cache.put("a", {"exp": 200})
+    cache.put("c", {"exp": 200})
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 1
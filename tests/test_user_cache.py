@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from contacts_api.auth import create_access_token, get_current_user
+from contacts_api.user_cache import INVALIDATION_CHANNEL, CurrentUser, UserCache, publish_invalidation, user_cache
+
+
+def test_user_cache_lru_and_ttl(mocker):
+    cache = UserCache(maxsize=2, ttl=10)
+    clock = mocker.patch("contacts_api.user_cache.time.monotonic", return_value=100.0)
+    for i in range(3):
+        cache.put(f"user{i}@example.com", 1, CurrentUser(i, f"user{i}@example.com"))
+    assert cache.get("user0@example.com", 1) is None
+    assert cache.get("user2@example.com", 1).id == 2
+    assert cache.stats()["evictions"] == 1
+
+    clock.return_value = 111.0
+    assert cache.get("user2@example.com", 1) is None
+    assert cache.stats()["size"] == 1
+
+
+def test_user_cache_invalidate_drops_every_token():
+    cache = UserCache()
+    cache.put("a@example.com", 1, CurrentUser(1, "a@example.com"))
+    cache.put("a@example.com", 2, CurrentUser(1, "a@example.com"))
+    cache.put("b@example.com", 1, CurrentUser(2, "b@example.com"))
+    cache.invalidate("a@example.com")
+    assert cache.get("a@example.com", 1) is None
+    assert cache.get("a@example.com", 2) is None
+    assert cache.get("b@example.com", 1).id == 2
+
+
+def test_current_user_is_slotted():
+    user = CurrentUser(1, "a@example.com")
+    with pytest.raises(AttributeError):
+        user.password = "secret"
+
+
+async def test_get_current_user_skips_redis_on_local_hit(db_session, mock_redis):
+    token = create_access_token({"sub": "testuser@example.com"})
+    first = await get_current_user(token, db_session)
+    second = await get_current_user(token, db_session)
+    assert isinstance(first, CurrentUser)
+    assert second is first
+    mock_redis.get.assert_awaited_once_with("testuser@example.com")
+
+
+async def test_publish_invalidation_clears_local_entry(mock_redis):
+    user_cache.put("testuser@example.com", 1, CurrentUser(1, "testuser@example.com"))
+    await publish_invalidation(mock_redis, "testuser@example.com")
+    assert user_cache.get("testuser@example.com", 1) is None
+    mock_redis.publish.assert_awaited_once_with(INVALIDATION_CHANNEL, "testuser@example.com")
+
+
+async def test_listener_applies_remote_invalidations():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache = UserCache()
+    cache.put("a@example.com", 1, CurrentUser(1, "a@example.com"))
+    cache.start_listener(redis_client)
+    for _ in range(100):
+        if await redis_client.publish(INVALIDATION_CHANNEL, "a@example.com"):
+            break
+        await asyncio.sleep(0.01)
+    for _ in range(100):
+        if cache.get("a@example.com", 1) is None:
+            break
+        await asyncio.sleep(0.01)
+    await cache.stop_listener()
+    assert cache.get("a@example.com", 1) is None
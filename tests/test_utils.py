@@ -1,4 +1,7 @@
-from contacts_api.utils import hash_password, verify_password
+import asyncio
+import time
+from passlib.context import CryptContext
+from contacts_api.utils import PasswordHasher, hash_password, pwd_context, verify_password
 
 def test_hash_password():
     password = "securepassword"
@@ -9,3 +12,25 @@ def test_hash_password():
 def test_verify_password():
     assert verify_password("securepassword", hash_password("securepassword"))
     assert not verify_password("wrongpassword", hash_password("securepassword"))
+
+async def test_password_hasher_limits_concurrency():
+    hasher = PasswordHasher(workers=2, concurrency=1)
+    tasks = [asyncio.create_task(hasher._run(time.sleep, 0.05)) for _ in range(3)]
+    await asyncio.sleep(0.02)
+    assert hasher.stats()["active"] == 1
+    assert hasher.stats()["queue_depth"] == 2
+    await asyncio.gather(*tasks)
+    assert hasher.stats()["queue_depth"] == 0
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+async def test_password_hasher_rehashes_outdated_hash():
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("securepassword")
+    hasher = PasswordHasher()
+    assert await hasher.verify("securepassword", await hasher.hash("securepassword"))
+    verified, new_hash = await hasher.verify_and_update("securepassword", outdated)
+    assert verified
+    assert verify_password("securepassword", new_hash)
+    assert not pwd_context.needs_update(new_hash)
+    assert hasher.stats()["rehashed"] == 1
+    hasher.shutdown()